@@ -0,0 +1,165 @@
+# ad_catalog.py
+
+import os
+import json
+import bisect
+import logging
+import threading
+
+CATALOG_FILE = 'ad_catalog.json'
+NGRAM = 3
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+class AdCatalog:
+    """
+    The Ad IDs in the data folder, indexed for autocomplete.
+
+    IDs are kept in a sorted list (prefix matches are a bisect range) and in
+    a trigram index (substring matches only check IDs sharing every trigram
+    of the query). The list is persisted to 'path' together with the data
+    folder's mtime, so startup reads one small file instead of walking the
+    folder; the folder is only rescanned when its mtime has changed.
+    """
+
+    def __init__(self, data_dir, path):
+        self.data_dir = data_dir
+        self.path = path
+        self._lock = threading.RLock()
+        self._ids = []
+        self._grams = {}
+        self._dir_mtime_ns = None
+        if not self._load():
+            self.rescan()
+
+    def _folder_mtime_ns(self):
+        try:
+            return os.stat(self.data_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        """
+        Read the catalogue file. Returns False if it is missing, unreadable
+        or older than the data folder.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                catalog = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable ad catalogue {self.path}: {e}")
+            return False
+        if catalog.get("data_dir_mtime_ns") != self._folder_mtime_ns():
+            return False
+        with self._lock:
+            self._index(catalog.get("ad_ids", []))
+            self._dir_mtime_ns = catalog["data_dir_mtime_ns"]
+        return True
+
+    def _save(self):
+        try:
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"data_dir_mtime_ns": self._dir_mtime_ns, "ad_ids": self._ids}, f)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logging.warning(f"Failed to save ad catalogue: {e}")
+
+    def _index(self, ad_ids):
+        self._ids = sorted(set(ad_ids))
+        self._grams = {}
+        for ad_id in self._ids:
+            for gram in _ngrams(ad_id.lower()):
+                self._grams.setdefault(gram, set()).add(ad_id)
+
+    def rescan(self):
+        """
+        Rebuild the catalogue from the data folder's subdirectories.
+        """
+        ad_ids = []
+        if os.path.isdir(self.data_dir):
+            with os.scandir(self.data_dir) as entries:
+                ad_ids = [entry.name for entry in entries if entry.is_dir()]
+        with self._lock:
+            self._index(ad_ids)
+            self._dir_mtime_ns = self._folder_mtime_ns()
+            self._save()
+        logging.info(f"Ad catalogue rebuilt with {len(ad_ids)} Ad IDs.")
+
+    def refresh(self):
+        """
+        Rescan only if the data folder changed since the catalogue was written.
+        """
+        if self._folder_mtime_ns() != self._dir_mtime_ns:
+            self.rescan()
+
+    def add(self, ad_ids):
+        """
+        Add newly scraped Ad IDs without touching the folder.
+        """
+        with self._lock:
+            added = False
+            for ad_id in ad_ids:
+                if not ad_id:
+                    continue
+                index = bisect.bisect_left(self._ids, ad_id)
+                if index < len(self._ids) and self._ids[index] == ad_id:
+                    continue
+                self._ids.insert(index, ad_id)
+                for gram in _ngrams(ad_id.lower()):
+                    self._grams.setdefault(gram, set()).add(ad_id)
+                added = True
+            if added:
+                self._dir_mtime_ns = self._folder_mtime_ns()
+                self._save()
+
+    def all(self):
+        with self._lock:
+            return list(self._ids)
+
+    def __contains__(self, ad_id):
+        with self._lock:
+            index = bisect.bisect_left(self._ids, ad_id)
+            return index < len(self._ids) and self._ids[index] == ad_id
+
+    def __len__(self):
+        return len(self._ids)
+
+    def search(self, text, limit=None):
+        """
+        Ad IDs containing 'text' (case-insensitive): prefix matches first,
+        then the other substring matches, each in sorted order.
+        """
+        typed = text.strip().lower()
+        with self._lock:
+            if not typed:
+                return self._ids[:limit]
+
+            start = bisect.bisect_left(self._ids, typed)
+            end = bisect.bisect_left(self._ids, typed + '\uffff')
+            prefix = self._ids[start:end]
+            if limit is not None and len(prefix) >= limit:
+                return prefix[:limit]
+
+            if len(typed) >= NGRAM:
+                grams = sorted(_ngrams(typed), key=lambda gram: len(self._grams.get(gram, ())))
+                candidates = set(self._grams.get(grams[0], ()))
+                for gram in grams[1:]:
+                    if not candidates:
+                        break
+                    candidates &= self._grams.get(gram, set())
+                candidates = sorted(candidates)
+            else:
+                candidates = self._ids
+
+            matches = list(prefix)
+            seen = set(prefix)
+            for ad_id in candidates:
+                if limit is not None and len(matches) >= limit:
+                    break
+                if ad_id not in seen and typed in ad_id.lower():
+                    matches.append(ad_id)
+            return matches
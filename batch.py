@@ -0,0 +1,224 @@
+# batch.py
+
+import os
+import csv
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from scraper import run_scraper
+from uploader import (
+    run_uploader,
+    load_ad_listing,
+    missing_upload_fields,
+    UploadTimeout,
+    PublishedWithoutUrl,
+    DEFAULT_UPLOAD_TIMEOUT
+)
+from driver_pool import get_driver_pool, is_driver_alive
+
+DEFAULT_BATCH_WORKERS = 2
+
+STATUS_QUEUED = "Queued"
+STATUS_RUNNING = "Running"
+STATUS_DONE = "Done"
+STATUS_FAILED = "Failed"
+STATUS_STOPPED = "Stopped"
+STATUS_TIMED_OUT = "Timed out"
+STATUS_DUPLICATE = "Duplicate"
+STATUS_PUBLISHED_NO_URL = "Published, URL unknown"
+
+def parse_batch_rows(rows, default_agency_price="", default_comment=""):
+    """
+    Turn rows of [url, agency_price, comment] (price and comment optional)
+    into job dicts. Rows whose first cell is not an http(s) URL are skipped,
+    which also drops CSV header lines.
+    """
+    jobs = []
+    for row in rows:
+        cells = [cell.strip() for cell in row]
+        if not cells or not cells[0].lower().startswith(("http://", "https://")):
+            continue
+        jobs.append({
+            "url": cells[0],
+            "agency_price": cells[1] if len(cells) > 1 and cells[1] else default_agency_price,
+            "comment": cells[2] if len(cells) > 2 and cells[2] else default_comment,
+        })
+    return jobs
+
+def parse_batch_text(text, default_agency_price="", default_comment=""):
+    """
+    Parse pasted text: one URL per line, optionally followed by
+    ',agency_price,comment' (tabs are accepted as separators too).
+    """
+    lines = [line.replace("\t", ",") for line in text.splitlines() if line.strip()]
+    return parse_batch_rows(csv.reader(lines), default_agency_price, default_comment)
+
+def load_batch_file(path, default_agency_price="", default_comment=""):
+    """
+    Load jobs from a .txt (one URL per line) or .csv file.
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if os.path.splitext(path)[1].lower() == '.csv':
+            return parse_batch_rows(csv.reader(f), default_agency_price, default_comment)
+        return parse_batch_text(f.read(), default_agency_price, default_comment)
+
+def run_batch_scrape(jobs, workers=DEFAULT_BATCH_WORKERS, headless=True, stop_event=None,
+                     output_dir=None, progress_callback=None):
+    """
+    Scrape every job on 'workers' parallel browsers from the shared pool.
+
+    progress_callback(index, status, ad_id) is called from worker threads
+    whenever a job changes state. Returns a list of (job, ScrapeResult) in
+    input order; the result is None for failed or stopped jobs.
+    """
+    workers = max(1, int(workers))
+
+    def report(index, status, ad_id=None):
+        if progress_callback:
+            try:
+                progress_callback(index, status, ad_id)
+            except Exception as e:
+                logging.warning(f"Batch progress callback failed: {e}")
+
+    def scrape(index, job):
+        if stop_event and stop_event.is_set():
+            report(index, STATUS_STOPPED)
+            return None
+        report(index, STATUS_RUNNING)
+        try:
+            result = run_scraper(
+                job["url"],
+                job["agency_price"],
+                comment=job["comment"],
+                headless=headless,
+                stop_event=stop_event,
+                output_dir=output_dir
+            )
+        except Exception as e:
+            logging.error(f"Batch scrape failed for {job['url']}: {e}")
+            result = None
+        if result:
+            report(index, STATUS_DONE, result.ad_id)
+        elif stop_event and stop_event.is_set():
+            report(index, STATUS_STOPPED)
+        else:
+            report(index, STATUS_FAILED)
+        return result
+
+    for index in range(len(jobs)):
+        report(index, STATUS_QUEUED)
+
+    # The pool only grows for the batch; the extra browsers are quit afterwards
+    with get_driver_pool().grown(workers), ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(scrape, index, job) for index, job in enumerate(jobs)]
+        results = [future.result() for future in futures]
+
+    logging.info(f"Batch scrape finished: {sum(1 for result in results if result)}/{len(jobs)} succeeded.")
+    return list(zip(jobs, results))
+
+def run_upload_queue(ad_ids, username, password, enter_description=True, headless=False,
+                     stop_event=None, output_dir=None, progress_callback=None,
+                     timeout=DEFAULT_UPLOAD_TIMEOUT, automated=False, duplicate_detector=None):
+    """
+    Upload already-scraped ads one after another on a single browser, so the
+    login happens at most once for the whole queue. With 'automated' set,
+    ads with complete data run unattended on a headless browser and the
+    rest on a visible one (see run_uploader). With a 'duplicate_detector',
+    ads that look like an already uploaded one are reported as
+    STATUS_DUPLICATE and skipped.
+
+    A failed or timed-out ad ('timeout' seconds each) is reported and skipped; if the browser itself died it is
+    replaced before the next ad. progress_callback(index, status, final_url)
+    is called from this thread. Returns a list of (ad_id, final_url) in
+    input order; final_url is None for failed or stopped uploads.
+    """
+    pool = get_driver_pool()
+
+    def report(index, status, final_url=None):
+        if progress_callback:
+            try:
+                progress_callback(index, status, final_url)
+            except Exception as e:
+                logging.warning(f"Upload queue progress callback failed: {e}")
+
+    for index in range(len(ad_ids)):
+        report(index, STATUS_QUEUED)
+
+    results = [(ad_id, None) for ad_id in ad_ids]
+    # One browser per mode: headless for automated ads, visible otherwise.
+    # Both may be held at once, so the pool must have room for two.
+    drivers = {}
+    with pool.grown(2 if automated else 1):
+        try:
+            for index, ad_id in enumerate(ad_ids):
+                if stop_event and stop_event.is_set():
+                    report(index, STATUS_STOPPED)
+                    continue
+                listing = load_ad_listing(output_dir, ad_id)
+                if listing is None:
+                    report(index, STATUS_FAILED)
+                    continue
+                if duplicate_detector is not None:
+                    duplicates = duplicate_detector.upload_duplicates(listing)
+                    if duplicates:
+                        logging.info(f"Skipping queued upload of Ad ID {ad_id}, likely duplicate of "
+                                     f"{'; '.join(match.describe() for match in duplicates)}")
+                        report(index, STATUS_DUPLICATE)
+                        continue
+                automate = automated and not missing_upload_fields(listing)
+                if automated:
+                    mode_headless = automate
+                else:
+                    mode_headless = headless
+
+                driver = drivers.get(mode_headless)
+                if driver is not None and not is_driver_alive(driver):
+                    pool.discard(drivers.pop(mode_headless))
+                    driver = None
+                if driver is None:
+                    driver = pool.acquire(headless=mode_headless, stop_event=stop_event)
+                    if driver is None:
+                        report(index, STATUS_STOPPED)
+                        continue
+                    drivers[mode_headless] = driver
+
+                report(index, STATUS_RUNNING)
+                try:
+                    final_url = run_uploader(
+                        username=username,
+                        password=password,
+                        phone_number="",
+                        ad_id=ad_id,
+                        enter_description=enter_description,
+                        headless=headless,
+                        stop_event=stop_event,
+                        output_dir=output_dir,
+                        driver=driver,
+                        timeout=timeout,
+                        automated=automate,
+                        listing=listing
+                    )
+                except UploadTimeout as e:
+                    logging.error(f"Queued upload timed out for Ad ID {ad_id}: {e}")
+                    report(index, STATUS_TIMED_OUT)
+                    continue
+                except PublishedWithoutUrl as e:
+                    logging.error(f"Queued upload of Ad ID {ad_id}: {e}")
+                    report(index, STATUS_PUBLISHED_NO_URL)
+                    continue
+                except Exception as e:
+                    logging.error(f"Queued upload failed for Ad ID {ad_id}: {e}")
+                    final_url = None
+
+                results[index] = (ad_id, final_url)
+                if final_url:
+                    report(index, STATUS_DONE, final_url)
+                elif stop_event and stop_event.is_set():
+                    report(index, STATUS_STOPPED)
+                else:
+                    report(index, STATUS_FAILED)
+        finally:
+            for driver in drivers.values():
+                pool.release(driver)
+
+    logging.info(f"Upload queue finished: {sum(1 for _, url in results if url)}/{len(ad_ids)} uploaded.")
+    return results
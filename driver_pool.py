@@ -0,0 +1,267 @@
+# driver_pool.py
+
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.webdriver.chrome.options import Options
+from driver_resolver import resolve_chromedriver_path
+
+DEFAULT_POOL_SIZE = 2
+
+def create_driver(headless=False):
+    """
+    Start a new Chrome session with the options the scraper and uploader use.
+    """
+    options = Options()
+    if headless:
+        options.add_argument('--headless')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--window-size=1920,1080')
+
+    driver = webdriver.Chrome(service=ChromeService(resolve_chromedriver_path()), options=options)
+    driver.maximize_window()
+    return driver
+
+def is_driver_alive(driver):
+    """
+    Returns True if the browser behind 'driver' still answers commands.
+    """
+    try:
+        return bool(driver.window_handles)
+    except Exception:
+        return False
+
+def reset_driver(driver):
+    """
+    Bring a used session back to a clean state: one window, no cookies,
+    no web storage, parked on about:blank.
+    Returns False if the session could not be reset (e.g. it crashed).
+    """
+    try:
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        try:
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except Exception:
+            pass
+        try:
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        except Exception:
+            driver.delete_all_cookies()
+        driver.get("about:blank")
+        return True
+    except Exception as e:
+        logging.warning(f"Failed to reset pooled driver: {e}")
+        return False
+
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+class DriverPool:
+    """
+    A bounded pool of warm Chrome sessions shared by the scraper and uploader.
+
+    Sessions are keyed by headless mode. At most 'size' browsers are alive at
+    once; acquire() blocks until one is free, replacing an idle browser of the
+    other mode when needed. Crashed sessions are dropped and started again.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE):
+        self.size = max(1, int(size))
+        self._cond = threading.Condition()
+        self._idle = {True: [], False: []}
+        self._modes = {}
+        self._starting = 0
+        self._closed = False
+
+    def _total(self):
+        return len(self._modes) + self._starting
+
+    def resize(self, size):
+        """
+        Change the number of browsers the pool may keep alive. When
+        shrinking, surplus idle browsers are quit right away; busy ones are
+        quit when they are released.
+        """
+        surplus = []
+        with self._cond:
+            self.size = max(1, int(size))
+            for idle in self._idle.values():
+                while idle and self._total() > self.size:
+                    driver = idle.pop()
+                    self._modes.pop(driver, None)
+                    surplus.append(driver)
+            self._cond.notify_all()
+        for driver in surplus:
+            quit_driver(driver)
+
+    @contextmanager
+    def grown(self, size):
+        """
+        Let the pool hold at least 'size' browsers for the duration of the
+        block, then shrink it back to its previous size (unless someone
+        else resized it in the meantime).
+        """
+        previous = self.size
+        if previous >= size:
+            yield self
+            return
+        self.resize(size)
+        try:
+            yield self
+        finally:
+            if self.size == max(1, int(size)):
+                self.resize(previous)
+
+    def acquire(self, headless=False, stop_event=None):
+        """
+        Hand out a ready driver for the given mode.
+        Returns None if stop_event is set while waiting.
+        """
+        headless = bool(headless)
+        while True:
+            stale = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Driver pool has been shut down.")
+                    if stop_event and stop_event.is_set():
+                        return None
+                    if self._idle[headless]:
+                        driver = self._idle[headless].pop()
+                        break
+                    if self._total() < self.size:
+                        driver = None
+                        self._starting += 1
+                        break
+                    other = self._idle[not headless]
+                    if other:
+                        stale = other.pop()
+                        self._modes.pop(stale, None)
+                        driver = None
+                        self._starting += 1
+                        break
+                    self._cond.wait(0.5)
+
+            if stale is not None:
+                quit_driver(stale)
+
+            if driver is not None:
+                if is_driver_alive(driver):
+                    return driver
+                logging.info("Pooled driver is no longer responding. Restarting it.")
+                with self._cond:
+                    self._modes.pop(driver, None)
+                    self._starting += 1
+                quit_driver(driver)
+
+            try:
+                driver = create_driver(headless=headless)
+            except Exception:
+                with self._cond:
+                    self._starting -= 1
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self._starting -= 1
+                self._modes[driver] = headless
+            return driver
+
+    def release(self, driver, reset=True):
+        """
+        Return a driver to the pool. Sessions that fail to reset are discarded.
+        """
+        if driver is None:
+            return
+        if reset and not reset_driver(driver):
+            self.discard(driver)
+            return
+        with self._cond:
+            headless = self._modes.get(driver)
+            if headless is None or self._closed or self._total() > self.size:
+                self._modes.pop(driver, None)
+                self._cond.notify_all()
+                keep = False
+            else:
+                self._idle[headless].append(driver)
+                self._cond.notify_all()
+                keep = True
+        if not keep:
+            quit_driver(driver)
+
+    def discard(self, driver):
+        """
+        Quit a driver and free its slot in the pool.
+        """
+        with self._cond:
+            self._modes.pop(driver, None)
+            for idle in self._idle.values():
+                if driver in idle:
+                    idle.remove(driver)
+            self._cond.notify_all()
+        quit_driver(driver)
+
+    @contextmanager
+    def session(self, headless=False, stop_event=None):
+        driver = self.acquire(headless=headless, stop_event=stop_event)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def warm_up(self, headless=False, count=1):
+        """
+        Start up to 'count' idle browsers in the background so the first
+        scrape or upload does not pay for the cold start.
+        """
+        def worker():
+            drivers = []
+            try:
+                for _ in range(min(count, self.size)):
+                    drivers.append(self.acquire(headless=headless))
+            except Exception as e:
+                logging.warning(f"Failed to warm up driver: {e}")
+            for driver in drivers:
+                self.release(driver, reset=False)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            drivers = list(self._modes)
+            self._modes.clear()
+            self._idle = {True: [], False: []}
+            self._cond.notify_all()
+        for driver in drivers:
+            quit_driver(driver)
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+def get_driver_pool():
+    """
+    Returns the process-wide driver pool, creating it on first use.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = DriverPool()
+            atexit.register(_default_pool.shutdown)
+        return _default_pool
+
+def configure_driver_pool(size):
+    """
+    Set the number of browsers the shared pool may keep alive.
+    """
+    pool = get_driver_pool()
+    pool.resize(size)
+    return pool
@@ -0,0 +1,88 @@
+# driver_resolver.py
+
+import os
+import json
+import logging
+import threading
+from webdriver_manager.chrome import ChromeDriverManager
+
+CACHE_FILE = os.path.join(os.getcwd(), 'chromedriver_cache.json')
+
+_resolved_path = None
+_resolve_lock = threading.Lock()
+
+def get_chrome_version():
+    """
+    Returns the installed Chrome version string, or None if it can't be detected.
+    This only inspects the local installation; it never touches the network.
+    """
+    try:
+        from webdriver_manager.core.os_manager import OperationSystemManager, ChromeType
+        return OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+    except ImportError:
+        pass
+    except Exception as e:
+        logging.warning(f"Could not detect Chrome version: {e}")
+        return None
+    try:
+        from webdriver_manager.core.utils import get_browser_version_from_os, ChromeType
+        return get_browser_version_from_os(ChromeType.GOOGLE)
+    except Exception as e:
+        logging.warning(f"Could not detect Chrome version: {e}")
+        return None
+
+def get_major_version(version):
+    if not version:
+        return None
+    return version.split(".")[0]
+
+def load_cache(cache_file=CACHE_FILE):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if isinstance(cache, dict):
+            return cache
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable chromedriver cache: {e}")
+    return {}
+
+def save_cache(path, chrome_version, cache_file=CACHE_FILE):
+    try:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'driver_path': path, 'chrome_version': chrome_version}, f, indent=4)
+    except Exception as e:
+        logging.warning(f"Failed to write chromedriver cache: {e}")
+
+def resolve_chromedriver_path(cache_file=CACHE_FILE):
+    """
+    Returns the chromedriver binary path, resolving it at most once per process.
+
+    The path and the Chrome version it was resolved for are kept in
+    'cache_file'. ChromeDriverManager().install() only runs again when the
+    cached binary is gone or the installed Chrome major version changed.
+    """
+    global _resolved_path
+    with _resolve_lock:
+        if _resolved_path:
+            return _resolved_path
+
+        cache = load_cache(cache_file)
+        cached_path = cache.get('driver_path')
+        cached_version = cache.get('chrome_version')
+        chrome_version = get_chrome_version()
+
+        cache_valid = bool(cached_path) and os.path.exists(cached_path)
+        if cache_valid and chrome_version and get_major_version(chrome_version) != get_major_version(cached_version):
+            logging.info(f"Chrome changed from {cached_version} to {chrome_version}. Re-resolving chromedriver.")
+            cache_valid = False
+
+        if cache_valid:
+            _resolved_path = cached_path
+            return _resolved_path
+
+        _resolved_path = ChromeDriverManager().install()
+        logging.info(f"Resolved chromedriver at {_resolved_path} for Chrome {chrome_version}.")
+        save_cache(_resolved_path, chrome_version, cache_file)
+        return _resolved_path
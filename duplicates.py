@@ -0,0 +1,200 @@
+# duplicates.py
+
+import re
+import logging
+from dataclasses import dataclass, field
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it images are not compared
+    Image = None
+
+# Perceptual image hashes: 64-bit difference hashes, split into bands for
+# lookup. Two hashes within HASH_DISTANCE bits always share at least one
+# band exactly (pigeonhole), so candidates are found with indexed equality
+# lookups and only those are compared bit by bit.
+HASH_BANDS = 4
+HASH_DISTANCE = 3
+MAX_HASHED_IMAGES = 12
+
+# Evidence weights; an ad is a likely duplicate at DUPLICATE_SCORE or more,
+# and only if the unit itself matches too (same area and floor, or similar
+# images). Phone and address alone fit every flat an agent lists in one
+# building, so a known different area or floor rules a match out unless
+# at least MANY_IMAGES images agree (one shared photo, e.g. of the entrance
+# or the view, is not enough).
+PHONE_WEIGHT = 1
+ADDRESS_WEIGHT = 2
+AREA_FLOOR_WEIGHT = 1
+IMAGES_WEIGHT = 2
+MANY_IMAGES_WEIGHT = 3
+MANY_IMAGES = 3
+DUPLICATE_SCORE = 3
+
+def image_hashing_available():
+    return Image is not None
+
+def phone_key(phone_number):
+    """
+    The last 9 digits of a phone number, so '+995 599 12 34 56' and
+    '599123456' compare equal. Empty if there are too few digits.
+    """
+    digits = re.sub(r"\D", "", phone_number or "")
+    return digits[-9:] if len(digits) >= 6 else ""
+
+def address_key(location, number):
+    """
+    Lower-cased street and house number with punctuation and repeated
+    whitespace removed. Empty if there is no street.
+    """
+    street = " ".join(re.findall(r"\w+", (location or "").lower()))
+    if not street:
+        return ""
+    return f"{street} {(number or '').strip().lower()}".strip()
+
+def image_hash(path):
+    """
+    64-bit difference hash of an image (survives resizing and
+    recompression), or None if Pillow is missing or the file can't be read.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as image:
+            pixels = list(image.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    except Exception as e:
+        logging.warning(f"Could not hash image {path}: {e}")
+        return None
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left = pixels[row * 9 + column]
+            right = pixels[row * 9 + column + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+def hash_bands(value):
+    width = 64 // HASH_BANDS
+    mask = (1 << width) - 1
+    return [(value >> (band * width)) & mask for band in range(HASH_BANDS)]
+
+def to_signed(value):
+    """
+    Store unsigned 64-bit hashes in SQLite's signed INTEGER.
+    """
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+@dataclass(slots=True)
+class DuplicateMatch:
+    """
+    An earlier ad that looks like the same property, with the evidence.
+    'uploaded_url' is its ss.ge URL if it has already been uploaded.
+    """
+    ad_id: str
+    score: int = 0
+    reasons: list = field(default_factory=list)
+    uploaded_url: str = None
+
+    def describe(self):
+        text = f"{self.ad_id} ({', '.join(self.reasons)})"
+        if self.uploaded_url:
+            text += f", uploaded as {self.uploaded_url}"
+        return text
+
+class DuplicateDetector:
+    """
+    Compares a listing against every ad in the ListingIndex by phone,
+    address, area+floor and perceptual image hashes.
+
+    With a 'ledger', matches carry the ss.ge URL they were uploaded as;
+    upload_duplicates() only reports matches that are already on ss.ge,
+    since uploading those again is what creates duplicate listings.
+    """
+
+    def __init__(self, index, ledger=None):
+        self.index = index
+        self.ledger = ledger
+
+    def find_duplicates(self, listing):
+        """
+        Returns DuplicateMatch for every other ad scoring at least
+        DUPLICATE_SCORE with matching area+floor or images, best first. The
+        listing itself is (re)indexed first, so ads later in the same batch
+        are compared against it.
+        """
+        self.index.update([listing.ad_id])
+        matches = {}
+        same_unit = set()
+        other_unit = set()
+
+        def match(ad_id):
+            if ad_id not in matches:
+                matches[ad_id] = DuplicateMatch(ad_id)
+            return matches[ad_id]
+
+        phone = phone_key(listing.phone_number)
+        address = address_key(listing.location, listing.number)
+        for row in self.index.fingerprint_candidates(listing.ad_id, phone, address,
+                                                     listing.total_area, listing.floor):
+            ad_id, row_phone, row_address, row_area, row_floor = row
+            if phone and row_phone == phone:
+                match(ad_id).score += PHONE_WEIGHT
+                match(ad_id).reasons.append("same phone")
+            if address and row_address == address:
+                match(ad_id).score += ADDRESS_WEIGHT
+                match(ad_id).reasons.append("same address")
+            area_differs = (listing.total_area is not None and row_area is not None
+                            and abs(row_area - listing.total_area) > 1)
+            floor_differs = listing.floor is not None and row_floor is not None and row_floor != listing.floor
+            if area_differs or floor_differs:
+                other_unit.add(ad_id)
+            elif (listing.total_area is not None and row_area is not None and listing.floor is not None
+                    and row_floor == listing.floor):
+                same_unit.add(ad_id)
+                match(ad_id).score += AREA_FLOOR_WEIGHT
+                match(ad_id).reasons.append("same area and floor")
+
+        similar = {}
+        for own_hash in self.index.image_hashes(listing.ad_id):
+            for ad_id, other_hash in self.index.similar_image_candidates(listing.ad_id, own_hash):
+                if hamming(own_hash, other_hash) <= HASH_DISTANCE:
+                    similar.setdefault(ad_id, set()).add(own_hash)
+        for ad_id, hashes in similar.items():
+            count = len(hashes)
+            match(ad_id).score += MANY_IMAGES_WEIGHT if count >= MANY_IMAGES else IMAGES_WEIGHT
+            match(ad_id).reasons.append(f"{count} similar image{'s' if count > 1 else ''}")
+
+        def likely(candidate):
+            if candidate.score < DUPLICATE_SCORE:
+                return False
+            images = len(similar.get(candidate.ad_id, ()))
+            if candidate.ad_id in other_unit:
+                return images >= MANY_IMAGES
+            return images > 0 or candidate.ad_id in same_unit
+        found = [candidate for candidate in matches.values() if likely(candidate)]
+        if self.ledger is not None and found:
+            uploaded = self.ledger.uploaded_urls([candidate.ad_id for candidate in found])
+            for candidate in found:
+                candidate.uploaded_url = uploaded.get(candidate.ad_id)
+        found.sort(key=lambda candidate: (-candidate.score, candidate.ad_id))
+        return found
+
+    def upload_duplicates(self, listing):
+        """
+        The matches of 'listing' that are already uploaded (all matches if
+        there is no ledger to tell). Empty means go ahead and upload.
+        """
+        try:
+            found = self.find_duplicates(listing)
+        except Exception as e:
+            logging.error(f"Duplicate check failed for Ad ID {listing.ad_id}: {e}")
+            return []
+        if self.ledger is None:
+            return found
+        return [candidate for candidate in found if candidate.uploaded_url is not None]
@@ -0,0 +1,185 @@
+# excel_writer.py
+
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from ledger import ExcelConflictError
+
+DEFAULT_DEBOUNCE = 2.0
+
+class ExcelWriter(threading.Thread):
+    """
+    The single thread that writes to the ledger and scraped_data.xlsx.
+
+    Worker threads queue row appends and cell updates instead of touching the
+    files themselves. Queued commands are coalesced (appends batched, updates
+    to the same ad merged) and the workbook is saved once the queue has been
+    quiet for 'debounce' seconds, on flush(), or at close().
+    Failures are passed to on_error(message) so the GUI can show them.
+    """
+
+    def __init__(self, ledger, excel_path, debounce=DEFAULT_DEBOUNCE, on_error=None):
+        super().__init__(name="excel-writer", daemon=True)
+        self.ledger = ledger
+        self.excel_path = excel_path
+        self.debounce = debounce
+        self.on_error = on_error
+        self._commands = queue.Queue()
+        self._stopped = False
+        self._last_conflict = None
+        self.start()
+
+    def append_rows(self, rows):
+        """
+        Queue rows (keyed by Excel header) to be appended.
+        Returns a Future that completes once they are in the ledger.
+        """
+        future = Future()
+        self._commands.put(("append", list(rows), future))
+        return future
+
+    def update(self, ad_id, values):
+        """
+        Queue Excel-header keyed 'values' for the latest row of 'ad_id'.
+        Returns a Future resolving to False if the ad is not in the ledger.
+        """
+        future = Future()
+        self._commands.put(("update", (str(ad_id), dict(values)), future))
+        return future
+
+    def update_many(self, updates):
+        """
+        Queue {ad_id: values} updates as one batch, applied in a single
+        ledger transaction. Returns a Future resolving to {ad_id: updated}.
+        """
+        future = Future()
+        payload = {str(ad_id): dict(values) for ad_id, values in updates.items()}
+        self._commands.put(("update_many", payload, future))
+        return future
+
+    def flush(self, timeout=None):
+        """
+        Apply everything queued so far and save the workbook. Blocks until done.
+        """
+        future = Future()
+        self._commands.put(("flush", None, future))
+        return future.result(timeout)
+
+    def close(self, timeout=30):
+        """
+        Flush pending work and stop the thread.
+        """
+        if self._stopped:
+            return
+        future = Future()
+        self._commands.put(("stop", None, future))
+        try:
+            future.result(timeout)
+        finally:
+            self._stopped = True
+
+    def _report(self, message):
+        logging.error(message)
+        if self.on_error:
+            try:
+                self.on_error(message)
+            except Exception:
+                pass
+
+    def _apply(self, commands):
+        """
+        Apply a drained batch of commands to the ledger in as few
+        transactions as possible.
+        """
+        appends = []
+        append_futures = []
+        updates = {}
+        update_futures = []
+        for kind, payload, future in commands:
+            if kind == "append":
+                appends.extend(payload)
+                append_futures.append(future)
+            elif kind == "update":
+                ad_id, values = payload
+                updates.setdefault(ad_id, {}).update(values)
+                update_futures.append((future, ad_id))
+            elif kind == "update_many":
+                for ad_id, values in payload.items():
+                    updates.setdefault(ad_id, {}).update(values)
+                update_futures.append((future, list(payload)))
+
+        if appends:
+            try:
+                self.ledger.append_rows(appends)
+                for future in append_futures:
+                    future.set_result(True)
+            except Exception as e:
+                for future in append_futures:
+                    future.set_exception(e)
+                self._report(f"Failed to record {len(appends)} rows: {e}")
+
+        # Updates run after appends so an update queued right after its
+        # append finds the row.
+        if updates:
+            try:
+                results = self.ledger.update_latest_many(updates)
+                for future, ad_ids in update_futures:
+                    if isinstance(ad_ids, list):
+                        future.set_result({ad_id: results[ad_id] for ad_id in ad_ids})
+                    else:
+                        future.set_result(results[ad_ids])
+            except Exception as e:
+                for future, _ in update_futures:
+                    future.set_exception(e)
+                self._report(f"Failed to update {len(updates)} ads: {e}")
+
+    def _save(self):
+        try:
+            self.ledger.sync_excel(self.excel_path)
+            self._last_conflict = None
+            return None
+        except ExcelConflictError as e:
+            # Reported once; the ledger keeps every change until the file is fixed
+            if str(e) != self._last_conflict:
+                self._last_conflict = str(e)
+                self._report(str(e))
+            else:
+                logging.error(str(e))
+            return e
+        except Exception as e:
+            self._report(f"Failed to save Excel (is it open in another program?): {e}")
+            return e
+
+    def run(self):
+        dirty = False
+        while True:
+            try:
+                command = self._commands.get(timeout=self.debounce if dirty else None)
+            except queue.Empty:
+                self._save()
+                dirty = False
+                continue
+
+            batch = [command]
+            while True:
+                try:
+                    batch.append(self._commands.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._apply(batch)
+            if any(kind in ("append", "update", "update_many") for kind, _, _ in batch):
+                dirty = True
+
+            waiters = [(kind, future) for kind, _, future in batch if kind in ("flush", "stop")]
+            if waiters:
+                error = self._save()
+                dirty = False
+                for kind, future in waiters:
+                    if error:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(True)
+                if any(kind == "stop" for kind, _ in waiters):
+                    return
@@ -0,0 +1,278 @@
+# image_fetcher.py
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import requests
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from image_store import (
+    get_image_store,
+    store_root_for,
+    object_path,
+    DEFAULT_EXTENSION,
+    IMAGE_EXTENSIONS
+)
+from image_preprocess import preprocess_images, preprocessing_enabled
+
+MAX_WORKERS = 6
+CHUNK_SIZE = 64 * 1024
+REQUEST_TIMEOUT = 5
+MANIFEST_FILE = 'manifest.json'
+COMPLETE_MARKER = '.complete'
+DOWNLOAD_STAGE_WORKERS = 2
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_http_session():
+    """
+    Returns one keep-alive requests.Session shared by all image downloads.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS * 2, max_retries=2)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+def image_extension(url):
+    extension = os.path.splitext(urlparse(url).path)[1].lower()
+    return extension if extension in IMAGE_EXTENSIONS else DEFAULT_EXTENSION
+
+def download_image(url, store, stop_event=None, session=None):
+    """
+    Fetch one image into the content-addressed 'store' and return its
+    manifest entry: {"url", "file", "sha256", "ok", "cached", "error"}.
+
+    If the URL was fetched before, the request is conditional (ETag /
+    Last-Modified) and a 304 reuses the stored file without a body.
+    Otherwise the body is streamed to a temporary file while it is hashed,
+    and added to the store only when complete; content that is already
+    stored (the same photo in a reposted ad) is not written twice.
+    """
+    entry = {"url": url, "file": None, "sha256": None, "ok": False, "cached": False, "error": None}
+    if stop_event and stop_event.is_set():
+        entry["error"] = "stopped"
+        return entry
+
+    session = session or get_http_session()
+    cached = store.cached(url)
+    temp_path = store.temp_path()
+    try:
+        with session.get(url, timeout=REQUEST_TIMEOUT, stream=True,
+                         headers=store.conditional_headers(cached)) as response:
+            if response.status_code == 304 and cached:
+                entry.update(
+                    file=cached["digest"] + cached["extension"],
+                    sha256=cached["digest"],
+                    ok=True,
+                    cached=True
+                )
+                return entry
+            if response.status_code != 200:
+                entry["error"] = f"HTTP {response.status_code}"
+                return entry
+            digest = hashlib.sha256()
+            with open(temp_path, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    if stop_event and stop_event.is_set():
+                        entry["error"] = "stopped"
+                        break
+                    digest.update(chunk)
+                    f.write(chunk)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+        if entry["error"]:
+            os.remove(temp_path)
+            return entry
+        digest = digest.hexdigest()
+        extension = image_extension(url)
+        store.add_file(temp_path, digest, extension)
+        store.remember(url, digest, extension, etag, last_modified)
+        entry.update(file=digest + extension, sha256=digest, ok=True)
+    except Exception as e:
+        entry["error"] = str(e)
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    return entry
+
+def read_manifest(folder_name):
+    """
+    Returns the manifest in 'folder_name', or None if there is none.
+    """
+    try:
+        with open(os.path.join(folder_name, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable image manifest in {folder_name}: {e}")
+        return None
+
+def image_sort_key(file_name):
+    """
+    Sort '<ad_id>_<n>.jpg' files by n, so photos keep the listing's order.
+    """
+    stem = os.path.splitext(file_name)[0]
+    index = stem.rsplit("_", 1)[-1]
+    return (0, int(index), file_name) if index.isdigit() else (1, 0, file_name)
+
+def ad_image_paths(save_directory):
+    """
+    Absolute paths of an ad's downloaded images, in listing order.
+
+    Manifest entries with a 'sha256' point into the image store; older
+    ads, whose manifest names files in 'images/' (or who have no manifest
+    at all), are read from that folder.
+    """
+    images_directory = os.path.join(save_directory, "images")
+    manifest = read_manifest(images_directory)
+    if manifest is None:
+        if not os.path.isdir(images_directory):
+            return []
+        return [
+            os.path.abspath(os.path.join(images_directory, name))
+            for name in sorted(os.listdir(images_directory), key=image_sort_key)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+
+    store_root = store_root_for(save_directory)
+    paths = []
+    for entry in manifest:
+        if not entry.get("ok") or not entry.get("file"):
+            continue
+        if entry.get("sha256"):
+            path = object_path(store_root, entry["sha256"], os.path.splitext(entry["file"])[1])
+        else:
+            path = os.path.join(images_directory, entry["file"])
+        if os.path.exists(path):
+            paths.append(os.path.abspath(path))
+    return paths
+
+def write_manifest(folder_name, manifest):
+    try:
+        with open(os.path.join(folder_name, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=4)
+    except Exception as e:
+        logging.warning(f"Failed to write image manifest in {folder_name}: {e}")
+
+def fetch_images(urls, folder_name, ad_id, stop_event=None, max_workers=MAX_WORKERS, store=None):
+    """
+    Fetch all 'urls' into the image store on a bounded thread pool and
+    write the ad's manifest (one entry per URL, in listing order, naming
+    the stored file) to 'manifest.json' in 'folder_name'. By default the
+    store is the 'image_store' folder next to the data folder.
+    Returns the manifest.
+    """
+    os.makedirs(folder_name, exist_ok=True)
+    session = get_http_session()
+    if not urls:
+        write_manifest(folder_name, [])
+        return []
+    if store is None:
+        store = get_image_store(store_root_for(os.path.dirname(os.path.abspath(folder_name))))
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        futures = [
+            executor.submit(download_image, url, store, stop_event, session)
+            for url in urls
+        ]
+        manifest = [future.result() for future in futures]
+
+    failed = [entry for entry in manifest if not entry["ok"]]
+    for entry in failed:
+        logging.warning(f"Image download failed for ad {ad_id}: {entry['url']} ({entry['error']})")
+    cached = sum(1 for entry in manifest if entry["cached"])
+    logging.info(f"Fetched {len(manifest) - len(failed)}/{len(manifest)} images for ad {ad_id} "
+                 f"({cached} unchanged since the last scrape).")
+
+    write_manifest(folder_name, manifest)
+    return manifest
+
+_download_executor = ThreadPoolExecutor(max_workers=DOWNLOAD_STAGE_WORKERS, thread_name_prefix='image-download')
+_pending_downloads = {}
+_pending_lock = threading.Lock()
+
+def is_download_complete(save_directory):
+    """
+    True once the background stage has finished the images of this ad folder.
+    """
+    return os.path.exists(os.path.join(save_directory, COMPLETE_MARKER))
+
+def _download_ad_images(urls, save_directory, ad_id, stop_event=None):
+    images_directory = os.path.join(save_directory, "images")
+    manifest = fetch_images(urls, images_directory, ad_id, stop_event=stop_event)
+    if stop_event and stop_event.is_set():
+        logging.info(f"Image download for ad {ad_id} was stopped before completion.")
+        return manifest
+    if preprocessing_enabled():
+        # Prepare the upload-ready copies now, so the upload finds them cached
+        try:
+            preprocess_images(ad_image_paths(save_directory), store_root_for(save_directory))
+        except Exception as e:
+            logging.warning(f"Image preprocessing for ad {ad_id} failed: {e}")
+    with open(os.path.join(save_directory, COMPLETE_MARKER), 'w', encoding='utf-8') as f:
+        json.dump({
+            "downloaded": sum(1 for entry in manifest if entry["ok"]),
+            "failed": sum(1 for entry in manifest if not entry["ok"]),
+        }, f)
+    return manifest
+
+def schedule_image_download(urls, save_directory, ad_id, stop_event=None):
+    """
+    Queue the images of one ad on the background download stage and return
+    the Future. The ad folder gets a '.complete' marker when it finishes.
+    """
+    marker = os.path.join(save_directory, COMPLETE_MARKER)
+    if os.path.exists(marker):
+        os.remove(marker)
+
+    key = os.path.normcase(os.path.abspath(save_directory))
+    future = _download_executor.submit(_download_ad_images, urls, save_directory, ad_id, stop_event)
+    with _pending_lock:
+        _pending_downloads[key] = future
+
+    def forget(done_future):
+        with _pending_lock:
+            if _pending_downloads.get(key) is done_future:
+                del _pending_downloads[key]
+        if done_future.exception():
+            logging.error(f"Image download for ad {ad_id} failed: {done_future.exception()}")
+
+    future.add_done_callback(forget)
+    return future
+
+def wait_for_image_download(save_directory, timeout=None, stop_event=None):
+    """
+    Block until a pending background download for 'save_directory' finishes.
+    Returns True if there is nothing pending (or it completed), False on
+    timeout or stop_event.
+    """
+    key = os.path.normcase(os.path.abspath(save_directory))
+    with _pending_lock:
+        future = _pending_downloads.get(key)
+    if future is None:
+        return True
+
+    waited = 0.0
+    while not future.done():
+        if stop_event and stop_event.is_set():
+            return False
+        if timeout is not None and waited >= timeout:
+            return False
+        try:
+            future.result(timeout=0.2)
+        except Exception:
+            pass
+        waited += 0.2
+    return True
@@ -0,0 +1,152 @@
+# image_preprocess.py
+
+import os
+import re
+import atexit
+import hashlib
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it images are uploaded as downloaded
+    Image = None
+
+PROCESSED_DIR = 'processed'
+
+# config.json 'image_preprocessing' overrides these. Off unless enabled.
+DEFAULT_PREPROCESS_CONFIG = {
+    "enabled": False,
+    "max_width": 1600,
+    "max_height": 1600,
+    "quality": 85,
+    "workers": 2,
+}
+
+_DIGEST_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+_config = dict(DEFAULT_PREPROCESS_CONFIG)
+_executor = None
+_executor_lock = threading.Lock()
+_warned_missing_pillow = False
+
+def configure_image_preprocessing(user_config):
+    """
+    Apply config.json's 'image_preprocessing' section (numbers clamped to
+    at least 1, quality to 1-95). Returns the settings in effect.
+    """
+    global _config
+    config = dict(DEFAULT_PREPROCESS_CONFIG)
+    overrides = (user_config or {}).get("image_preprocessing") or {}
+    config["enabled"] = bool(overrides.get("enabled", config["enabled"]))
+    for key in ("max_width", "max_height", "quality", "workers"):
+        try:
+            config[key] = max(1, int(overrides.get(key, config[key])))
+        except (TypeError, ValueError):
+            logging.warning(f"Ignoring invalid image preprocessing setting {key}={overrides.get(key)!r}")
+    config["quality"] = min(config["quality"], 95)
+    _config = config
+    return config
+
+def preprocessing_enabled():
+    global _warned_missing_pillow
+    if not _config["enabled"]:
+        return False
+    if Image is None:
+        if not _warned_missing_pillow:
+            logging.warning("Image preprocessing is enabled but Pillow is not installed; skipping it.")
+            _warned_missing_pillow = True
+        return False
+    return True
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=_config["workers"])
+            atexit.register(_executor.shutdown)
+        return _executor
+
+def process_image(source, target, max_width, max_height, quality):
+    """
+    Runs in a worker process: orient, shrink to fit max_width x max_height,
+    and save as a JPEG at 'quality' without EXIF (camera data, GPS).
+    """
+    # Unique per process and thread: two uploads may process the same image at once
+    temp_path = f"{target}.{os.getpid()}-{threading.get_ident()}-{os.urandom(6).hex()}.tmp"
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            image.thumbnail((max_width, max_height), Image.LANCZOS)
+            image.save(temp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return target
+
+def source_digest(path):
+    """
+    sha256 of an image: the file name for image store objects, otherwise
+    hashed from the content.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if _DIGEST_NAME.match(stem):
+        return stem
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def processed_path(store_root, digest, config):
+    settings = f"{config['max_width']}x{config['max_height']}q{config['quality']}"
+    return os.path.join(store_root, PROCESSED_DIR, digest[:2], f"{digest}_{settings}.jpg")
+
+def preprocess_images(paths, store_root):
+    """
+    Return upload-ready versions of 'paths' (same order), resized and
+    recompressed on the process pool. Results are cached under
+    '<store_root>/processed' by source hash and settings, so an image is
+    processed once however often it is uploaded. Where processing fails or
+    doesn't make the file smaller, the original path is kept. With
+    preprocessing disabled (or Pillow missing) 'paths' is returned as is.
+    """
+    if not paths or not preprocessing_enabled():
+        return list(paths)
+    config = dict(_config)
+
+    results = list(paths)
+    pending = []
+    for index, path in enumerate(paths):
+        try:
+            target = processed_path(store_root, source_digest(path), config)
+        except OSError as e:
+            logging.warning(f"Could not read image {path} for preprocessing: {e}")
+            continue
+        if os.path.exists(target):
+            results[index] = target
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        future = _get_executor().submit(
+            process_image, path, target, config["max_width"], config["max_height"], config["quality"]
+        )
+        pending.append((index, target, future))
+
+    for index, target, future in pending:
+        try:
+            future.result()
+            results[index] = target
+        except Exception as e:
+            logging.warning(f"Image preprocessing failed for {paths[index]}: {e}")
+
+    for index, path in enumerate(paths):
+        if results[index] != path and os.path.getsize(results[index]) >= os.path.getsize(path):
+            results[index] = path
+    if pending:
+        logging.info(f"Preprocessed {len(pending)} images ({len(paths) - len(pending)} from cache).")
+    return results
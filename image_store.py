@@ -0,0 +1,127 @@
+# image_store.py
+
+import os
+import sqlite3
+import logging
+import datetime
+import threading
+
+IMAGE_STORE_DIR = 'image_store'
+OBJECTS_DIR = 'objects'
+CACHE_FILE = 'http_cache.sqlite3'
+DEFAULT_EXTENSION = '.jpg'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+def store_root_for(save_directory):
+    """
+    The image store of an ad folder: 'image_store' next to the data
+    folder that holds 'save_directory'.
+    """
+    data_dir = os.path.dirname(os.path.abspath(save_directory))
+    return os.path.join(os.path.dirname(data_dir), IMAGE_STORE_DIR)
+
+def object_path(root, digest, extension=DEFAULT_EXTENSION):
+    return os.path.join(root, OBJECTS_DIR, digest[:2], digest + extension)
+
+class ImageStore:
+    """
+    Content-addressed image files plus an HTTP cache.
+
+    Every image is stored once as 'objects/<2 hex>/<sha256><ext>', however
+    many ads use it. The cache remembers, per image URL, the digest it
+    resolved to and the response's ETag / Last-Modified, so a rescrape
+    sends a conditional request and a 304 costs neither a body nor a write.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(os.path.join(root, OBJECTS_DIR), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, CACHE_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS http_cache ("
+                "url TEXT PRIMARY KEY, digest TEXT NOT NULL, extension TEXT NOT NULL, "
+                "etag TEXT, last_modified TEXT, fetched_at TEXT NOT NULL)"
+            )
+
+    def object_path(self, digest, extension=DEFAULT_EXTENSION):
+        return object_path(self.root, digest, extension)
+
+    def has(self, digest, extension=DEFAULT_EXTENSION):
+        return os.path.exists(self.object_path(digest, extension))
+
+    def cached(self, url):
+        """
+        Returns the cache entry {"digest", "extension", "etag",
+        "last_modified"} of 'url' if its object is still on disk, else None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, extension, etag, last_modified FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or not self.has(row[0], row[1]):
+            return None
+        return {"digest": row[0], "extension": row[1], "etag": row[2], "last_modified": row[3]}
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def remember(self, url, digest, extension, etag=None, last_modified=None):
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache (url, digest, extension, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, digest, extension, etag, last_modified, now)
+            )
+
+    def temp_path(self):
+        """
+        A fresh temporary file name inside the store (same filesystem as
+        the objects, so add_file can rename instead of copy).
+        """
+        return os.path.join(self.root, f".{threading.get_ident()}-{os.urandom(6).hex()}.part")
+
+    def add_file(self, temp_path, digest, extension=DEFAULT_EXTENSION):
+        """
+        Move a fully written file into the store under its digest. If the
+        same content is already stored, the temporary file is dropped.
+        Returns the object path.
+        """
+        target = self.object_path(digest, extension)
+        if os.path.exists(target):
+            os.remove(temp_path)
+            return target
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(temp_path, target)
+        return target
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_image_store(root):
+    """
+    Returns the shared ImageStore for 'root' (one per store directory).
+    """
+    key = os.path.normcase(os.path.abspath(root))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            try:
+                store = ImageStore(root)
+            except Exception as e:
+                logging.error(f"Failed to open image store {root}: {e}")
+                raise
+            _stores[key] = store
+        return store
@@ -0,0 +1,428 @@
+# ledger.py
+
+import os
+import sqlite3
+import datetime
+import logging
+import threading
+import openpyxl
+from listing import FLOOR
+
+LEDGER_FILE = 'ledger.sqlite3'
+
+# Excel header -> ledger column, in the order the Excel sheet shows them.
+COLUMN_MAP = [
+    ("Uploaded Timestamp", "uploaded_timestamp"),
+    ("მესაკუთრის ID", "ad_id"),
+    ("ტელეფონის ნომერი", "phone_number"),
+    ("ოთახი", "rooms"),
+    ("სართული", "floor"),
+    ("მისამართი", "address"),
+    ("სააგენტოს ფასი", "agency_price"),
+    ("მესაკუთრის ფასი", "owner_price"),
+    ("Comment", "comment"),
+    ("ss.ge", "ss_ge"),
+]
+# 'Uploaded Timestamp' of ads that were scraped but not uploaded.
+SCRAPE_ONLY = "SCRAPE ONLY"
+EXCEL_COLUMNS = [header for header, _ in COLUMN_MAP]
+HEADER_TO_COLUMN = dict(COLUMN_MAP)
+
+class ExcelConflictError(Exception):
+    """
+    scraped_data.xlsx was changed in a way the ledger can't merge, so it is
+    left untouched rather than overwritten.
+    """
+
+def build_excel_row(listing, comment, uploaded_timestamp=""):
+    """
+    Build the Excel/ledger row for one scraped Listing.
+    """
+    return {
+        "Uploaded Timestamp": uploaded_timestamp,
+        "მესაკუთრის ID": listing.ad_id,
+        "ტელეფონის ნომერი": listing.phone_number,
+        "ოთახი": listing.rooms,
+        "სართული": listing.property_details.get(FLOOR, ""),
+        "მისამართი": listing.address,
+        "სააგენტოს ფასი": listing.agency_price,
+        "მესაკუთრის ფასი": listing.owner_price,
+        "Comment": comment,
+        "ss.ge": ""
+    }
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value != value:  # NaN from empty cells
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+class Ledger:
+    """
+    Append-only SQLite record of every scraped ad; the system of record
+    behind scraped_data.xlsx, which is regenerated from it on demand.
+
+    Inserts are single-row appends and lookups by ad ID use an index, so the
+    cost per ad no longer grows with the size of the sheet.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f"{column} TEXT NOT NULL DEFAULT ''" for _, column in COLUMN_MAP)
+        with self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS listings ("
+                f"seq INTEGER PRIMARY KEY AUTOINCREMENT, {columns}, created_at TEXT NOT NULL DEFAULT '')"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_listings_ad_id ON listings(ad_id)")
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(listings)")}
+            # excel_row: row number of this record in the workbook (NULL = not written yet)
+            # excel_dirty: record has changes the workbook doesn't have yet
+            if "excel_row" not in existing:
+                self._conn.execute("ALTER TABLE listings ADD COLUMN excel_row INTEGER")
+            if "excel_dirty" not in existing:
+                self._conn.execute("ALTER TABLE listings ADD COLUMN excel_dirty INTEGER NOT NULL DEFAULT 1")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_listings_dirty ON listings(excel_dirty)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+    def append_rows(self, rows):
+        """
+        Append rows keyed by Excel header in one transaction.
+        """
+        if not rows:
+            return
+        columns = [column for _, column in COLUMN_MAP] + ["created_at"]
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        values = [
+            [_cell_text(row.get(header, "")) for header, _ in COLUMN_MAP] + [now]
+            for row in rows
+        ]
+        placeholders = ", ".join("?" for _ in columns)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO listings ({', '.join(columns)}) VALUES ({placeholders})",
+                values
+            )
+
+    def update_latest(self, ad_id, values):
+        """
+        Set Excel-header keyed 'values' on the most recent row for 'ad_id'.
+        Returns False if the ad is not in the ledger.
+        """
+        return self.update_latest_many({ad_id: values})[ad_id]
+
+    def update_latest_many(self, updates):
+        """
+        Apply {ad_id: values} to the latest row of each ad in one transaction.
+        Returns {ad_id: updated} where updated is False for unknown ads.
+        """
+        results = {}
+        with self._lock, self._conn:
+            for ad_id, values in updates.items():
+                row = self._conn.execute(
+                    "SELECT seq FROM listings WHERE ad_id = ? ORDER BY seq DESC LIMIT 1",
+                    (str(ad_id),)
+                ).fetchone()
+                if row is None or not values:
+                    results[ad_id] = row is not None
+                    continue
+                assignments = ", ".join(f"{HEADER_TO_COLUMN[header]} = ?" for header in values)
+                self._conn.execute(
+                    f"UPDATE listings SET {assignments}, excel_dirty = 1 WHERE seq = ?",
+                    [_cell_text(value) for value in values.values()] + [row[0]]
+                )
+                results[ad_id] = True
+        return results
+
+    def not_uploaded_ad_ids(self):
+        """
+        Ad IDs whose latest row has neither an upload timestamp (never
+        uploaded or scrape-only) nor an ss.ge URL, oldest first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT l.ad_id FROM listings l "
+                "JOIN (SELECT ad_id, MAX(seq) AS seq FROM listings GROUP BY ad_id) latest "
+                "ON l.seq = latest.seq "
+                "WHERE l.uploaded_timestamp IN ('', ?) AND l.ss_ge = '' ORDER BY l.seq",
+                (SCRAPE_ONLY,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def uploaded_urls(self, ad_ids):
+        """
+        {ad_id: ss.ge URL} for those of 'ad_ids' whose latest row has been
+        uploaded: it has an upload timestamp or an ss.ge URL (the URL may be
+        empty for old rows).
+        """
+        ad_ids = [str(ad_id) for ad_id in ad_ids]
+        if not ad_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in ad_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT l.ad_id, l.ss_ge FROM listings l "
+                "JOIN (SELECT ad_id, MAX(seq) AS seq FROM listings "
+                f"WHERE ad_id IN ({placeholders}) GROUP BY ad_id) latest "
+                "ON l.seq = latest.seq "
+                "WHERE l.uploaded_timestamp NOT IN ('', ?) OR l.ss_ge != ''",
+                ad_ids + [SCRAPE_ONLY]
+            ).fetchall()
+        return dict(rows)
+
+    def get_latest(self, ad_id):
+        """
+        Returns the most recent row for 'ad_id' keyed by Excel header, or None.
+        """
+        columns = ", ".join(column for _, column in COLUMN_MAP)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {columns} FROM listings WHERE ad_id = ? ORDER BY seq DESC LIMIT 1",
+                (str(ad_id),)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(EXCEL_COLUMNS, row))
+
+    def iter_rows(self):
+        """
+        Yields every row as a list of values in EXCEL_COLUMNS order.
+        """
+        columns = ", ".join(column for _, column in COLUMN_MAP)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {columns} FROM listings ORDER BY seq").fetchall()
+        for row in rows:
+            yield list(row)
+
+    def import_excel(self, excel_path):
+        """
+        One-time migration: copy the rows of an existing scraped_data.xlsx
+        into an empty ledger. Returns the number of rows imported.
+        """
+        if self.count() or not os.path.exists(excel_path):
+            return 0
+        wb = openpyxl.load_workbook(excel_path, read_only=True)
+        try:
+            ws = wb.active
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header:
+                return 0
+            records = [
+                {name: value for name, value in zip(header, values) if name in HEADER_TO_COLUMN}
+                for values in rows
+            ]
+            records = [record for record in records if _cell_text(record.get("მესაკუთრის ID"))]
+        finally:
+            wb.close()
+        self.append_rows(records)
+        logging.info(f"Imported {len(records)} rows from {excel_path} into the ledger.")
+        return len(records)
+
+    def pending_excel_changes(self):
+        """
+        Number of ledger rows not yet reflected in the workbook.
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM listings WHERE excel_dirty = 1").fetchone()[0]
+
+    def _get_meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _record_excel_state(self, excel_path, row_count):
+        stat = os.stat(excel_path)
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("excel_path", os.path.abspath(excel_path)),
+                    ("excel_mtime_ns", str(stat.st_mtime_ns)),
+                    ("excel_rows", str(row_count)),
+                ]
+            )
+
+    def _read_workbook(self, excel_path):
+        """
+        Returns the data rows of the workbook as lists of cell text in
+        EXCEL_COLUMNS order. Raises ExcelConflictError if its header is not
+        the one the ledger writes.
+        """
+        wb = openpyxl.load_workbook(excel_path, read_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = [_cell_text(value) for value in (next(rows, None) or ())]
+            while header and not header[-1]:
+                header.pop()
+            if header != EXCEL_COLUMNS:
+                raise ExcelConflictError(
+                    f"{excel_path} has different columns than the app writes "
+                    f"({', '.join(header) or 'no header'}). It was not overwritten; "
+                    f"move or rename it so the app can create a new one."
+                )
+            data = []
+            for values in rows:
+                cells = [_cell_text(value) for value in list(values)[:len(EXCEL_COLUMNS)]]
+                data.append(cells + [""] * (len(EXCEL_COLUMNS) - len(cells)))
+        finally:
+            wb.close()
+        while data and not any(data[-1]):
+            data.pop()
+        return data
+
+    def _merge_workbook(self, excel_path):
+        """
+        Fold changes made to the workbook outside the app (edited cells,
+        added rows) into the ledger before it is rewritten.
+
+        Workbook rows are matched to ledger rows by their recorded row
+        number (or, for a workbook the app has not written yet, by position
+        among the rows that have an Ad ID).
+        If rows were deleted or reordered, the match is ambiguous and
+        ExcelConflictError is raised instead, so nothing is lost.
+        """
+        workbook_rows = self._read_workbook(excel_path)
+        columns = ", ".join(column for _, column in COLUMN_MAP)
+        ad_id_index = EXCEL_COLUMNS.index("მესაკუთრის ID")
+        if self._get_meta("excel_path") == os.path.abspath(excel_path):
+            placed = self._conn.execute(
+                f"SELECT seq, excel_row, {columns} FROM listings WHERE excel_row IS NOT NULL ORDER BY excel_row"
+            ).fetchall()
+            placed = [(excel_row - 2, seq, list(values)) for seq, excel_row, *values in placed]
+        else:
+            # Rows without an Ad ID were skipped by import_excel, so skip them here too
+            with_id = [position for position, cells in enumerate(workbook_rows) if cells[ad_id_index]]
+            placed = self._conn.execute(f"SELECT seq, {columns} FROM listings ORDER BY seq").fetchall()
+            placed = [(with_id[n], seq, list(values)) for n, (seq, *values) in enumerate(placed[:len(with_id)])]
+
+        conflict = ExcelConflictError(
+            f"Rows of {excel_path} were deleted or reordered outside the app, so its changes can't be "
+            f"matched to the ledger. It was not overwritten; undo those changes or move the file away."
+        )
+        changed = []
+        for position, seq, values in placed:
+            if position >= len(workbook_rows):
+                raise conflict
+            cells = workbook_rows[position]
+            if cells[ad_id_index] != values[ad_id_index]:
+                raise conflict
+            if cells != values:
+                changed.append(cells + [seq])
+        matched = max((position for position, _, _ in placed), default=-1) + 1
+        added = [
+            dict(zip(EXCEL_COLUMNS, cells)) for cells in workbook_rows[matched:]
+            if cells[ad_id_index]
+        ]
+
+        if changed:
+            assignments = ", ".join(f"{column} = ?" for _, column in COLUMN_MAP)
+            with self._conn:
+                self._conn.executemany(
+                    f"UPDATE listings SET {assignments}, excel_dirty = 1 WHERE seq = ?", changed
+                )
+        if added:
+            self.append_rows(added)
+        if changed or added:
+            logging.info(f"Merged {len(changed)} edited and {len(added)} added rows from {excel_path} into the ledger.")
+
+    def _excel_in_sync(self, excel_path):
+        """
+        True if the workbook is the one we last wrote (not replaced or
+        edited since), so the stored row numbers still point at the right rows.
+        """
+        if not os.path.exists(excel_path):
+            return False
+        if self._get_meta("excel_path") != os.path.abspath(excel_path):
+            return False
+        return self._get_meta("excel_mtime_ns") == str(os.stat(excel_path).st_mtime_ns)
+
+    def sync_excel(self, excel_path):
+        """
+        Bring the workbook up to date with the ledger in a single save.
+
+        Changed rows are written straight to their stored row number and new
+        rows are appended, with no scan for the ad ID. If the workbook is
+        missing it is regenerated. If it was modified outside the app, those
+        edits are merged into the ledger first (see _merge_workbook) and it
+        is then regenerated; ExcelConflictError means it was left as is.
+        Returns the number of rows written.
+        """
+        columns = ", ".join(column for _, column in COLUMN_MAP)
+        with self._lock:
+            if not self._excel_in_sync(excel_path):
+                if os.path.exists(excel_path):
+                    self._merge_workbook(excel_path)
+                return self.export_excel(excel_path)
+
+            pending = self._conn.execute(
+                f"SELECT seq, excel_row, {columns} FROM listings WHERE excel_dirty = 1 ORDER BY seq"
+            ).fetchall()
+            if not pending:
+                return 0
+
+            wb = openpyxl.load_workbook(excel_path)
+            ws = wb.active
+            next_row = int(self._get_meta("excel_rows") or ws.max_row) + 1
+            assigned = []
+            for seq, excel_row, *values in pending:
+                if excel_row is None:
+                    excel_row = next_row
+                    next_row += 1
+                for column_index, value in enumerate(values, start=1):
+                    ws.cell(row=excel_row, column=column_index, value=value)
+                assigned.append((excel_row, seq))
+
+            temp_path = excel_path + '.tmp'
+            wb.save(temp_path)
+            os.replace(temp_path, excel_path)
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE listings SET excel_row = ?, excel_dirty = 0 WHERE seq = ?",
+                    assigned
+                )
+            self._record_excel_state(excel_path, next_row - 1)
+            logging.info(f"Flushed {len(assigned)} pending rows to {excel_path}.")
+            return len(assigned)
+
+    def export_excel(self, excel_path):
+        """
+        Regenerate the Excel file from the ledger. Writes to a temporary
+        file first so a failed export never leaves a truncated workbook.
+        Callers merge an existing workbook first (sync_excel does).
+        """
+        with self._lock:
+            wb = openpyxl.Workbook(write_only=True)
+            ws = wb.create_sheet()
+            ws.append(EXCEL_COLUMNS)
+            columns = ", ".join(column for _, column in COLUMN_MAP)
+            placements = []
+            for excel_row, (seq, *values) in enumerate(
+                    self._conn.execute(f"SELECT seq, {columns} FROM listings ORDER BY seq"), start=2):
+                ws.append(values)
+                placements.append((excel_row, seq))
+            temp_path = excel_path + '.tmp'
+            wb.save(temp_path)
+            os.replace(temp_path, excel_path)
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE listings SET excel_row = ?, excel_dirty = 0 WHERE seq = ?",
+                    placements
+                )
+            row_count = len(placements)
+            self._record_excel_state(excel_path, row_count + 1)
+            logging.info(f"Exported ledger to {excel_path}.")
+            return row_count
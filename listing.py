@@ -0,0 +1,232 @@
+# listing.py
+
+import os
+import re
+import json
+from dataclasses import dataclass, field
+
+# Version of the '<ad_id>.json' layout written by save_listing. Files
+# without 'schema_version' are the original scraper output (version 0).
+# Version 2: numbers re-parsed after the thousands-group / minus sign fix;
+# the 'parsed' values of older files are recomputed on load.
+SCHEMA_VERSION = 2
+
+# ss.ge labels used as keys in the detail dicts
+ROOMS = "ოთახი"
+BEDROOMS = "საძინებელი"
+TOTAL_AREA = "საერთო ფართი"
+FLOOR = "სართული"
+TOTAL_FLOORS = "სართულიანობა"
+BATHROOMS = "სველი წერტილი"
+STATUS = "სტატუსი"
+CONDITION = "მდგომარეობა"
+FEATURE_YES = "კი"
+
+# Optional minus (not a hyphen inside a word), then either digits grouped
+# in threes by spaces or commas ('1,200,000', '120 000') or plain digits,
+# then an optional decimal part ('75,5', '1,200.50').
+_NUMBER = re.compile(
+    r"(?P<sign>(?<![\w.-])-)?"
+    r"(?P<whole>\d{1,3}(?:[\s,]\d{3})+(?!\d)|\d+)"
+    r"(?:[.,](?P<fraction>\d+))?"
+)
+
+def parse_number(text):
+    """
+    Parse the first number out of a scraped string such as '75 მ²',
+    '120 000 $', '1,200,000' or '-1'. Spaces and commas between groups of
+    three digits are thousands separators; otherwise a comma is a decimal
+    comma ('75,5'). Returns a float, or None if there is no number.
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = _NUMBER.search(str(text))
+    if not match:
+        return None
+    number = re.sub(r"[\s,]", "", match.group("whole"))
+    if match.group("fraction"):
+        number += "." + match.group("fraction")
+    return -float(number) if match.group("sign") else float(number)
+
+def parse_int(text):
+    number = parse_number(text)
+    return int(number) if number is not None else None
+
+def format_number(value):
+    """
+    Render a parsed number for a form field: '75' rather than '75.0'.
+    """
+    if value is None:
+        return ""
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+def _text(value):
+    return "" if value is None else str(value)
+
+@dataclass(slots=True)
+class Listing:
+    """
+    One scraped ss.ge listing.
+
+    The text fields and detail dicts keep what the page showed (the Excel
+    sheet and the upload form use those); the numeric fields are parsed
+    once, when the listing is scraped or loaded, so nothing downstream has
+    to parse strings again.
+    """
+    ad_id: str
+    title: str = ""
+    location: str = ""
+    number: str = ""
+    images: tuple = ()
+    owner_price: str = ""
+    agency_price: str = ""
+    phone_number: str = ""
+    name: str = ""
+    description: str = ""
+    comment: str = ""
+    property_details: dict = field(default_factory=dict)
+    additional_info: dict = field(default_factory=dict)
+    breadcrumbs: dict = field(default_factory=dict)
+    features: dict = field(default_factory=dict)
+    total_area: float = None
+    floor: int = None
+    total_floors: int = None
+    owner_price_value: float = None
+    agency_price_value: float = None
+
+    def parse_numbers(self):
+        """
+        (Re)compute the numeric fields from the text fields.
+        """
+        self.total_area = parse_number(self.property_details.get(TOTAL_AREA))
+        self.floor = parse_int(self.property_details.get(FLOOR))
+        self.total_floors = parse_int(self.property_details.get(TOTAL_FLOORS))
+        self.owner_price_value = parse_number(self.owner_price)
+        self.agency_price_value = parse_number(self.agency_price)
+        return self
+
+    @property
+    def property_type(self):
+        return self.breadcrumbs.get("property_type", "")
+
+    @property
+    def transaction_type(self):
+        return self.breadcrumbs.get("transaction_type", "")
+
+    @property
+    def rooms(self):
+        return self.property_details.get(ROOMS, "")
+
+    @property
+    def bedrooms(self):
+        return self.property_details.get(BEDROOMS, "")
+
+    @property
+    def bathrooms(self):
+        return self.additional_info.get(BATHROOMS, "")
+
+    @property
+    def status(self):
+        return self.additional_info.get(STATUS, "")
+
+    @property
+    def condition(self):
+        return self.additional_info.get(CONDITION, "")
+
+    @property
+    def address(self):
+        return f"{self.location} {self.number}".strip()
+
+    def has_feature(self, name):
+        return self.features.get(name) == FEATURE_YES
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a Listing from a '<ad_id>.json' dict of any schema version.
+        """
+        version = data.get("schema_version", 0)
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"Listing schema version {version} is newer than supported ({SCHEMA_VERSION}).")
+        listing = cls(
+            ad_id=_text(data.get("ad_id")),
+            title=_text(data.get("ad_title")),
+            location=_text(data.get("location")),
+            number=_text(data.get("number")),
+            images=tuple(data.get("images") or ()),
+            owner_price=_text(data.get("owner_price")),
+            agency_price=_text(data.get("agency_price")),
+            phone_number=_text(data.get("phone_number")),
+            name=_text(data.get("name")),
+            description=_text(data.get("description")),
+            comment=_text(data.get("comment")),
+            property_details=dict(data.get("property_details") or {}),
+            additional_info=dict(data.get("additional_info") or {}),
+            breadcrumbs=dict(data.get("breadcrumbs") or {}),
+            features=dict(data.get("features") or {}),
+        )
+        parsed = data.get("parsed")
+        if version == SCHEMA_VERSION and isinstance(parsed, dict):
+            listing.total_area = parsed.get("total_area")
+            listing.floor = parsed.get("floor")
+            listing.total_floors = parsed.get("total_floors")
+            listing.owner_price_value = parsed.get("owner_price")
+            listing.agency_price_value = parsed.get("agency_price")
+        else:
+            listing.parse_numbers()
+        return listing
+
+    def to_dict(self):
+        """
+        The current-schema JSON form. Keys of the original layout are kept,
+        so older readers of '<ad_id>.json' still work.
+        """
+        return {
+            "schema_version": SCHEMA_VERSION,
+            "ad_id": self.ad_id,
+            "ad_title": self.title,
+            "location": self.location,
+            "number": self.number,
+            "images": list(self.images),
+            "owner_price": self.owner_price,
+            "agency_price": self.agency_price,
+            "phone_number": self.phone_number,
+            "name": self.name,
+            "description": self.description,
+            "comment": self.comment,
+            "property_details": self.property_details,
+            "additional_info": self.additional_info,
+            "breadcrumbs": self.breadcrumbs,
+            "features": self.features,
+            "parsed": {
+                "total_area": self.total_area,
+                "floor": self.floor,
+                "total_floors": self.total_floors,
+                "owner_price": self.owner_price_value,
+                "agency_price": self.agency_price_value,
+            },
+        }
+
+def dumps(listing):
+    return json.dumps(listing.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+def loads(text):
+    return Listing.from_dict(json.loads(text))
+
+def listing_path(output_dir, ad_id):
+    return os.path.join(output_dir, ad_id, f"{ad_id}.json")
+
+def save_listing(listing, path):
+    """
+    Write the listing to 'path' (compact JSON, replaced atomically).
+    """
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(dumps(listing))
+    os.replace(temp_path, path)
+
+def load_listing(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return loads(f.read())
@@ -0,0 +1,352 @@
+# listing_index.py
+
+import os
+import re
+import sqlite3
+import logging
+import threading
+from listing import load_listing, listing_path, parse_number
+from image_fetcher import is_download_complete, ad_image_paths
+from duplicates import (
+    phone_key,
+    address_key,
+    image_hash,
+    image_hashing_available,
+    hash_bands,
+    to_signed,
+    to_unsigned,
+    HASH_BANDS,
+    MAX_HASHED_IMAGES
+)
+
+INDEX_FILE = 'listing_index.sqlite3'
+DEFAULT_SEARCH_LIMIT = 200
+# Bumped when what _store() writes changes; older rows are then re-read.
+INDEX_VERSION = 2
+# Listings written per transaction by update(); searches and duplicate
+# checks get the lock between batches instead of waiting for a full rebuild.
+UPDATE_BATCH_SIZE = 200
+
+# Numeric filters accepted by ListingIndex.search: name -> column
+RANGE_COLUMNS = {
+    "rooms": "rooms",
+    "floor": "floor",
+    "area": "total_area",
+    "price": "agency_price",
+}
+RESULT_COLUMNS = [
+    "ad_id", "address", "name", "phone_number", "rooms", "floor",
+    "total_floors", "total_area", "agency_price", "owner_price",
+]
+
+def _fts_phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+def _search_word(word):
+    # A phone typed with its country code ('995599123456') is looked up by
+    # the last 9 digits, which every indexed phone carries
+    if word.isdigit() and len(word) > 9:
+        return phone_key(word)
+    return word
+
+class ListingIndex:
+    """
+    SQLite index over every 'data/<ad_id>/<ad_id>.json'.
+
+    Text (title, address, owner name, phone number, description, features)
+    goes into an FTS5 table; rooms, floor, area and prices are indexed
+    columns for range filters. update() only re-reads JSON files whose
+    mtime changed since they were indexed, so keeping the index current
+    costs one stat() per ad.
+
+    It also keeps the fingerprints duplicates.DuplicateDetector queries:
+    normalised phone and address keys and, once an ad's images are
+    downloaded (and Pillow is installed), perceptual hashes of its images.
+    """
+
+    def __init__(self, path, data_dir):
+        self.path = path
+        self.data_dir = data_dir
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS listings ("
+                "id INTEGER PRIMARY KEY, ad_id TEXT NOT NULL UNIQUE, mtime_ns INTEGER NOT NULL, "
+                "address TEXT NOT NULL DEFAULT '', name TEXT NOT NULL DEFAULT '', "
+                "phone_number TEXT NOT NULL DEFAULT '', property_type TEXT NOT NULL DEFAULT '', "
+                "transaction_type TEXT NOT NULL DEFAULT '', rooms REAL, floor INTEGER, "
+                "total_floors INTEGER, total_area REAL, agency_price REAL, owner_price REAL)"
+            )
+            for column in RANGE_COLUMNS.values():
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_listings_{column} ON listings({column})")
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5("
+                "title, address, name, phone, description, features, tokenize='unicode61')"
+            )
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(listings)")}
+            fingerprint_columns = {
+                "phone_key": "TEXT NOT NULL DEFAULT ''",
+                "address_key": "TEXT NOT NULL DEFAULT ''",
+                "images_hashed": "INTEGER NOT NULL DEFAULT 0",
+            }
+            missing = [column for column in fingerprint_columns if column not in existing]
+            for column in missing:
+                self._conn.execute(f"ALTER TABLE listings ADD COLUMN {column} {fingerprint_columns[column]}")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if missing or version < INDEX_VERSION:
+                # Rows indexed in an older format are re-read on the next update()
+                self._conn.execute("UPDATE listings SET mtime_ns = 0")
+                self._conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_listings_phone_key ON listings(phone_key)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_listings_address_key ON listings(address_key)")
+            bands = ", ".join(f"b{band} INTEGER NOT NULL" for band in range(HASH_BANDS))
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS image_hashes ("
+                f"listing_id INTEGER NOT NULL, hash INTEGER NOT NULL, {bands})"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_image_hashes_listing ON image_hashes(listing_id)")
+            for band in range(HASH_BANDS):
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_image_hashes_b{band} ON image_hashes(b{band})")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+    def _store(self, listing, mtime_ns):
+        row = self._conn.execute("SELECT id FROM listings WHERE ad_id = ?", (listing.ad_id,)).fetchone()
+        values = (
+            listing.ad_id, mtime_ns, listing.address, listing.name, listing.phone_number,
+            listing.property_type, listing.transaction_type, parse_number(listing.rooms),
+            listing.floor, listing.total_floors, listing.total_area,
+            listing.agency_price_value, listing.owner_price_value,
+            phone_key(listing.phone_number), address_key(listing.location, listing.number),
+        )
+        if row is None:
+            rowid = self._conn.execute(
+                "INSERT INTO listings (ad_id, mtime_ns, address, name, phone_number, property_type, "
+                "transaction_type, rooms, floor, total_floors, total_area, agency_price, owner_price, "
+                "phone_key, address_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                values
+            ).lastrowid
+        else:
+            rowid = row[0]
+            self._conn.execute(
+                "UPDATE listings SET ad_id = ?, mtime_ns = ?, address = ?, name = ?, phone_number = ?, "
+                "property_type = ?, transaction_type = ?, rooms = ?, floor = ?, total_floors = ?, "
+                "total_area = ?, agency_price = ?, owner_price = ?, phone_key = ?, address_key = ?, "
+                "images_hashed = 0 WHERE id = ?",
+                values + (rowid,)
+            )
+            self._conn.execute("DELETE FROM listings_fts WHERE rowid = ?", (rowid,))
+            self._conn.execute("DELETE FROM image_hashes WHERE listing_id = ?", (rowid,))
+
+        # The phone is indexed as shown, as bare digits and as its last 9
+        # digits, so '599 12 34 56', '599123456' and '+995599123456' all
+        # find each other.
+        phone_digits = re.sub(r"\D", "", listing.phone_number)
+        phone_text = " ".join(dict.fromkeys(
+            part for part in (listing.phone_number, phone_digits, phone_key(listing.phone_number)) if part
+        ))
+        features = " ".join(name for name in listing.features if listing.has_feature(name))
+        self._conn.execute(
+            "INSERT INTO listings_fts (rowid, title, address, name, phone, description, features) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (rowid, listing.title, listing.address, listing.name,
+             phone_text, listing.description, features)
+        )
+
+    def _remove(self, ad_ids):
+        for ad_id in ad_ids:
+            row = self._conn.execute("SELECT id FROM listings WHERE ad_id = ?", (ad_id,)).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM listings_fts WHERE rowid = ?", row)
+                self._conn.execute("DELETE FROM image_hashes WHERE listing_id = ?", row)
+                self._conn.execute("DELETE FROM listings WHERE id = ?", row)
+
+    def update(self, ad_ids=None):
+        """
+        Index new and changed listings and drop deleted ones. With 'ad_ids'
+        only those ads are checked (e.g. right after a scrape); otherwise
+        the whole data folder is. Returns the number of listings (re)indexed.
+
+        Files are read outside the lock and committed UPDATE_BATCH_SIZE
+        listings at a time.
+        """
+        with self._lock:
+            known = dict(self._conn.execute("SELECT ad_id, mtime_ns FROM listings"))
+        if ad_ids is None:
+            if os.path.isdir(self.data_dir):
+                with os.scandir(self.data_dir) as entries:
+                    ad_ids = [entry.name for entry in entries if entry.is_dir()]
+            else:
+                ad_ids = []
+            removed = set(known) - set(ad_ids)
+        else:
+            removed = set()
+
+        changed = []
+        for ad_id in ad_ids:
+            path = listing_path(self.data_dir, ad_id)
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                if ad_id in known:
+                    removed.add(ad_id)
+                continue
+            if known.get(ad_id) != mtime_ns:
+                changed.append((ad_id, path, mtime_ns))
+
+        if removed:
+            with self._lock, self._conn:
+                self._remove(removed)
+        indexed = 0
+        for start in range(0, len(changed), UPDATE_BATCH_SIZE):
+            batch = []
+            for ad_id, path, mtime_ns in changed[start:start + UPDATE_BATCH_SIZE]:
+                try:
+                    listing = load_listing(path)
+                except Exception as e:
+                    logging.warning(f"Skipping unreadable listing {path} in search index: {e}")
+                    continue
+                listing.ad_id = listing.ad_id or ad_id
+                batch.append((listing, mtime_ns))
+            with self._lock, self._conn:
+                for listing, mtime_ns in batch:
+                    self._store(listing, mtime_ns)
+            indexed += len(batch)
+        hashed = self._hash_images(ad_ids)
+        if indexed or removed or hashed:
+            logging.info(f"Listing index: {indexed} indexed, {len(removed)} removed, "
+                         f"images of {hashed} hashed.")
+        return indexed
+
+    def _hash_images(self, ad_ids):
+        """
+        Hash the images of indexed ads whose download has completed and
+        that have not been hashed yet. Returns the number of ads hashed.
+        """
+        if not image_hashing_available():
+            return 0
+        wanted = set(ad_ids)
+        with self._lock:
+            pending = [
+                (rowid, ad_id) for rowid, ad_id in
+                self._conn.execute("SELECT id, ad_id FROM listings WHERE images_hashed = 0")
+                if ad_id in wanted
+            ]
+        hashed = 0
+        for rowid, ad_id in pending:
+            if not is_download_complete(os.path.join(self.data_dir, ad_id)):
+                continue
+            paths = ad_image_paths(os.path.join(self.data_dir, ad_id))[:MAX_HASHED_IMAGES]
+            hashes = {image_hash(path) for path in paths}
+            hashes.discard(None)
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM image_hashes WHERE listing_id = ?", (rowid,))
+                self._conn.executemany(
+                    f"INSERT INTO image_hashes (listing_id, hash, "
+                    f"{', '.join(f'b{band}' for band in range(HASH_BANDS))}) "
+                    f"VALUES (?, ?, {', '.join('?' for _ in range(HASH_BANDS))})",
+                    [(rowid, to_signed(value), *hash_bands(value)) for value in hashes]
+                )
+                self._conn.execute("UPDATE listings SET images_hashed = 1 WHERE id = ?", (rowid,))
+            hashed += 1
+        return hashed
+
+    def fingerprint_candidates(self, exclude_ad_id, phone, address, total_area, floor):
+        """
+        Other ads sharing the phone key, the address key, or the floor with
+        an area within 1 m². Rows are (ad_id, phone_key, address_key,
+        total_area, floor).
+        """
+        clauses = []
+        params = [exclude_ad_id]
+        if phone:
+            clauses.append("phone_key = ?")
+            params.append(phone)
+        if address:
+            clauses.append("address_key = ?")
+            params.append(address)
+        if total_area is not None and floor is not None:
+            clauses.append("(floor = ? AND total_area BETWEEN ? AND ?)")
+            params += [floor, total_area - 1, total_area + 1]
+        if not clauses:
+            return []
+        with self._lock:
+            return self._conn.execute(
+                "SELECT ad_id, phone_key, address_key, total_area, floor FROM listings "
+                f"WHERE ad_id != ? AND ({' OR '.join(clauses)})",
+                params
+            ).fetchall()
+
+    def image_hashes(self, ad_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT h.hash FROM image_hashes h JOIN listings l ON l.id = h.listing_id WHERE l.ad_id = ?",
+                (ad_id,)
+            ).fetchall()
+        return [to_unsigned(row[0]) for row in rows]
+
+    def similar_image_candidates(self, exclude_ad_id, value):
+        """
+        (ad_id, hash) of other ads' images sharing at least one band with
+        'value'; the caller checks the actual distance.
+        """
+        bands = hash_bands(value)
+        condition = " OR ".join(f"h.b{band} = ?" for band in range(HASH_BANDS))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT l.ad_id, h.hash FROM image_hashes h JOIN listings l ON l.id = h.listing_id "
+                f"WHERE l.ad_id != ? AND ({condition})",
+                [exclude_ad_id] + bands
+            ).fetchall()
+        return [(ad_id, to_unsigned(value)) for ad_id, value in rows]
+
+    def search(self, text="", features=(), limit=DEFAULT_SEARCH_LIMIT, **ranges):
+        """
+        Find listings matching every word of 'text' (prefix match over
+        title, address, owner name, phone and description), having every
+        feature in 'features', and within the given ranges, passed as
+        <name>_min / <name>_max for each name in RANGE_COLUMNS
+        (e.g. price_max=120000, floor_min=2).
+
+        Returns dicts keyed by RESULT_COLUMNS, best text match first (or
+        most recently scraped first when there is no text).
+        """
+        terms = [_fts_phrase(_search_word(word)) + "*" for word in re.findall(r"\w+", text or "")]
+        terms += [f"features : {_fts_phrase(feature)}" for feature in features if feature]
+
+        where = []
+        params = []
+        for name, column in RANGE_COLUMNS.items():
+            for suffix, operator in (("_min", ">="), ("_max", "<=")):
+                value = ranges.pop(name + suffix, None)
+                if value is not None:
+                    where.append(f"l.{column} {operator} ?")
+                    params.append(value)
+        if ranges:
+            raise TypeError(f"Unknown search filters: {', '.join(ranges)}")
+
+        columns = ", ".join(f"l.{column}" for column in RESULT_COLUMNS)
+        if terms:
+            sql = (f"SELECT {columns} FROM listings_fts f JOIN listings l ON l.id = f.rowid "
+                   f"WHERE listings_fts MATCH ?")
+            params.insert(0, " ".join(terms))
+            order = "f.rank"
+        else:
+            sql = f"SELECT {columns} FROM listings l WHERE 1"
+            order = "l.mtime_ns DESC"
+        for clause in where:
+            sql += f" AND {clause}"
+        sql += f" ORDER BY {order} LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(zip(RESULT_COLUMNS, row)) for row in rows]
@@ -0,0 +1,125 @@
+# login_session.py
+
+import os
+import re
+import json
+import time
+import logging
+
+PROFILES_DIR = 'profiles'
+SESSION_FILE = 'session.json'
+SESSION_DOMAIN = 'ss.ge'
+
+def get_profile_dir(profiles_root, email):
+    """
+    Returns the profile directory of one ss.ge account (keyed by its email).
+    """
+    key = re.sub(r'[^\w.@-]', '_', email.strip().lower()) or 'default'
+    return os.path.join(profiles_root, key)
+
+def load_session(profile_dir):
+    """
+    Returns the saved {"cookies", "local_storage"} of a profile, or None.
+    Sessions whose cookies have all expired are treated as missing.
+    """
+    try:
+        with open(os.path.join(profile_dir, SESSION_FILE), 'r', encoding='utf-8') as f:
+            session = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable login session in {profile_dir}: {e}")
+        return None
+
+    now = time.time()
+    cookies = [
+        cookie for cookie in session.get("cookies", [])
+        if cookie.get("session") or cookie.get("expires", -1) <= 0 or cookie["expires"] > now
+    ]
+    if not cookies:
+        return None
+    session["cookies"] = cookies
+    return session
+
+def save_session(driver, profile_dir):
+    """
+    Save the ss.ge cookies (including HttpOnly ones) and localStorage of the
+    current page to the profile. Returns True on success.
+    """
+    try:
+        cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+        cookies = [cookie for cookie in cookies if cookie.get("domain", "").endswith(SESSION_DOMAIN)]
+        local_storage = driver.execute_script(
+            "var items = {};"
+            "for (var i = 0; i < localStorage.length; i++) {"
+            "  var key = localStorage.key(i); items[key] = localStorage.getItem(key);"
+            "}"
+            "return items;"
+        ) or {}
+        os.makedirs(profile_dir, exist_ok=True)
+        session_path = os.path.join(profile_dir, SESSION_FILE)
+        temp_path = session_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "saved_at": time.time(),
+                "cookies": cookies,
+                "local_storage": local_storage,
+            }, f, ensure_ascii=False)
+        os.replace(temp_path, session_path)
+        logging.info(f"Saved login session to {profile_dir}.")
+        return True
+    except Exception as e:
+        logging.warning(f"Failed to save login session: {e}")
+        return False
+
+def discard_session(profile_dir):
+    try:
+        os.remove(os.path.join(profile_dir, SESSION_FILE))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.warning(f"Failed to remove login session in {profile_dir}: {e}")
+
+def restore_session(driver, session):
+    """
+    Load a saved session into the browser before navigating to ss.ge.
+
+    Cookies are set through CDP so no page load is needed first, and
+    localStorage is injected by a script that runs before the site's own.
+    Returns the injected script's identifier (pass it to
+    finish_session_restore once the page has loaded), or None on failure.
+    """
+    try:
+        cookie_fields = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+        cookies = [
+            {field: cookie[field] for field in cookie_fields if field in cookie}
+            for cookie in session.get("cookies", [])
+        ]
+        for cookie in cookies:
+            if cookie.get("expires", 0) <= 0:
+                cookie.pop("expires", None)
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+
+        script = (
+            "(function(items) {"
+            "  if (!location.hostname.endsWith(%s)) return;"
+            "  for (var key in items) { try { localStorage.setItem(key, items[key]); } catch (e) {} }"
+            "})(%s);"
+        ) % (json.dumps(SESSION_DOMAIN), json.dumps(session.get("local_storage", {}), ensure_ascii=False))
+        result = driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": script})
+        return result.get("identifier", "")
+    except Exception as e:
+        logging.warning(f"Failed to restore login session: {e}")
+        return None
+
+def finish_session_restore(driver, identifier):
+    """
+    Remove the localStorage injection script so it doesn't follow the
+    browser back into the pool.
+    """
+    if not identifier:
+        return
+    try:
+        driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": identifier})
+    except Exception as e:
+        logging.warning(f"Failed to remove session restore script: {e}")
@@ -1,19 +1,41 @@
 # main.py
 
 import datetime
-import openpyxl
+import multiprocessing
 import pyperclip
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from scraper import run_scraper
-from uploader import run_uploader
+from uploader import run_uploader, PublishedWithoutUrl, DEFAULT_UPLOAD_TIMEOUT
+from driver_pool import configure_driver_pool, DEFAULT_POOL_SIZE
+from image_preprocess import configure_image_preprocessing
+from listing import load_listing, parse_number, format_number
+from ledger import Ledger, LEDGER_FILE, build_excel_row
+from excel_writer import ExcelWriter
+from ad_catalog import AdCatalog, CATALOG_FILE
+from listing_index import ListingIndex, INDEX_FILE
+from duplicates import DuplicateDetector
+from batch import (
+    run_batch_scrape,
+    run_upload_queue,
+    parse_batch_text,
+    load_batch_file,
+    DEFAULT_BATCH_WORKERS,
+    STATUS_PUBLISHED_NO_URL as QUEUE_PUBLISHED_NO_URL
+)
+from pipeline import (
+    ScrapeUploadPipeline,
+    pipeline_config,
+    STATUS_DUPLICATE,
+    STATUS_SAVE_FAILED,
+    STATUS_PUBLISHED_NO_URL
+)
 from threading import Thread, Event
 import os
 import json
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, filedialog
 import sys
-import pandas as pd
 import subprocess
 import webbrowser
 import logging
@@ -27,6 +49,7 @@ logging.basicConfig(
 
 CONFIG_FILE = 'config.json'
 EXCEL_FILE = 'scraped_data.xlsx'
+AUTOCOMPLETE_LIMIT = 100
 
 def get_user_data_dir():
     """
@@ -47,22 +70,6 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-def flatten_json(y):
-    """
-    Flatten a nested JSON/dict structure into a single dict with 'dot-like' keys.
-    """
-    out = {}
-    def flatten(x, name=''):
-        if isinstance(x, dict):
-            for a in x:
-                if a == 'images':  # Skip images
-                    continue
-                flatten(x[a], f'{a}_' if name == '' else f'{name}{a}_')
-        else:
-            out[name[:-1]] = x
-    flatten(y)
-    return out
-
 class RealEstateApp:
     def __init__(self, root):
         self.root = root
@@ -83,8 +90,27 @@ class RealEstateApp:
         # Load or create config
         self.user_config = self.load_or_create_config()
 
+        # Ledger of scraped ads (system of record behind the Excel file)
+        self.ledger = self.open_ledger()
+        self.excel_writer = ExcelWriter(
+            self.ledger,
+            os.path.join(self.user_data_dir, EXCEL_FILE),
+            on_error=self.show_error
+        )
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Known Ad IDs in data folder
-        self.all_ad_ids = self.get_all_ad_ids()
+        self.ad_catalog = AdCatalog(
+            os.path.join(self.user_data_dir, 'data'),
+            os.path.join(self.user_data_dir, CATALOG_FILE)
+        )
+        # Search index over the scraped JSON, brought up to date in the background
+        self.listing_index = ListingIndex(
+            os.path.join(self.user_data_dir, INDEX_FILE),
+            os.path.join(self.user_data_dir, 'data')
+        )
+        Thread(target=self.update_listing_index, daemon=True).start()
+        self.duplicate_detector = DuplicateDetector(self.listing_index, self.ledger)
 
         # Thread stop event
         self.thread_stop_event = Event()
@@ -104,6 +130,34 @@ class RealEstateApp:
                 logging.error(f"Failed to create user data directory: {e}")
                 messagebox.showerror("Folder Error", f"Failed to create user data directory: {e}")
 
+    def open_ledger(self):
+        """
+        Opens the SQLite ledger, importing an existing scraped_data.xlsx the
+        first time so no previous rows are lost.
+        """
+        ledger = Ledger(os.path.join(self.user_data_dir, LEDGER_FILE))
+        try:
+            ledger.import_excel(os.path.join(self.user_data_dir, EXCEL_FILE))
+        except Exception as e:
+            logging.error(f"Failed to import Excel into ledger: {e}")
+        return ledger
+
+    def sync_excel(self):
+        """
+        Asks the Excel writer thread to flush pending changes to
+        scraped_data.xlsx now, and waits for the save.
+        """
+        self.excel_writer.flush()
+
+    def on_close(self):
+        try:
+            self.excel_writer.close()
+        except Exception as e:
+            logging.error(f"Failed to export Excel on exit: {e}")
+        self.ledger.close()
+        self.listing_index.close()
+        self.root.destroy()
+
     def load_or_create_config(self):
         """
         Tries to load config.json. If missing or invalid, show login frame.
@@ -226,11 +280,14 @@ class RealEstateApp:
 
     def build_main_frame(self):
         """
-        Builds the main GUI with tabs: Scrape & Upload, Scrape, Upload Existing.
+        Builds the main GUI with tabs: Scrape & Upload, Scrape, Upload Existing,
+        Batch Scrape, Search.
         Also ensures the Excel file and data folder exist.
         """
         self.ensure_data_folder_exists()
         self.ensure_excel_file_exists()
+        self.start_driver_pool()
+        configure_image_preprocessing(self.user_config)
 
         self.main_frame = ttk.Frame(self.root)
         self.main_frame.pack(expand=True, fill='both', pady=10)
@@ -262,10 +319,14 @@ class RealEstateApp:
         self.scrape_upload_frame = ttk.Frame(self.notebook)
         self.scrape_only_frame = ttk.Frame(self.notebook)
         self.upload_existing_frame = ttk.Frame(self.notebook)
+        self.batch_frame = ttk.Frame(self.notebook)
+        self.search_frame = ttk.Frame(self.notebook)
 
         self.notebook.add(self.scrape_upload_frame, text='Scrape & Upload')
         self.notebook.add(self.scrape_only_frame, text='Scrape')
         self.notebook.add(self.upload_existing_frame, text='Upload Existing')
+        self.notebook.add(self.batch_frame, text='Batch Scrape')
+        self.notebook.add(self.search_frame, text='Search')
 
         # Tkinter variables
         self.url = ttk.StringVar()
@@ -275,11 +336,25 @@ class RealEstateApp:
         self.upload_description_var_scrape = ttk.BooleanVar(value=True)
         self.existing_ad_id = ttk.StringVar()
         self.upload_description_var_upload = ttk.BooleanVar(value=True)
+        self.automated_upload_var = ttk.BooleanVar(value=self.user_config.get('automated_upload', True))
+        self.skip_duplicates_var = ttk.BooleanVar(value=self.user_config.get('skip_duplicates', True))
         self.upload_link = ttk.StringVar()
+        self.batch_agency_price = ttk.StringVar()
+        self.batch_comment = ttk.StringVar()
+        self.batch_workers = ttk.IntVar(value=self.user_config.get('batch_workers', DEFAULT_BATCH_WORKERS))
+        self.search_text = ttk.StringVar()
+        self.search_features = ttk.StringVar()
+        self.search_ranges = {
+            (name, bound): ttk.StringVar()
+            for name in ('rooms', 'floor', 'area', 'price')
+            for bound in ('min', 'max')
+        }
 
         self.build_scrape_upload_tab()
         self.build_scrape_only_tab()
         self.build_upload_existing_tab()
+        self.build_batch_tab()
+        self.build_search_tab()
 
         change_user_button = ttk.Button(
             self.main_frame,
@@ -313,9 +388,20 @@ class RealEstateApp:
                     f"Failed to create data folder: {e}"
                 )
 
+    def start_driver_pool(self):
+        """
+        Size the shared browser pool from config.json ('driver_pool_size')
+        and start a headless browser in the background for the first scrape.
+        """
+        try:
+            pool = configure_driver_pool(self.user_config.get('driver_pool_size', DEFAULT_POOL_SIZE))
+            pool.warm_up(headless=True)
+        except Exception as e:
+            logging.error(f"Failed to start driver pool: {e}")
+
     def ensure_excel_file_exists(self):
         """
-        Creates an Excel file with the columns:
+        Creates the Excel file from the ledger with the columns:
         'Uploaded Timestamp', 'მესაკუთრის ID', 'ტელეფონის ნომერი',
         'ოთახი', 'სართული', 'მისამართი', 'სააგენტოს ფასი',
         'მესაკუთრის ფასი', 'Comment', 'ss.ge'
@@ -323,26 +409,20 @@ class RealEstateApp:
         """
         excel_path = os.path.join(self.user_data_dir, EXCEL_FILE)
         if not os.path.exists(excel_path):
-            columns = [
-                "Uploaded Timestamp",
-                "მესაკუთრის ID",
-                "ტელეფონის ნომერი",
-                "ოთახი",
-                "სართული",
-                "მისამართი",
-                "სააგენტოს ფასი",
-                "მესაკუთრის ფასი",
-                "Comment",
-                "ss.ge"
-            ]
             try:
-                df = pd.DataFrame(columns=columns)
-                df.to_excel(excel_path, index=False)
+                self.sync_excel()
                 logging.info("Excel file created with the necessary columns.")
             except Exception as e:
                 logging.error(f"Failed to create Excel file: {e}")
                 messagebox.showerror("Excel Error", f"Failed to create Excel file: {e}")
 
+    def append_rows_to_ledger(self, rows):
+        """
+        Record several scraped ads through the Excel writer thread.
+        Waits until they are in the ledger; the workbook save is deferred.
+        """
+        self.excel_writer.append_rows(rows).result()
+
     def build_scrape_upload_tab(self):
         frame = self.scrape_upload_frame
 
@@ -463,6 +543,20 @@ class RealEstateApp:
         )
         upload_desc_checkbox.pack(pady=5, anchor='w', padx=20)
 
+        automated_checkbox = ttk.Checkbutton(
+            frame,
+            text="Fully automated (headless) when the ad has all required fields",
+            variable=self.automated_upload_var
+        )
+        automated_checkbox.pack(pady=5, anchor='w', padx=20)
+
+        skip_duplicates_checkbox = ttk.Checkbutton(
+            frame,
+            text="Skip likely duplicates of already uploaded ads",
+            variable=self.skip_duplicates_var
+        )
+        skip_duplicates_checkbox.pack(pady=5, anchor='w', padx=20)
+
         self.progress_upload_existing = ttk.Progressbar(frame, mode='indeterminate')
         self.progress_upload_existing.pack(pady=5, fill='x', padx=20)
         self.progress_upload_existing.pack_forget()
@@ -504,172 +598,466 @@ class RealEstateApp:
         copy_button.pack(pady=5)
         self.copy_button = copy_button
 
-    def start_scrape_upload(self):
+        # Bulk upload queue
+        label_bulk = ttk.Label(frame, text="Bulk Upload (select several Ad IDs):")
+        label_bulk.pack(pady=5, anchor='w', padx=20)
+
+        self.bulk_tree = ttk.Treeview(
+            frame,
+            columns=('ad_id', 'status', 'url'),
+            show='headings',
+            height=6,
+            selectmode='extended'
+        )
+        self.bulk_tree.heading('ad_id', text='Ad ID')
+        self.bulk_tree.heading('status', text='Status')
+        self.bulk_tree.heading('url', text='ss.ge')
+        self.bulk_tree.column('ad_id', width=120)
+        self.bulk_tree.column('status', width=100)
+        self.bulk_tree.column('url', width=430)
+        self.bulk_tree.pack(pady=5, fill='both', expand=True, padx=20)
+        self.refresh_bulk_upload_list()
+
+        bulk_buttons = ttk.Frame(frame)
+        bulk_buttons.pack(pady=5, fill='x', padx=20)
+
+        select_pending_button = ttk.Button(
+            bulk_buttons,
+            text="Select Not Uploaded",
+            command=self.select_not_uploaded,
+            style='info.TButton'
+        )
+        select_pending_button.pack(side='left', padx=(0, 5))
+
+        self.run_button_bulk_upload = ttk.Button(
+            bulk_buttons,
+            text="Upload Selected",
+            command=self.start_bulk_upload,
+            style='success.TButton'
+        )
+        self.run_button_bulk_upload.pack(side='left')
+
+    def build_batch_tab(self):
+        frame = self.batch_frame
+
+        label_urls = ttk.Label(frame, text="URLs (one per line, optionally 'url,agency price,comment'):")
+        label_urls.pack(pady=5, anchor='w', padx=20)
+        self.batch_urls_text = tk.Text(frame, height=6)
+        self.batch_urls_text.pack(pady=5, fill='x', padx=20)
+
+        load_file_button = ttk.Button(
+            frame,
+            text="Load from File",
+            command=self.load_batch_urls_file,
+            style='info.TButton'
+        )
+        load_file_button.pack(pady=5, anchor='w', padx=20)
+
+        label_price = ttk.Label(frame, text="Default Agency Price:")
+        label_price.pack(pady=5, anchor='w', padx=20)
+        entry_price = ttk.Entry(frame, textvariable=self.batch_agency_price, width=60)
+        entry_price.pack(pady=5, fill='x', padx=20)
+
+        label_comment = ttk.Label(frame, text="Default Comment:")
+        label_comment.pack(pady=5, anchor='w', padx=20)
+        entry_comment = ttk.Entry(frame, textvariable=self.batch_comment, width=60)
+        entry_comment.pack(pady=5, fill='x', padx=20)
+
+        label_workers = ttk.Label(frame, text="Parallel Browsers:")
+        label_workers.pack(pady=5, anchor='w', padx=20)
+        spin_workers = ttk.Spinbox(frame, from_=1, to=8, textvariable=self.batch_workers, width=5)
+        spin_workers.pack(pady=5, anchor='w', padx=20)
+
+        checkbox_headless = ttk.Checkbutton(
+            frame,
+            text="Run in headless mode",
+            variable=self.headless_var_scrape
+        )
+        checkbox_headless.pack(pady=5, anchor='w', padx=20)
+
+        checkbox_duplicates = ttk.Checkbutton(
+            frame,
+            text="Skip likely duplicates of already uploaded ads",
+            variable=self.skip_duplicates_var
+        )
+        checkbox_duplicates.pack(pady=5, anchor='w', padx=20)
+
+        self.batch_tree = ttk.Treeview(frame, columns=('url', 'status', 'ad_id'), show='headings', height=6)
+        self.batch_tree.heading('url', text='URL')
+        self.batch_tree.heading('status', text='Status')
+        self.batch_tree.heading('ad_id', text='Ad ID')
+        self.batch_tree.column('url', width=450)
+        self.batch_tree.column('status', width=100)
+        self.batch_tree.column('ad_id', width=100)
+        self.batch_tree.pack(pady=5, fill='both', expand=True, padx=20)
+
+        self.run_button_batch = ttk.Button(
+            frame,
+            text="Scrape All",
+            command=self.start_batch_scrape,
+            style='success.TButton'
+        )
+        self.run_button_batch.pack(pady=10)
+
+        self.run_button_batch_upload = ttk.Button(
+            frame,
+            text="Scrape & Upload All",
+            command=self.start_batch_pipeline,
+            style='primary.TButton'
+        )
+        self.run_button_batch_upload.pack(pady=5)
+
+        self.stop_button_batch = ttk.Button(
+            frame,
+            text="Stop",
+            command=self.stop_running_process,
+            style='danger.TButton'
+        )
+        self.stop_button_batch.pack(pady=5)
+        self.stop_button_batch.pack_forget()
+
+    def build_search_tab(self):
+        frame = self.search_frame
+
+        label_text = ttk.Label(frame, text="Search (address, owner name, phone, description):")
+        label_text.pack(pady=5, anchor='w', padx=20)
+        entry_text = ttk.Entry(frame, textvariable=self.search_text, width=60)
+        entry_text.pack(pady=5, fill='x', padx=20)
+        entry_text.bind('<Return>', lambda event: self.run_search())
+
+        ranges_frame = ttk.Frame(frame)
+        ranges_frame.pack(pady=5, fill='x', padx=20)
+        for column, title in enumerate(("", "Min", "Max")):
+            ttk.Label(ranges_frame, text=title).grid(row=0, column=column, padx=5, sticky='w')
+        labels = {'rooms': "Rooms", 'floor': "Floor", 'area': "Area (m²)", 'price': "Agency Price"}
+        for row, (name, title) in enumerate(labels.items(), start=1):
+            ttk.Label(ranges_frame, text=title).grid(row=row, column=0, padx=5, pady=2, sticky='w')
+            for column, bound in enumerate(('min', 'max'), start=1):
+                entry = ttk.Entry(ranges_frame, textvariable=self.search_ranges[(name, bound)], width=12)
+                entry.grid(row=row, column=column, padx=5, pady=2)
+                entry.bind('<Return>', lambda event: self.run_search())
+
+        label_features = ttk.Label(frame, text="Features (comma-separated):")
+        label_features.pack(pady=5, anchor='w', padx=20)
+        entry_features = ttk.Entry(frame, textvariable=self.search_features, width=60)
+        entry_features.pack(pady=5, fill='x', padx=20)
+        entry_features.bind('<Return>', lambda event: self.run_search())
+
+        search_button = ttk.Button(
+            frame,
+            text="Search",
+            command=self.run_search,
+            style='success.TButton'
+        )
+        search_button.pack(pady=10)
+
+        self.search_tree = ttk.Treeview(
+            frame,
+            columns=('ad_id', 'address', 'phone', 'rooms', 'floor', 'area', 'price'),
+            show='headings',
+            height=8
+        )
+        for column, title, width in (
+                ('ad_id', 'Ad ID', 90), ('address', 'Address', 220), ('phone', 'Phone', 110),
+                ('rooms', 'Rooms', 50), ('floor', 'Floor', 60), ('area', 'Area', 60), ('price', 'Price', 80)):
+            self.search_tree.heading(column, text=title)
+            self.search_tree.column(column, width=width)
+        self.search_tree.pack(pady=5, fill='both', expand=True, padx=20)
+        self.search_tree.bind('<Double-1>', self.on_search_result_open)
+
+        self.search_status = ttk.Label(frame, text="")
+        self.search_status.pack(pady=5, anchor='w', padx=20)
+
+    def update_listing_index(self, ad_ids=None):
         """
-        Validate inputs, disable run button, show stop button, run scraping in a thread.
+        Bring the search index up to date (all ads, or just 'ad_ids').
+        Safe to call from any thread.
         """
-        if not self.validate_scrape_upload_inputs():
+        try:
+            self.listing_index.update(ad_ids)
+        except Exception as e:
+            logging.error(f"Failed to update listing index: {e}")
+
+    def run_search(self):
+        ranges = {}
+        for (name, bound), variable in self.search_ranges.items():
+            value = parse_number(variable.get().strip() or None)
+            if value is not None:
+                ranges[f"{name}_{bound}"] = value
+        features = [feature.strip() for feature in self.search_features.get().split(',') if feature.strip()]
+        try:
+            results = self.listing_index.search(self.search_text.get(), features=features, **ranges)
+        except Exception as e:
+            logging.error(f"Listing search failed: {e}")
+            messagebox.showerror("Search Error", f"Search failed: {e}")
             return
-        self.run_button.config(state='disabled')
-        self.stop_button.pack(pady=5)
-        Thread(target=self.run_scrape_upload, daemon=True).start()
 
-    def run_scrape_upload(self):
+        self.search_tree.delete(*self.search_tree.get_children())
+        for result in results:
+            floor = format_number(result["floor"])
+            if result["total_floors"] is not None:
+                floor = f"{floor}/{format_number(result['total_floors'])}"
+            self.search_tree.insert('', tk.END, values=(
+                result["ad_id"],
+                result["address"],
+                result["phone_number"],
+                format_number(result["rooms"]),
+                floor,
+                format_number(result["total_area"]),
+                format_number(result["agency_price"])
+            ))
+        self.search_status.config(text=f"{len(results)} listings found.")
+
+    def on_search_result_open(self, event):
         """
-        1) Scrape data
-        2) Write minimal fields to Excel, including user-typed comment
-        3) Run uploader
-        4) On success, set 'Uploaded Timestamp' and 'ss.ge' columns
+        Double-clicking a result opens it in the Upload Existing tab.
         """
+        item = self.search_tree.focus()
+        if not item:
+            return
+        self.existing_ad_id.set(self.search_tree.item(item, 'values')[0])
+        self.notebook.select(self.upload_existing_frame)
+
+    def load_batch_urls_file(self):
+        path = filedialog.askopenfilename(
+            title="Load URLs",
+            filetypes=[("Text or CSV", "*.txt *.csv"), ("All files", "*.*")]
+        )
+        if not path:
+            return
         try:
-            self.progress_scrape_upload.pack(pady=5, fill='x', padx=20)
-            self.progress_scrape_upload.start()
+            jobs = load_batch_file(path)
+        except Exception as e:
+            logging.error(f"Failed to load batch file: {e}")
+            messagebox.showerror("File Error", f"Failed to load file: {e}")
+            return
+        lines = [",".join([job["url"], job["agency_price"], job["comment"]]).rstrip(",") for job in jobs]
+        self.batch_urls_text.insert(tk.END, "\n".join(lines) + "\n")
 
-            headless = self.headless_var_scrape.get()
-            upload_description = self.upload_description_var_scrape.get()
+    def read_batch_jobs(self):
+        """
+        Parse the batch URL box; shows an error and returns None if unusable.
+        """
+        jobs = parse_batch_text(
+            self.batch_urls_text.get("1.0", tk.END),
+            default_agency_price=self.batch_agency_price.get().strip(),
+            default_comment=self.batch_comment.get().strip()
+        )
+        if not jobs:
+            messagebox.showerror("Input Error", "Please enter at least one ss.ge URL.")
+            return None
+        if any(not job["agency_price"] for job in jobs):
+            messagebox.showerror("Input Error", "Every URL needs an agency price (per line or default).")
+            return None
+        return jobs
+
+    def show_batch_jobs(self, jobs):
+        self.batch_tree.delete(*self.batch_tree.get_children())
+        self.batch_rows = [
+            self.batch_tree.insert('', tk.END, values=(job["url"], "", ""))
+            for job in jobs
+        ]
+        self.run_button_batch.config(state='disabled')
+        self.run_button_batch_upload.config(state='disabled')
+        self.stop_button_batch.pack(pady=5)
+
+    def start_batch_scrape(self):
+        jobs = self.read_batch_jobs()
+        if not jobs:
+            return
+        try:
+            workers = max(1, int(self.batch_workers.get()))
+        except (tk.TclError, ValueError):
+            workers = DEFAULT_BATCH_WORKERS
 
-            if self.thread_stop_event.is_set():
-                self.show_info("Process was stopped.")
-                return
+        self.show_batch_jobs(jobs)
+        Thread(target=self.run_batch_scrape, args=(jobs, workers), daemon=True).start()
 
-            data_dir = os.path.join(self.user_data_dir, 'data')
-            logging.info(f"Running scraper with data directory: {data_dir}")
+    def start_batch_pipeline(self):
+        jobs = self.read_batch_jobs()
+        if not jobs:
+            return
+        self.show_batch_jobs(jobs)
+        Thread(target=self.run_batch_pipeline, args=(jobs,), daemon=True).start()
 
-            ad_id = run_scraper(
-                self.url.get(),
-                self.agency_price.get(),
-                comment=self.comment.get(),  # pass user comment to the scraper
-                headless=headless,
-                stop_event=self.thread_stop_event,
-                output_dir=data_dir
+    def run_batch_pipeline(self, jobs):
+        """
+        Scrape and upload every URL through the staged pipeline, so the next
+        ad is scraped while the previous one uploads.
+        """
+        try:
+            logging.info(f"Running scrape & upload pipeline for {len(jobs)} URLs.")
+            pipeline = self.make_pipeline(
+                scrape_headless=self.headless_var_scrape.get(),
+                enter_description=self.upload_description_var_scrape.get(),
+                automated=self.automated_upload_var.get(),
+                progress_callback=self.update_batch_row
             )
-            logging.info(f"Scraper returned Ad ID: {ad_id}")
+            results = pipeline.run(jobs)
+            self.refresh_ad_ids([ad_id for _, ad_id, _ in results if ad_id])
 
+            uploaded = sum(1 for _, _, final_url in results if final_url)
             if self.thread_stop_event.is_set():
-                self.show_info("Process was stopped.")
-                return
-
-            if not ad_id:
-                self.show_error("Scraping failed. Check the URL and try again.")
-                return
-
-            # Load the JSON data that scraper created
-            json_file_path = os.path.join(data_dir, ad_id, f"{ad_id}.json")
-            if not os.path.exists(json_file_path):
-                logging.error("Scraped data file not found.")
-                self.show_error("Scraped data file not found.")
-                return
-
-            with open(json_file_path, "r", encoding='utf-8') as jf:
-                try:
-                    scraped_data = json.load(jf)
-                    logging.info("Scraped data loaded successfully.")
-                except json.JSONDecodeError as e:
-                    logging.error(f"JSON decode error: {e}")
-                    self.show_error(f"Failed to decode JSON file: {e}")
-                    return
-
-            flattened_data = flatten_json(scraped_data)
-
-            # Build Excel row (comment is from user, stored in self.comment)
-            excel_data = {
-                "Uploaded Timestamp": "",
-                "მესაკუთრის ID": flattened_data.get("ad_id", ""),
-                "ტელეფონის ნომერი": flattened_data.get("phone_number", ""),
-                "ოთახი": flattened_data.get("property_details_ოთახი", ""),
-                "სართული": flattened_data.get("property_details_სართული", ""),
-                "მისამართი": f"{flattened_data.get('location', '')} {flattened_data.get('number', '')}".strip(),
-                "სააგენტოს ფასი": flattened_data.get("agency_price", ""),
-                "მესაკუთრის ფასი": flattened_data.get("owner_price", ""),
-                "Comment": self.comment.get(),  # <-- user typed comment
-                "ss.ge": ""
-            }
+                self.show_info(f"Pipeline stopped. {uploaded} ads uploaded.")
+            else:
+                self.show_info(f"Pipeline finished. {uploaded} ads uploaded, {len(jobs) - uploaded} not uploaded (failed or duplicate).")
 
-            excel_path = os.path.join(self.user_data_dir, EXCEL_FILE)
-            try:
-                if not os.path.exists(excel_path):
-                    self.ensure_excel_file_exists()
+        except Exception as e:
+            logging.error(f"An error occurred in run_batch_pipeline: {e}")
+            self.show_error(f"An error occurred: {e}")
+        finally:
+            self.root.after(0, lambda: self.run_button_batch.config(state='normal'))
+            self.root.after(0, lambda: self.run_button_batch_upload.config(state='normal'))
+            self.root.after(0, self.stop_button_batch.pack_forget)
+            self.thread_stop_event.clear()
 
-                df = pd.read_excel(excel_path)
-                df = pd.concat([df, pd.DataFrame([excel_data])], ignore_index=True)
-                df.to_excel(excel_path, index=False)
-                logging.info(f"Data appended to Excel for Ad ID: {ad_id}")
-            except Exception as e:
-                logging.error(f"Failed to write to Excel: {e}")
-                self.show_error(f"Failed to write to Excel: {e}")
-                return
+    def update_batch_row(self, index, status, ad_id=None):
+        """
+        Progress callback from batch workers; hands the update to the Tk thread.
+        """
+        def apply():
+            item = self.batch_rows[index]
+            url = self.batch_tree.item(item, 'values')[0]
+            self.batch_tree.item(item, values=(url, status, ad_id or ""))
+        self.root.after(0, apply)
 
-            if self.thread_stop_event.is_set():
-                self.show_info("Process was stopped.")
-                return
+    def run_batch_scrape(self, jobs, workers):
+        """
+        1) Scrape all URLs on 'workers' parallel browsers
+        2) Append every successful ad to Excel in one write
+        """
+        try:
+            data_dir = os.path.join(self.user_data_dir, 'data')
+            logging.info(f"Running batch scrape of {len(jobs)} URLs with {workers} workers.")
 
-            # Uploader
-            user_info = self.user_config
-            final_url = run_uploader(
-                username=user_info['email'],
-                password=user_info['password'],
-                phone_number=flattened_data.get("phone_number", ""),
-                ad_id=ad_id,
-                enter_description=upload_description,
-                headless=False,  # forced false or set headless if you prefer
+            results = run_batch_scrape(
+                jobs,
+                workers=workers,
+                headless=self.headless_var_scrape.get(),
                 stop_event=self.thread_stop_event,
-                output_dir=data_dir
+                output_dir=data_dir,
+                progress_callback=self.update_batch_row
             )
-            logging.info(f"Uploader returned Final URL: {final_url}")
 
-            if self.thread_stop_event.is_set():
-                self.show_info("Process was stopped.")
-                return
+            rows = [
+                build_excel_row(result.listing, job["comment"], uploaded_timestamp="SCRAPE ONLY")
+                for job, result in results if result
+            ]
 
-            if final_url:
-                # Upload success => update "Uploaded Timestamp" and "ss.ge" columns
+            if rows:
                 try:
-                    wb = openpyxl.load_workbook(excel_path)
-                    ws = wb.active
-
-                    # Create col map
-                    header = {cell.value: idx for idx, cell in enumerate(ws[1], 1)}
-
-                    ad_id_col = header.get("მესაკუთრის ID")
-                    timestamp_col = header.get("Uploaded Timestamp")
-                    ss_ge_col = header.get("ss.ge")
+                    self.append_rows_to_ledger(rows)
+                    logging.info(f"Batch recorded {len(rows)} rows in the ledger.")
+                except Exception as e:
+                    logging.error(f"Failed to write batch to Excel: {e}")
+                    self.show_error(f"Failed to write to Excel: {e}")
+                    return
 
-                    if not ad_id_col or not timestamp_col or not ss_ge_col:
-                        raise ValueError("Missing required columns in Excel (მესაკუთრის ID / Uploaded Timestamp / ss.ge).")
+            self.refresh_ad_ids([result.ad_id for _, result in results if result])
+            failed = len(jobs) - len(rows)
+            if self.thread_stop_event.is_set():
+                self.show_info(f"Batch stopped. {len(rows)} ads saved to Excel.")
+            else:
+                self.show_info(f"Batch finished. {len(rows)} ads saved to Excel, {failed} failed.")
 
-                    current_timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    updated = False
+        except Exception as e:
+            logging.error(f"An error occurred in run_batch_scrape: {e}")
+            self.show_error(f"An error occurred: {e}")
+        finally:
+            self.root.after(0, lambda: self.run_button_batch.config(state='normal'))
+            self.root.after(0, lambda: self.run_button_batch_upload.config(state='normal'))
+            self.root.after(0, self.stop_button_batch.pack_forget)
+            self.thread_stop_event.clear()
 
-                    for row in ws.iter_rows(min_row=2, values_only=False):
-                        cell_ad_id = row[ad_id_col - 1]
-                        if cell_ad_id.value == ad_id:
-                            timestamp_cell = row[timestamp_col - 1]
-                            timestamp_cell.value = current_timestamp
+    def start_scrape_upload(self):
+        """
+        Validate inputs, disable run button, show stop button, run scraping in a thread.
+        """
+        if not self.validate_scrape_upload_inputs():
+            return
+        self.run_button.config(state='disabled')
+        self.stop_button.pack(pady=5)
+        Thread(target=self.run_scrape_upload, daemon=True).start()
 
-                            ss_ge_cell = row[ss_ge_col - 1]
-                            ss_ge_cell.value = final_url
+    def make_pipeline(self, scrape_headless, enter_description, automated=False, progress_callback=None):
+        """
+        Build a scrape -> persist -> upload pipeline sized from config.json ('pipeline').
+        """
+        return ScrapeUploadPipeline(
+            self.excel_writer,
+            username=self.user_config['email'],
+            password=self.user_config['password'],
+            output_dir=os.path.join(self.user_data_dir, 'data'),
+            config=pipeline_config(self.user_config),
+            scrape_headless=scrape_headless,
+            enter_description=enter_description,
+            automated=automated,
+            upload_timeout=self.upload_timeout(),
+            stop_event=self.thread_stop_event,
+            progress_callback=progress_callback,
+            duplicate_detector=self.active_duplicate_detector()
+        )
 
-                            updated = True
-                            break
+    def active_duplicate_detector(self):
+        """
+        The duplicate detector if 'Skip likely duplicates' is on, else None.
+        """
+        return self.duplicate_detector if self.skip_duplicates_var.get() else None
 
-                    if not updated:
-                        raise ValueError(f"Ad ID {ad_id} not found in Excel for timestamp/URL update.")
+    def run_scrape_upload(self):
+        """
+        Run one ad through the scrape -> persist -> upload pipeline:
+        1) Scrape data
+        2) Record minimal fields in the ledger, including user-typed comment
+        3) Run uploader
+        4) On success, set 'Uploaded Timestamp' and 'ss.ge' columns
+        """
+        try:
+            self.progress_scrape_upload.pack(pady=5, fill='x', padx=20)
+            self.progress_scrape_upload.start()
 
-                    wb.save(excel_path)
-                    logging.info(f"Excel updated with timestamp and final URL for Ad ID: {ad_id}")
+            if self.thread_stop_event.is_set():
+                self.show_info("Process was stopped.")
+                return
 
-                    self.show_info("Scraping completed successfully and data saved to Excel.")
-                    self.upload_link.set(f"Upload Successful!\nss.ge: {final_url}")
-                    self.copy_button.config(state='normal')
+            job = {"url": self.url.get(), "agency_price": self.agency_price.get(), "comment": self.comment.get()}
+            statuses = {}
+            pipeline = self.make_pipeline(
+                scrape_headless=self.headless_var_scrape.get(),
+                enter_description=self.upload_description_var_scrape.get(),
+                progress_callback=lambda index, status, ad_id=None: statuses.__setitem__(index, status)
+            )
+            [(_, ad_id, final_url)] = pipeline.run([job])
+            logging.info(f"Pipeline returned Ad ID: {ad_id}, Final URL: {final_url}")
 
-                except Exception as e:
-                    logging.error(f"Failed to update Excel with timestamp/URL: {e}")
-                    self.show_error(f"Failed to update Excel: {e}")
-            else:
+            if self.thread_stop_event.is_set():
+                self.show_info("Process was stopped.")
+            elif not ad_id:
+                self.show_error("Scraping failed. Check the URL and try again.")
+            elif statuses.get(0) == STATUS_SAVE_FAILED and final_url:
+                self.show_error(f"Ad {ad_id} was uploaded as {final_url} but writing the URL to Excel "
+                                f"failed. Add it by hand before uploading again; see app.log.")
+                self.upload_link.set(f"Upload Successful!\nss.ge: {final_url}")
+                self.copy_button.config(state='normal')
+            elif statuses.get(0) == STATUS_SAVE_FAILED:
+                self.show_error(f"Ad {ad_id} was scraped but writing it to Excel failed, so it was "
+                                f"not uploaded. Check app.log for details.")
+            elif statuses.get(0) == STATUS_PUBLISHED_NO_URL:
+                self.show_error(f"Ad {ad_id} was published but its ss.ge URL could not be read. "
+                                f"It is marked as uploaded; add the URL to Excel by hand.")
+            elif statuses.get(0) == STATUS_DUPLICATE:
+                self.show_info(f"Ad {ad_id} was saved but not uploaded: it looks like a duplicate "
+                               f"of an ad that is already on ss.ge (see app.log).")
+            elif not final_url:
                 self.show_error("Upload failed. Please check logs for details.")
+            else:
+                self.show_info("Scraping completed successfully and data saved to Excel.")
+                self.upload_link.set(f"Upload Successful!\nss.ge: {final_url}")
+                self.copy_button.config(state='normal')
 
             # Refresh known IDs
-            self.all_ad_ids = self.get_all_ad_ids()
+            if ad_id:
+                self.refresh_ad_ids([ad_id])
 
         except Exception as e:
             logging.error(f"An error occurred in run_scrape_upload: {e}")
@@ -706,7 +1094,7 @@ class RealEstateApp:
             data_dir = os.path.join(self.user_data_dir, 'data')
             logging.info(f"Running scraper with data directory: {data_dir}")
 
-            ad_id = run_scraper(
+            result = run_scraper(
                 self.url.get(),
                 self.agency_price.get(),
                 comment=self.comment.get(),
@@ -714,62 +1102,29 @@ class RealEstateApp:
                 stop_event=self.thread_stop_event,
                 output_dir=data_dir
             )
+            ad_id = result.ad_id if result else None
             logging.info(f"Scraper returned Ad ID: {ad_id}")
 
             if self.thread_stop_event.is_set():
                 self.show_info("Process was stopped.")
                 return
 
-            if not ad_id:
+            if not result:
                 self.show_error("Scraping failed. Check the URL and try again.")
                 return
 
-            # Load JSON
-            json_file_path = os.path.join(data_dir, ad_id, f"{ad_id}.json")
-            if not os.path.exists(json_file_path):
-                logging.error("Scraped data file not found.")
-                self.show_error("Scraped data file not found.")
-                return
-
-            with open(json_file_path, "r", encoding='utf-8') as jf:
-                try:
-                    scraped_data = json.load(jf)
-                    logging.info("Scraped data loaded successfully.")
-                except json.JSONDecodeError as e:
-                    logging.error(f"JSON decode error: {e}")
-                    self.show_error(f"Failed to decode JSON: {e}")
-                    return
-
-            flattened_data = flatten_json(scraped_data)
-
             # We store "SCRAPE ONLY" in Uploaded Timestamp
-            excel_data = {
-                "Uploaded Timestamp": "SCRAPE ONLY",
-                "მესაკუთრის ID": flattened_data.get("ad_id", ""),
-                "ტელეფონის ნომერი": flattened_data.get("phone_number", ""),
-                "ოთახი": flattened_data.get("property_details_ოთახი", ""),
-                "სართული": flattened_data.get("property_details_სართული", ""),
-                "მისამართი": f"{flattened_data.get('location', '')} {flattened_data.get('number', '')}".strip(),
-                "სა агентოს ფასი": flattened_data.get("agency_price", ""),
-                "მესაკუთრის ფასი": flattened_data.get("owner_price", ""),
-                "Comment": self.comment.get(),
-                "ss.ge": ""
-            }
+            excel_data = build_excel_row(result.listing, self.comment.get(), uploaded_timestamp="SCRAPE ONLY")
 
-            excel_path = os.path.join(self.user_data_dir, EXCEL_FILE)
             try:
-                if not os.path.exists(excel_path):
-                    self.ensure_excel_file_exists()
-
-                df = pd.read_excel(excel_path)
-                df = pd.concat([df, pd.DataFrame([excel_data])], ignore_index=True)
-                df.to_excel(excel_path, index=False)
-                logging.info(f"Data appended to Excel for Ad ID: {ad_id}")
+                self.append_rows_to_ledger([excel_data])
+                logging.info(f"Data recorded in ledger for Ad ID: {ad_id}")
             except Exception as e:
                 logging.error(f"Failed to write to Excel: {e}")
                 self.show_error(f"Failed to write to Excel: {e}")
                 return
 
+            self.refresh_ad_ids([ad_id])
             self.show_info("Scraping completed successfully and data saved to Excel.")
 
         except Exception as e:
@@ -785,18 +1140,35 @@ class RealEstateApp:
     def start_upload_existing(self):
         if not self.validate_upload_existing_inputs():
             return
+        ad_id = self.existing_ad_id.get()
         self.run_button_upload_existing.config(state='disabled')
         self.stop_button_upload_existing.pack(pady=5)
-        ad_id = self.existing_ad_id.get()
         Thread(target=self.run_upload_existing, args=(ad_id,), daemon=True).start()
 
+    def confirm_not_duplicate(self, ad_id, listing):
+        """
+        If 'Skip likely duplicates' is on and the ad looks like one that is
+        already uploaded, ask before uploading it again. Runs on the worker
+        thread; only the question itself goes to the Tk thread.
+        """
+        detector = self.active_duplicate_detector()
+        if detector is None:
+            return True
+        duplicates = detector.upload_duplicates(listing)
+        if not duplicates:
+            return True
+        details = "\n".join(match.describe() for match in duplicates[:5])
+        return self.ask_yes_no(
+            "Possible Duplicate",
+            f"Ad {ad_id} looks like an ad that is already uploaded:\n\n{details}\n\nUpload it anyway?"
+        )
+
     def run_upload_existing(self, ad_id):
         """
-        Re-uploads an existing ad, sets 'ss.ge' if final_url is returned.
-        (Optionally you could also set 'Uploaded Timestamp' again if you want.)
+        Re-uploads an existing ad, sets 'Uploaded Timestamp' and 'ss.ge' if
+        final_url is returned.
         """
         try:
-            excel_path = os.path.join(self.user_data_dir, EXCEL_FILE)
             self.progress_upload_existing.pack(pady=5, fill='x', padx=20)
             self.progress_upload_existing.start()
             upload_description = self.upload_description_var_upload.get()
@@ -812,26 +1184,40 @@ class RealEstateApp:
                 self.show_error("Scraped data file not found.")
                 return
 
-            with open(json_file_path, 'r', encoding='utf-8') as jf:
-                try:
-                    scraped_data = json.load(jf)
-                    logging.info("Scraped data loaded successfully.")
-                except json.JSONDecodeError as e:
-                    logging.error(f"JSON decode error: {e}")
-                    self.show_error(f"Failed to decode JSON file: {e}")
-                    return
+            try:
+                listing = load_listing(json_file_path)
+                logging.info("Scraped data loaded successfully.")
+            except ValueError as e:
+                logging.error(f"JSON decode error: {e}")
+                self.show_error(f"Failed to decode JSON file: {e}")
+                return
+
+            if not self.confirm_not_duplicate(ad_id, listing):
+                logging.info(f"Upload of Ad ID {ad_id} cancelled as a likely duplicate.")
+                return
 
             user_info = self.user_config
-            final_url = run_uploader(
-                username=user_info['email'],
-                password=user_info['password'],
-                phone_number=scraped_data.get("phone_number", ""),
-                ad_id=ad_id,
-                enter_description=upload_description,
-                headless=False,
-                stop_event=self.thread_stop_event,
-                output_dir=os.path.join(self.user_data_dir, 'data')
-            )
+            try:
+                final_url = run_uploader(
+                    username=user_info['email'],
+                    password=user_info['password'],
+                    phone_number=listing.phone_number,
+                    ad_id=ad_id,
+                    enter_description=upload_description,
+                    headless=False,
+                    stop_event=self.thread_stop_event,
+                    output_dir=os.path.join(self.user_data_dir, 'data'),
+                    timeout=self.upload_timeout(),
+                    automated=self.automated_upload_var.get(),
+                    listing=listing
+                )
+            except PublishedWithoutUrl:
+                # Live on ss.ge: mark it uploaded so it isn't posted again
+                current_timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                self.excel_writer.update(ad_id, {"Uploaded Timestamp": current_timestamp}).result()
+                self.show_error(f"Ad {ad_id} was published but its ss.ge URL could not be read. "
+                                f"It is marked as uploaded; add the URL to Excel by hand.")
+                return
             logging.info(f"Uploader returned Final URL: {final_url}")
 
             if self.thread_stop_event.is_set():
@@ -840,31 +1226,12 @@ class RealEstateApp:
 
             if final_url:
                 try:
-                    wb = openpyxl.load_workbook(excel_path)
-                    ws = wb.active
-
-                    header = {cell.value: idx for idx, cell in enumerate(ws[1], 1)}
-                    ad_id_col = header.get('მესაკუთრის ID')
-                    ss_ge_col = header.get('ss.ge')
-                    if not ad_id_col:
-                        raise ValueError("'მესაკუთრის ID' column not found in Excel.")
-                    if not ss_ge_col:
-                        ss_ge_col = ws.max_column + 1
-                        ws.cell(row=1, column=ss_ge_col, value='ss.ge')
-
-                    updated = False
-                    for row in ws.iter_rows(min_row=2, values_only=False):
-                        cell_ad_id = row[ad_id_col - 1]
-                        if cell_ad_id.value == ad_id:
-                            final_url_cell = row[ss_ge_col - 1]
-                            final_url_cell.value = final_url
-                            updated = True
-                            break
-
+                    current_timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    updated = self.excel_writer.update(
+                        ad_id, {"Uploaded Timestamp": current_timestamp, "ss.ge": final_url}
+                    ).result()
                     if not updated:
-                        raise ValueError(f"Ad ID {ad_id} not found in Excel for update.")
-
-                    wb.save(excel_path)
+                        raise ValueError(f"Ad ID {ad_id} not found in ledger for update.")
                     logging.info(f"ss.ge column updated with final URL for Ad ID: {ad_id}")
 
                     self.show_info("Scraping completed successfully and data saved to Excel.")
@@ -887,6 +1254,144 @@ class RealEstateApp:
             self.stop_button_upload_existing.pack_forget()
             self.thread_stop_event.clear()
 
+    def upload_timeout(self):
+        """
+        Seconds one upload may take, from config.json ('upload_timeout').
+        """
+        try:
+            return max(60, int(self.user_config.get('upload_timeout', DEFAULT_UPLOAD_TIMEOUT)))
+        except (TypeError, ValueError):
+            return DEFAULT_UPLOAD_TIMEOUT
+
+    def refresh_bulk_upload_list(self):
+        """
+        Fill the bulk upload list with every Ad ID in the data folder.
+        """
+        self.bulk_tree.delete(*self.bulk_tree.get_children())
+        self.bulk_rows = {
+            ad_id: self.bulk_tree.insert('', tk.END, iid=ad_id, values=(ad_id, "", ""))
+            for ad_id in self.ad_catalog.all()
+        }
+
+    def refresh_ad_ids(self, ad_ids=None):
+        """
+        Add newly scraped Ad IDs to the catalogue and search index (from any
+        thread) and refresh the bulk list. Without 'ad_ids' the data folder is rescanned
+        if it changed.
+        """
+        if ad_ids is None:
+            self.ad_catalog.refresh()
+        else:
+            self.ad_catalog.add(ad_ids)
+        self.update_listing_index(ad_ids)
+        if getattr(self, 'bulk_tree', None) is not None:
+            self.root.after(0, self.refresh_bulk_upload_list)
+
+    def select_not_uploaded(self):
+        """
+        Select every ad whose latest ledger row has no 'Uploaded Timestamp'
+        and no 'ss.ge' URL.
+        """
+        try:
+            pending = self.ledger.not_uploaded_ad_ids()
+        except Exception as e:
+            logging.error(f"Failed to read pending uploads from ledger: {e}")
+            messagebox.showerror("Ledger Error", f"Failed to read the ledger: {e}")
+            return
+        items = [self.bulk_rows[ad_id] for ad_id in pending if ad_id in self.bulk_rows]
+        self.bulk_tree.selection_set(items)
+        if items:
+            self.bulk_tree.see(items[0])
+        else:
+            messagebox.showinfo("Bulk Upload", "Every ad in the data folder has already been uploaded.")
+
+    def start_bulk_upload(self):
+        ad_ids = [self.bulk_tree.item(item, 'values')[0] for item in self.bulk_tree.selection()]
+        if not ad_ids:
+            messagebox.showerror("Input Error", "Please select at least one Ad ID.")
+            return
+        self.bulk_upload_items = [self.bulk_rows[ad_id] for ad_id in ad_ids]
+        for item in self.bulk_upload_items:
+            self.bulk_tree.item(item, values=(self.bulk_tree.item(item, 'values')[0], "", ""))
+        self.run_button_bulk_upload.config(state='disabled')
+        self.run_button_upload_existing.config(state='disabled')
+        self.stop_button_upload_existing.pack(pady=5)
+        Thread(target=self.run_bulk_upload, args=(ad_ids,), daemon=True).start()
+
+    def update_bulk_row(self, index, status, final_url=None):
+        """
+        Progress callback from the upload queue; hands the update to the Tk thread.
+        """
+        def apply():
+            item = self.bulk_upload_items[index]
+            ad_id = self.bulk_tree.item(item, 'values')[0]
+            self.bulk_tree.item(item, values=(ad_id, status, final_url or ""))
+        self.root.after(0, apply)
+
+    def run_bulk_upload(self, ad_ids):
+        """
+        1) Upload every selected ad on one logged-in browser
+        2) Write all resulting ss.ge URLs to the ledger in one batch
+        """
+        try:
+            upload_description = self.upload_description_var_upload.get()
+            logging.info(f"Running bulk upload of {len(ad_ids)} ads.")
+            statuses = {}
+            def progress(index, status, final_url=None):
+                statuses[index] = status
+                self.update_bulk_row(index, status, final_url)
+            results = run_upload_queue(
+                ad_ids,
+                username=self.user_config['email'],
+                password=self.user_config['password'],
+                enter_description=upload_description,
+                headless=False,
+                stop_event=self.thread_stop_event,
+                output_dir=os.path.join(self.user_data_dir, 'data'),
+                progress_callback=progress,
+                timeout=self.upload_timeout(),
+                automated=self.automated_upload_var.get(),
+                duplicate_detector=self.active_duplicate_detector()
+            )
+
+            current_timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            updates = {
+                ad_id: {"Uploaded Timestamp": current_timestamp, "ss.ge": final_url}
+                for ad_id, final_url in results if final_url
+            }
+            # Published but the URL couldn't be read: mark uploaded so they aren't posted again
+            published = [ad_id for index, (ad_id, _) in enumerate(results)
+                         if statuses.get(index) == QUEUE_PUBLISHED_NO_URL]
+            for ad_id in published:
+                updates[ad_id] = {"Uploaded Timestamp": current_timestamp}
+            if updates:
+                try:
+                    updated = self.excel_writer.update_many(updates).result()
+                    missing = [ad_id for ad_id, ok in updated.items() if not ok]
+                    if missing:
+                        logging.warning(f"Uploaded ads not found in ledger: {', '.join(missing)}")
+                    logging.info(f"Bulk upload recorded {len(updates)} URLs in the ledger.")
+                except Exception as e:
+                    logging.error(f"Failed to record bulk upload URLs: {e}")
+                    self.show_error(f"Failed to update Excel: {e}")
+                    return
+
+            failed = len(ad_ids) - len(updates)
+            no_url = f" {len(published)} of them without a URL (see app.log)." if published else ""
+            if self.thread_stop_event.is_set():
+                self.show_info(f"Bulk upload stopped. {len(updates)} ads uploaded.{no_url}")
+            else:
+                self.show_info(f"Bulk upload finished. {len(updates)} ads uploaded, {failed} not uploaded (failed or duplicate).{no_url}")
+
+        except Exception as e:
+            logging.error(f"An error occurred in run_bulk_upload: {e}")
+            self.show_error(f"An error occurred: {e}")
+        finally:
+            self.root.after(0, lambda: self.run_button_bulk_upload.config(state='normal'))
+            self.root.after(0, lambda: self.run_button_upload_existing.config(state='normal'))
+            self.root.after(0, self.stop_button_upload_existing.pack_forget)
+            self.thread_stop_event.clear()
+
     def validate_scrape_upload_inputs(self):
         if not self.url.get() or not self.agency_price.get():
             messagebox.showerror("Input Error", "Please enter both URL and agency price.")
@@ -900,12 +1405,7 @@ class RealEstateApp:
         return True
 
     def update_ad_id_autocomplete(self, event):
-        typed = self.existing_ad_id.get()
-        data = []
-        if typed == '':
-            data = self.all_ad_ids
-        else:
-            data = [ad_id for ad_id in self.all_ad_ids if typed.lower() in ad_id.lower()]
+        data = self.ad_catalog.search(self.existing_ad_id.get(), limit=AUTOCOMPLETE_LIMIT)
 
         if data:
             self.update_ad_id_listbox(data)
@@ -926,12 +1426,6 @@ class RealEstateApp:
             self.existing_ad_id.set(selected_ad_id)
             self.ad_id_listbox.pack_forget()
 
-    def get_all_ad_ids(self):
-        data_folder = os.path.join(self.user_data_dir, 'data')
-        if not os.path.exists(data_folder):
-            return []
-        return [name for name in os.listdir(data_folder) if os.path.isdir(os.path.join(data_folder, name))]
-
     def change_user(self):
         confirm = messagebox.askyesno("Change User", "Are you sure you want to change the user?")
         if confirm:
@@ -956,6 +1450,22 @@ class RealEstateApp:
     def show_info(self, message):
         self.root.after(0, lambda: messagebox.showinfo("Success", message))
 
+    def ask_yes_no(self, title, message):
+        """
+        Ask a yes/no question from a worker thread: the dialog runs on the
+        Tk thread and this blocks until it is answered.
+        """
+        answered = Event()
+        answer = {}
+        def ask():
+            try:
+                answer["yes"] = messagebox.askyesno(title, message)
+            finally:
+                answered.set()
+        self.root.after(0, ask)
+        answered.wait()
+        return answer.get("yes", False)
+
     def open_url(self, event):
         url = self.upload_link.get().split("ss.ge: ")[-1]
         if url:
@@ -969,6 +1479,11 @@ class RealEstateApp:
 
     def open_excel_file(self):
         excel_path = os.path.join(self.user_data_dir, EXCEL_FILE)
+        try:
+            self.sync_excel()
+        except Exception as e:
+            # The writer thread has already reported the failure.
+            logging.error(f"Failed to export Excel from ledger: {e}")
         if not os.path.exists(excel_path):
             self.show_error("Excel file does not exist.")
             return
@@ -988,6 +1503,8 @@ class RealEstateApp:
         logging.info("Stop event triggered.")
 
 if __name__ == "__main__":
+    # Image preprocessing runs on a process pool; needed in the frozen .exe
+    multiprocessing.freeze_support()
     app = ttk.Window(themename="flatly")
     RealEstateApp(app)
     app.mainloop()
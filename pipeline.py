@@ -0,0 +1,278 @@
+# pipeline.py
+
+import queue
+import logging
+import datetime
+import threading
+from scraper import run_scraper
+from uploader import run_uploader, UploadTimeout, PublishedWithoutUrl, DEFAULT_UPLOAD_TIMEOUT
+from ledger import build_excel_row
+from driver_pool import get_driver_pool
+from image_fetcher import wait_for_image_download
+
+# Per-stage worker counts and queue bound; config.json 'pipeline' overrides them.
+DEFAULT_PIPELINE_CONFIG = {
+    "scrape_workers": 2,
+    "persist_workers": 1,
+    "upload_workers": 1,
+    "queue_size": 2,
+}
+
+STATUS_QUEUED = "Queued"
+STATUS_SCRAPING = "Scraping"
+STATUS_SAVING = "Saving"
+STATUS_WAITING_UPLOAD = "Waiting to upload"
+STATUS_UPLOADING = "Uploading"
+STATUS_DONE = "Done"
+STATUS_FAILED = "Failed"
+STATUS_SAVE_FAILED = "Save failed"
+STATUS_STOPPED = "Stopped"
+STATUS_TIMED_OUT = "Timed out"
+STATUS_DUPLICATE = "Duplicate"
+STATUS_PUBLISHED_NO_URL = "Published, URL unknown"
+
+_DONE = object()
+
+def pipeline_config(user_config):
+    """
+    Merge config.json's 'pipeline' section over the defaults; every value
+    is clamped to at least 1.
+    """
+    config = dict(DEFAULT_PIPELINE_CONFIG)
+    overrides = (user_config or {}).get("pipeline") or {}
+    for key in config:
+        try:
+            config[key] = max(1, int(overrides.get(key, config[key])))
+        except (TypeError, ValueError):
+            logging.warning(f"Ignoring invalid pipeline setting {key}={overrides.get(key)!r}")
+    return config
+
+class ScrapeUploadPipeline:
+    """
+    Scrape -> persist -> upload, with each stage on its own worker threads
+    and bounded queues in between.
+
+    While ad N is uploading, ad N+1 is already being scraped; when the
+    upload stage falls behind, the queues fill up and the scrapers wait
+    (back-pressure) instead of piling up browsers and data.
+
+    'writer' is the ExcelWriter the rows are recorded through. With a
+    'duplicate_detector', ads that look like an already uploaded one are
+    reported as STATUS_DUPLICATE and not uploaded.
+    progress_callback(index, status, ad_id) is called from worker threads;
+    ad_id is None until the ad has been scraped.
+    """
+
+    def __init__(self, writer, username, password, output_dir, config=None,
+                 scrape_headless=True, enter_description=True, automated=False,
+                 upload_timeout=DEFAULT_UPLOAD_TIMEOUT, stop_event=None, progress_callback=None,
+                 duplicate_detector=None):
+        self.writer = writer
+        self.username = username
+        self.password = password
+        self.output_dir = output_dir
+        self.config = dict(config or DEFAULT_PIPELINE_CONFIG)
+        self.scrape_headless = scrape_headless
+        self.enter_description = enter_description
+        self.automated = automated
+        self.upload_timeout = upload_timeout
+        self.stop_event = stop_event or threading.Event()
+        self.progress_callback = progress_callback
+        self.duplicate_detector = duplicate_detector
+
+    def _report(self, index, status, value=None):
+        if self.progress_callback:
+            try:
+                self.progress_callback(index, status, value)
+            except Exception as e:
+                logging.warning(f"Pipeline progress callback failed: {e}")
+
+    def _stopped(self):
+        return self.stop_event.is_set()
+
+    def _put(self, target, item):
+        """
+        Blocking put that gives up when the pipeline is stopped.
+        """
+        while True:
+            try:
+                target.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                if self._stopped():
+                    return False
+
+    def _run_stage(self, name, workers, source, target, handle):
+        """
+        Start 'workers' threads that take items from 'source', pass them to
+        handle(item) and forward non-None results to 'target'. Once every
+        worker has seen the end marker, one end marker per downstream worker
+        is sent on.
+        """
+        remaining = [workers]
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                item = source.get()
+                if item is _DONE:
+                    break
+                try:
+                    result = handle(item)
+                except Exception as e:
+                    logging.error(f"Pipeline stage '{name}' failed: {e}", exc_info=True)
+                    self._report(item[0], STATUS_FAILED)
+                    result = None
+                if result is not None and target is not None:
+                    if not self._put(target, result):
+                        self._report(result[0], STATUS_STOPPED)
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last and target is not None:
+                for _ in range(self._downstream_workers[name]):
+                    target.put(_DONE)
+
+        threads = [
+            threading.Thread(target=worker, name=f"pipeline-{name}-{n}", daemon=True)
+            for n in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _scrape(self, item):
+        index, job = item
+        if self._stopped():
+            self._report(index, STATUS_STOPPED)
+            return None
+        self._report(index, STATUS_SCRAPING)
+        result = run_scraper(
+            job["url"],
+            job["agency_price"],
+            comment=job["comment"],
+            headless=self.scrape_headless,
+            stop_event=self.stop_event,
+            output_dir=self.output_dir
+        )
+        if not result:
+            self._report(index, STATUS_STOPPED if self._stopped() else STATUS_FAILED)
+            return None
+        return (index, job, result)
+
+    def _persist(self, item):
+        index, job, result = item
+        ad_id = result.ad_id
+        # The ad is on disk once scraped, whether or not the row gets written
+        self._results[index] = (job, ad_id, None)
+        self._report(index, STATUS_SAVING, ad_id)
+        try:
+            self.writer.append_rows([build_excel_row(result.listing, job["comment"])]).result()
+        except Exception as e:
+            logging.error(f"Failed to write to Excel for Ad ID {ad_id}: {e}")
+            self._report(index, STATUS_SAVE_FAILED, ad_id)
+            return None
+        if self._stopped():
+            self._report(index, STATUS_STOPPED, ad_id)
+            return None
+        self._report(index, STATUS_WAITING_UPLOAD, ad_id)
+        return (index, job, result)
+
+    def _upload(self, item):
+        index, job, result = item
+        ad_id = result.ad_id
+        if self._stopped():
+            self._report(index, STATUS_STOPPED, ad_id)
+            return None
+        if self.duplicate_detector is not None:
+            # Image hashes need the downloaded images; run_uploader would wait for them anyway
+            if not wait_for_image_download(result.directory, stop_event=self.stop_event):
+                self._report(index, STATUS_STOPPED, ad_id)
+                return None
+            duplicates = self.duplicate_detector.upload_duplicates(result.listing)
+            if duplicates:
+                logging.info(f"Skipping upload of Ad ID {ad_id}, likely duplicate of "
+                             f"{'; '.join(match.describe() for match in duplicates)}")
+                self._report(index, STATUS_DUPLICATE, ad_id)
+                return None
+        self._report(index, STATUS_UPLOADING, ad_id)
+        try:
+            final_url = run_uploader(
+                username=self.username,
+                password=self.password,
+                phone_number="",
+                ad_id=ad_id,
+                enter_description=self.enter_description,
+                headless=False,
+                stop_event=self.stop_event,
+                output_dir=self.output_dir,
+                timeout=self.upload_timeout,
+                automated=self.automated,
+                listing=result.listing
+            )
+        except UploadTimeout as e:
+            logging.error(f"Pipeline upload timed out for Ad ID {ad_id}: {e}")
+            self._report(index, STATUS_TIMED_OUT, ad_id)
+            return None
+        except PublishedWithoutUrl as e:
+            logging.error(f"Pipeline upload of Ad ID {ad_id}: {e}")
+            # Mark it uploaded so it isn't posted again; the URL is left for the user
+            current_timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            try:
+                self.writer.update(ad_id, {"Uploaded Timestamp": current_timestamp}).result()
+            except Exception as write_error:
+                logging.error(f"Failed to mark Ad ID {ad_id} as uploaded: {write_error}")
+            self._report(index, STATUS_PUBLISHED_NO_URL, ad_id)
+            return None
+
+        if not final_url:
+            self._report(index, STATUS_STOPPED if self._stopped() else STATUS_FAILED, ad_id)
+            return None
+        # The listing is live now; keep its URL even if recording it fails
+        self._results[index] = (job, ad_id, final_url)
+        current_timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            self.writer.update(ad_id, {"Uploaded Timestamp": current_timestamp, "ss.ge": final_url}).result()
+        except Exception as e:
+            logging.error(f"Ad ID {ad_id} was uploaded as {final_url} but writing it to Excel failed: {e}")
+            self._report(index, STATUS_SAVE_FAILED, ad_id)
+            return None
+        self._report(index, STATUS_DONE, ad_id)
+        return None
+
+    def run(self, jobs):
+        """
+        Push 'jobs' ({"url", "agency_price", "comment"}) through the pipeline
+        and block until all stages have drained. Returns (job, ad_id,
+        final_url) per job in input order; ad_id is None unless the ad was
+        scraped, final_url None unless it was uploaded.
+        """
+        scrape_workers = self.config["scrape_workers"]
+        persist_workers = self.config["persist_workers"]
+        upload_workers = self.config["upload_workers"]
+        queue_size = self.config["queue_size"]
+
+        self._results = [(job, None, None) for job in jobs]
+        self._downstream_workers = {"scrape": persist_workers, "persist": upload_workers}
+
+        jobs_queue = queue.Queue()
+        persist_queue = queue.Queue(maxsize=queue_size)
+        upload_queue = queue.Queue(maxsize=queue_size)
+
+        for index, job in enumerate(jobs):
+            self._report(index, STATUS_QUEUED)
+            jobs_queue.put((index, job))
+        for _ in range(scrape_workers):
+            jobs_queue.put(_DONE)
+
+        with get_driver_pool().grown(scrape_workers + upload_workers):
+            threads = []
+            threads += self._run_stage("scrape", scrape_workers, jobs_queue, persist_queue, self._scrape)
+            threads += self._run_stage("persist", persist_workers, persist_queue, upload_queue, self._persist)
+            threads += self._run_stage("upload", upload_workers, upload_queue, None, self._upload)
+            for thread in threads:
+                thread.join()
+
+        uploaded = sum(1 for _, _, final_url in self._results if final_url)
+        logging.info(f"Pipeline finished: {uploaded}/{len(jobs)} ads uploaded.")
+        return self._results
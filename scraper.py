@@ -1,44 +1,41 @@
 # scraper.py
 
 import os
-import time
-import json
-import requests
 import re
-from selenium import webdriver
+import logging
+from concurrent.futures import Future
+from dataclasses import dataclass
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, StaleElementReferenceException
-
-def download_image(url, folder_name, image_name, stop_event=None):
-    if stop_event and stop_event.is_set():
-        return
-    if not os.path.exists(folder_name):
-        os.makedirs(folder_name)
-    try:
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            with open(os.path.join(folder_name, image_name), 'wb') as f:
-                f.write(response.content)
-    except Exception:
-        pass
-
-def custom_wait(driver, condition_function, timeout=10, poll_frequency=0.5, stop_event=None):
-    end_time = time.time() + timeout
-    while True:
-        if stop_event and stop_event.is_set():
-            return False
-        try:
-            if condition_function():
-                return True
-        except Exception:
-            pass
-        time.sleep(poll_frequency)
-        if time.time() > end_time:
-            break
-    return False
+from driver_pool import get_driver_pool
+from waits import custom_wait
+from image_fetcher import schedule_image_download
+from listing import Listing, save_listing
+
+@dataclass(slots=True)
+class ScrapeResult:
+    """
+    What run_scraper hands to the rest of the app: the scraped Listing
+    (also saved to '<ad_id>.json' for persistence), the ad folder, and the
+    background image download.
+    """
+    ad_id: str
+    listing: Listing
+    directory: str
+    image_download: Future = None
+
+    @property
+    def json_path(self):
+        return os.path.join(self.directory, f"{self.ad_id}.json")
+
+def split_location(location_full):
+    """
+    Split an address like 'Street Name 12' into ('Street Name', '12').
+    """
+    match = re.search(r'(\d+)$', location_full)
+    if match:
+        return location_full[:match.start()].strip(), match.group(1)
+    return location_full.strip(), ''
 
 def extract_additional_info_updated(driver, stop_event=None):
     additional_info = {}
@@ -125,208 +122,357 @@ def extract_property_details(driver, stop_event=None):
         pass
     return details
 
-def run_scraper(url, agency_price, comment="", headless=False, stop_event=None, output_dir=None):
-    options = Options()
-    if headless:
-        options.add_argument('--headless')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--window-size=1920,1080')
+def scrape_fields_webdriver(driver, stop_event=None):
+    """
+    Extract the listing field by field with individual WebDriver calls.
+    Returns a dict of scraped fields, or None if the page is incomplete.
+    """
+    ad_id = None
+    def get_ad_id():
+        nonlocal ad_id
+        id_elements = driver.find_elements(By.XPATH, "//div[contains(@class, 'sc-edcd5edf-19')]/div/span[contains(text(), 'ID -')]")
+        if id_elements:
+            ad_id = id_elements[0].text.split("-")[-1].strip()
+            return True
+        return False
+
+    if not custom_wait(driver, get_ad_id, stop_event=stop_event):
+        return None
 
-    driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
-    driver.maximize_window()
+    if stop_event and stop_event.is_set():
+        return None
 
-    try:
-        if stop_event and stop_event.is_set():
-            driver.quit()
-            return None
+    ad_title = None
+    def get_ad_title():
+        nonlocal ad_title
+        elements = driver.find_elements(By.CLASS_NAME, "sc-6e54cb25-0.gDYjuA")
+        if elements:
+            ad_title = elements[0].text
+            return True
+        return False
 
-        driver.get(url)
+    if not custom_wait(driver, get_ad_title, stop_event=stop_event):
+        return None
 
-        if stop_event and stop_event.is_set():
-            driver.quit()
-            return None
+    location = None
+    number = None
+    def get_location():
+        nonlocal location, number
+        elements = driver.find_elements(By.ID, "address")
+        if elements:
+            location, number = split_location(elements[0].text)
+            return True
+        return False
+
+    if not custom_wait(driver, get_location, stop_event=stop_event):
+        return None
 
-        ad_id = None
-        def get_ad_id():
-            nonlocal ad_id
-            id_elements = driver.find_elements(By.XPATH, "//div[contains(@class, 'sc-edcd5edf-19')]/div/span[contains(text(), 'ID -')]")
-            if id_elements:
-                ad_id = id_elements[0].text.split("-")[-1].strip()
-                return True
-            return False
+    images = []
+    def get_images():
+        nonlocal images
+        elements = driver.find_elements(By.CLASS_NAME, "sc-1acce1b7-10.kCJmmf")
+        if elements:
+            images = [img.get_attribute("src")[:-10] + ".jpg" for img in elements]
+            return True
+        return False
 
-        if not custom_wait(driver, get_ad_id, stop_event=stop_event):
-            driver.quit()
-            return None
+    if not custom_wait(driver, get_images, stop_event=stop_event):
+        return None
 
-        if stop_event and stop_event.is_set():
-            driver.quit()
-            return None
+    owner_price = None
+    def get_owner_price():
+        nonlocal owner_price
+        elements = driver.find_elements(By.ID, "price")
+        if elements:
+            owner_price = elements[0].text
+            return True
+        return False
 
-        save_directory = os.path.join(output_dir, ad_id)
-        os.makedirs(save_directory, exist_ok=True)
+    if not custom_wait(driver, get_owner_price, stop_event=stop_event):
+        return None
 
-        ad_title = None
-        def get_ad_title():
-            nonlocal ad_title
-            elements = driver.find_elements(By.CLASS_NAME, "sc-6e54cb25-0.gDYjuA")
-            if elements:
-                ad_title = elements[0].text
-                return True
+    def click_show_number():
+        try:
+            button = driver.find_element(By.XPATH, "//button[contains(text(), 'ნომრის ჩვენება')]")
+            button.click()
+            return True
+        except Exception:
             return False
 
-        if not custom_wait(driver, get_ad_title, stop_event=stop_event):
-            driver.quit()
-            return None
+    custom_wait(driver, click_show_number, stop_event=stop_event)
+
+    phone_number = None
+    def get_phone_number():
+        nonlocal phone_number
+        elements = driver.find_elements(By.CLASS_NAME, "sc-6e54cb25-11.kkDxQl")
+        if elements:
+            phone_number = elements[0].text
+            return True
+        return False
+
+    custom_wait(driver, get_phone_number, stop_event=stop_event)
+
+    name = None
+    def get_name():
+        nonlocal name
+        elements = driver.find_elements(By.CLASS_NAME, "sc-6e54cb25-6.eaYTaN")
+        if elements:
+            name = elements[0].text
+            return True
+        return False
+
+    if not custom_wait(driver, get_name, stop_event=stop_event):
+        return None
 
-        location = None
-        number = None
-        def get_location():
-            nonlocal location, number
-            elements = driver.find_elements(By.ID, "address")
-            if elements:
-                location_full = elements[0].text
-                match = re.search(r'(\d+)$', location_full)
-                if match:
-                    number = match.group(1)
-                    location = location_full[:match.start()].strip()
-                else:
-                    number = ''
-                    location = location_full.strip()
-                return True
-            return False
+    description = None
+    def get_description():
+        nonlocal description
+        elements = driver.find_elements(By.CLASS_NAME, "sc-f5b2f014-2.cpLEJS")
+        if elements:
+            description = elements[0].text
+            return True
+        else:
+            return True
+        return False
+
+    if not custom_wait(driver, get_description, stop_event=stop_event):
+        return None
 
-        if not custom_wait(driver, get_location, stop_event=stop_event):
-            driver.quit()
-            return None
+    additional_info = extract_additional_info_updated(driver, stop_event=stop_event)
+    if stop_event and stop_event.is_set():
+        return None
 
-        images = []
-        def get_images():
-            nonlocal images
-            elements = driver.find_elements(By.CLASS_NAME, "sc-1acce1b7-10.kCJmmf")
-            if elements:
-                images = [img.get_attribute("src")[:-10] + ".jpg" for img in elements]
-                return True
-            return False
+    breadcrumbs_data = extract_breadcrumbs(driver, stop_event=stop_event)
+    if stop_event and stop_event.is_set():
+        return None
 
-        if not custom_wait(driver, get_images, stop_event=stop_event):
-            driver.quit()
-            return None
+    features_info = extract_features_info(driver, stop_event=stop_event)
+    if stop_event and stop_event.is_set():
+        return None
 
-        images_directory = os.path.join(save_directory, "images")
-        os.makedirs(images_directory, exist_ok=True)
-        for idx, img_url in enumerate(images, start=1):
-            if stop_event and stop_event.is_set():
-                driver.quit()
-                return None
-            download_image(img_url, images_directory, f"{ad_id}_{idx}.jpg", stop_event=stop_event)
-
-        owner_price = None
-        def get_owner_price():
-            nonlocal owner_price
-            elements = driver.find_elements(By.ID, "price")
-            if elements:
-                owner_price = elements[0].text
-                return True
-            return False
+    property_details = extract_property_details(driver, stop_event=stop_event)
+    if stop_event and stop_event.is_set():
+        return None
 
-        if not custom_wait(driver, get_owner_price, stop_event=stop_event):
-            driver.quit()
-            return None
+    return {
+        "ad_id": ad_id,
+        "ad_title": ad_title,
+        "location": location,
+        "number": number,
+        "images": images,
+        "owner_price": owner_price,
+        "phone_number": phone_number,
+        "name": name,
+        "description": description,
+        "property_details": property_details,
+        "additional_info": additional_info,
+        "breadcrumbs": breadcrumbs_data,
+        "features": features_info,
+    }
+
+EXTRACTION_SNAPSHOT = "snapshot"
+EXTRACTION_WEBDRIVER = "webdriver"
+
+# Reads every field the scraper needs in one execute_script round trip.
+# Selectors mirror the per-field WebDriver extraction above.
+SNAPSHOT_SCRIPT = """
+function text(el) { return el ? (el.innerText || '').trim() : null; }
+function first(root, selector) { return root ? root.querySelector(selector) : null; }
+function all(root, selector) { return root ? Array.prototype.slice.call(root.querySelectorAll(selector)) : []; }
+
+var snapshot = {};
+var idNode = document.evaluate(
+    "//div[contains(@class, 'sc-edcd5edf-19')]/div/span[contains(text(), 'ID -')]",
+    document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue;
+snapshot.ad_id_text = text(idNode);
+snapshot.ad_title = text(first(document, '.sc-6e54cb25-0.gDYjuA'));
+snapshot.address = text(document.getElementById('address'));
+snapshot.image_sources = all(document, '.sc-1acce1b7-10.kCJmmf').map(function(img) { return img.src || ''; });
+snapshot.owner_price = text(document.getElementById('price'));
+snapshot.phone_number = text(first(document, '.sc-6e54cb25-11.kkDxQl'));
+snapshot.name = text(first(document, '.sc-6e54cb25-6.eaYTaN'));
+snapshot.description = text(first(document, '.sc-f5b2f014-2.cpLEJS'));
+
+var additional = first(document, '.sc-1b705347-0.hoeUnZ');
+snapshot.additional_info = all(additional, '.sc-1b705347-1.brMFse').map(function(el) {
+    return text(first(el, 'h3'));
+});
+
+snapshot.breadcrumbs = all(first(document, '.sc-edcd5edf-20.hLHWIj'), 'a').map(text);
+
+snapshot.features = all(first(document, '.sc-abd90df5-0'), '.sc-abd90df5-1').map(function(el) {
+    return {title: text(first(el, 'h3')), disabled: el.hasAttribute('disabled')};
+});
+
+snapshot.property_details = all(first(document, '.sc-479ccbe-0.iQgmTI'), '.sc-479ccbe-1.fdyrTe').map(function(el) {
+    return {title: text(first(el, '.sc-6e54cb25-16.ijRIAC')), value: text(first(el, '.sc-6e54cb25-4.kjoKdz'))};
+});
+return snapshot;
+"""
+
+SNAPSHOT_REQUIRED_FIELDS = ("ad_id_text", "ad_title", "address", "image_sources", "owner_price", "name")
+
+def take_page_snapshot(driver):
+    """
+    Returns the raw snapshot dict of the rendered page (one WebDriver call).
+    """
+    return driver.execute_script(SNAPSHOT_SCRIPT)
+
+def parse_page_snapshot(snapshot):
+    """
+    Turn a raw page snapshot into the same fields scrape_fields_webdriver returns.
+    """
+    location, number = split_location(snapshot["address"])
 
-        def click_show_number():
-            try:
-                button = driver.find_element(By.XPATH, "//button[contains(text(), 'ნომრის ჩვენება')]")
-                button.click()
-                return True
-            except Exception:
-                return False
-
-        custom_wait(driver, click_show_number, stop_event=stop_event)
-
-        phone_number = None
-        def get_phone_number():
-            nonlocal phone_number
-            elements = driver.find_elements(By.CLASS_NAME, "sc-6e54cb25-11.kkDxQl")
-            if elements:
-                phone_number = elements[0].text
-                return True
-            return False
+    additional_info = {}
+    additional = snapshot.get("additional_info") or []
+    for key, value in zip(("სველი წერტილი", "მდგომარეობა", "სტატუსი"), additional):
+        additional_info[key] = value or 'N/A'
+
+    breadcrumbs_data = {}
+    breadcrumb_links = snapshot.get("breadcrumbs") or []
+    if len(breadcrumb_links) >= 3:
+        breadcrumbs_data["category"] = breadcrumb_links[0]
+        breadcrumbs_data["property_type"] = breadcrumb_links[1]
+        breadcrumbs_data["transaction_type"] = breadcrumb_links[2]
 
-        custom_wait(driver, get_phone_number, stop_event=stop_event)
+    features_info = {}
+    for feature in snapshot.get("features") or []:
+        features_info[feature["title"] or 'N/A'] = 'არა' if feature["disabled"] else "კი"
+
+    property_details = {}
+    for detail in snapshot.get("property_details") or []:
+        title = detail["title"] or 'N/A'
+        value = detail["value"] or 'N/A'
+        if title in ("საერთო ფართი", "ოთახი", "საძინებელი"):
+            property_details[title] = value
+        elif title == "სართული":
+            if "/" in value:
+                floor, total_floors = value.split("/")
+                property_details["სართული"] = floor.strip()
+                property_details["სართულიანობა"] = total_floors.strip()
+            else:
+                property_details["სართული"] = value
+                property_details["სართულიანობა"] = "N/A"
+
+    return {
+        "ad_id": snapshot["ad_id_text"].split("-")[-1].strip(),
+        "ad_title": snapshot["ad_title"],
+        "location": location,
+        "number": number,
+        "images": [src[:-10] + ".jpg" for src in snapshot["image_sources"]],
+        "owner_price": snapshot["owner_price"],
+        "phone_number": snapshot.get("phone_number"),
+        "name": snapshot["name"],
+        "description": snapshot.get("description"),
+        "property_details": property_details,
+        "additional_info": additional_info,
+        "breadcrumbs": breadcrumbs_data,
+        "features": features_info,
+    }
+
+def scrape_fields_snapshot(driver, stop_event=None):
+    """
+    Extract the listing from single-call page snapshots instead of dozens of
+    WebDriver round trips. Returns the same fields as scrape_fields_webdriver,
+    or None if the page never became complete.
+    """
+    # A first call outside the wait lets script errors surface to the caller
+    # instead of being retried until the timeout.
+    snapshot = take_page_snapshot(driver)
+    def page_ready():
+        nonlocal snapshot
+        snapshot = take_page_snapshot(driver)
+        return all(snapshot.get(field) for field in SNAPSHOT_REQUIRED_FIELDS)
+
+    if not custom_wait(driver, page_ready, stop_event=stop_event):
+        return None
 
-        name = None
-        def get_name():
-            nonlocal name
-            elements = driver.find_elements(By.CLASS_NAME, "sc-6e54cb25-6.eaYTaN")
-            if elements:
-                name = elements[0].text
-                return True
+    def click_show_number():
+        try:
+            button = driver.find_element(By.XPATH, "//button[contains(text(), 'ნომრის ჩვენება')]")
+            button.click()
+            return True
+        except Exception:
             return False
 
-        if not custom_wait(driver, get_name, stop_event=stop_event):
-            driver.quit()
-            return None
+    custom_wait(driver, click_show_number, stop_event=stop_event)
 
-        description = None
-        def get_description():
-            nonlocal description
-            elements = driver.find_elements(By.CLASS_NAME, "sc-f5b2f014-2.cpLEJS")
-            if elements:
-                description = elements[0].text
-                return True
-            else:
-                return True
-            return False
+    def phone_ready():
+        nonlocal snapshot
+        snapshot = take_page_snapshot(driver)
+        return bool(snapshot.get("phone_number"))
 
-        if not custom_wait(driver, get_description, stop_event=stop_event):
-            driver.quit()
-            return None
+    custom_wait(driver, phone_ready, stop_event=stop_event)
+    if stop_event and stop_event.is_set():
+        return None
 
-        additional_info = extract_additional_info_updated(driver, stop_event=stop_event)
-        if stop_event and stop_event.is_set():
-            driver.quit()
-            return None
+    return parse_page_snapshot(snapshot)
+
+def run_scraper(url, agency_price, comment="", headless=False, stop_event=None, output_dir=None,
+                extraction_mode=EXTRACTION_SNAPSHOT):
+    """
+    Scrape one ad into 'output_dir/<ad_id>/'. Returns a ScrapeResult, or
+    None if scraping failed or was stopped.
+    """
+    pool = get_driver_pool()
+    driver = pool.acquire(headless=headless, stop_event=stop_event)
+    if driver is None:
+        return None
 
-        breadcrumbs_data = extract_breadcrumbs(driver, stop_event=stop_event)
+    try:
         if stop_event and stop_event.is_set():
-            driver.quit()
             return None
 
-        features_info = extract_features_info(driver, stop_event=stop_event)
+        driver.get(url)
+
         if stop_event and stop_event.is_set():
-            driver.quit()
             return None
 
-        property_details = extract_property_details(driver, stop_event=stop_event)
-        if stop_event and stop_event.is_set():
-            driver.quit()
+        fields = None
+        if extraction_mode == EXTRACTION_SNAPSHOT:
+            try:
+                fields = scrape_fields_snapshot(driver, stop_event=stop_event)
+            except Exception as e:
+                logging.warning(f"Snapshot extraction failed, falling back to WebDriver extraction: {e}")
+                fields = scrape_fields_webdriver(driver, stop_event=stop_event)
+        else:
+            fields = scrape_fields_webdriver(driver, stop_event=stop_event)
+
+        if not fields or (stop_event and stop_event.is_set()):
             return None
 
-        data = {
+        ad_id = fields["ad_id"]
+        images = fields["images"]
+        save_directory = os.path.join(output_dir, ad_id)
+        os.makedirs(save_directory, exist_ok=True)
+
+        listing = Listing.from_dict({
             "ad_id": ad_id,
-            "ad_title": ad_title,
-            "location": location,
-            "number": number,
+            "ad_title": fields["ad_title"],
+            "location": fields["location"],
+            "number": fields["number"],
             "images": images,
-            "owner_price": owner_price,
+            "owner_price": fields["owner_price"],
             "agency_price": agency_price,
-            "phone_number": phone_number,
-            "name": name,
-            "description": description,
+            "phone_number": fields["phone_number"],
+            "name": fields["name"],
+            "description": fields["description"],
             "comment": comment,
-            "property_details": property_details,
-            "additional_info": additional_info,
-            "breadcrumbs": breadcrumbs_data,
-            "features": features_info,
-        }
-
-        with open(os.path.join(save_directory, f"{ad_id}.json"), "w", encoding='utf-8') as json_file:
-            json.dump(data, json_file, ensure_ascii=False, indent=4)
-
-        return ad_id
+            "property_details": fields["property_details"],
+            "additional_info": fields["additional_info"],
+            "breadcrumbs": fields["breadcrumbs"],
+            "features": fields["features"],
+        })
+        save_listing(listing, os.path.join(save_directory, f"{ad_id}.json"))
 
     except Exception:
         return None
     finally:
-        driver.quit()
+        pool.release(driver)
+
+    # The browser is back in the pool; images download in the background and
+    # the ad folder is marked complete once they are on disk.
+    image_download = schedule_image_download(images, save_directory, ad_id, stop_event=stop_event)
+    return ScrapeResult(ad_id, listing, save_directory, image_download)
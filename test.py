@@ -5,7 +5,7 @@ import os
 import json
 import threading
 import logging
-import pandas as pd
+import datetime
 import subprocess
 import webbrowser
 
@@ -19,11 +19,14 @@ from PyQt5.QtCore import Qt, QThread, QSize
 from PyQt5.QtGui import QIcon, QCursor
 
 import pyperclip
-import openpyxl
 
 # Your existing modules
 from scraper import run_scraper
 from uploader import run_uploader
+from listing import load_listing
+from ledger import Ledger, LEDGER_FILE, build_excel_row
+from excel_writer import ExcelWriter
+from ad_catalog import AdCatalog, CATALOG_FILE
 
 # Configure logging
 logging.basicConfig(
@@ -56,22 +59,6 @@ def get_user_data_dir():
         return os.path.abspath(".")
 
 
-def flatten_json(y):
-    out = {}
-
-    def flatten(x, name=''):
-        if isinstance(x, dict):
-            for a in x:
-                if a == 'images':  # Skip images
-                    continue
-                flatten(x[a], f'{a}_' if name == '' else f'{name}{a}_')
-        else:
-            out[name[:-1]] = x
-
-    flatten(y)
-    return out
-
-
 class RealEstateApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -86,7 +73,7 @@ class RealEstateApp(QMainWindow):
         # State
         self.user_data_dir = get_user_data_dir()
         self.thread_stop_event = threading.Event()
-        self.all_ad_ids = []
+        self.ad_catalog = None
 
         # PyQt widgets for "Scrape & Upload" tab
         self.url_input = None
@@ -120,6 +107,12 @@ class RealEstateApp(QMainWindow):
         # Config and UI Setup
         self.ensure_user_data_dir_exists()
         self.user_config = self.load_or_create_config()
+        self.ledger = self.open_ledger()
+        self.excel_writer = ExcelWriter(
+            self.ledger,
+            os.path.join(self.user_data_dir, EXCEL_FILE),
+            on_error=lambda message: logging.error(f"Excel writer: {message}")
+        )
         self.init_ui()
 
     # ---------------------------
@@ -137,6 +130,27 @@ class RealEstateApp(QMainWindow):
                     f"Failed to create user data directory: {e}"
                 )
 
+    def open_ledger(self):
+        """Open the SQLite ledger, importing an existing Excel file on first run."""
+        ledger = Ledger(os.path.join(self.user_data_dir, LEDGER_FILE))
+        try:
+            ledger.import_excel(os.path.join(self.user_data_dir, EXCEL_FILE))
+        except Exception as e:
+            logging.error(f"Failed to import Excel into ledger: {e}")
+        return ledger
+
+    def sync_excel(self):
+        """Ask the Excel writer thread to save pending changes now."""
+        self.excel_writer.flush()
+
+    def closeEvent(self, event):
+        try:
+            self.excel_writer.close()
+        except Exception as e:
+            logging.error(f"Failed to export Excel on exit: {e}")
+        self.ledger.close()
+        super().closeEvent(event)
+
     def load_or_create_config(self):
         config_path = os.path.join(self.user_data_dir, CONFIG_FILE)
         if os.path.exists(config_path):
@@ -280,7 +294,10 @@ class RealEstateApp(QMainWindow):
         self.ensure_excel_file_exists()
 
         # Load Ad IDs
-        self.all_ad_ids = self.get_all_ad_ids()
+        self.ad_catalog = AdCatalog(
+            os.path.join(self.user_data_dir, 'data'),
+            os.path.join(self.user_data_dir, CATALOG_FILE)
+        )
 
     def build_scrape_upload_tab(self, parent_widget):
         layout = QVBoxLayout()
@@ -442,22 +459,8 @@ class RealEstateApp(QMainWindow):
     def ensure_excel_file_exists(self):
         excel_path = os.path.join(self.user_data_dir, EXCEL_FILE)
         if not os.path.exists(excel_path):
-            columns = [
-                "Ad ID", "Ad Title", "Location", "Number",
-                "Owner Price", "Agency Price", "Phone Number", "Name",
-                "Description", "Comment", "საერთო ფართი", "ოთახი",
-                "საძინებელი", "სართული", "სართულიანობა", "სველი წერტილი",
-                "მდგომარეობა", "სტატუსი", "category", "property_type",
-                "transaction_type", "კონდიციონერი", "აივანი", "სარდაფი",
-                "საკაბელო ტელევიზია", "ლიფტი", "მაცივარი", "ავეჯი",
-                "გარაჟი", "მინა-პაკეტი", "ცენტ. გათბობა", "ცხელი წყალი",
-                "ინტერნეტი", "რკინის კარი", "ბუნებრივი აირი", "სიგნალიზაცია",
-                "სათავსო", "ტელეფონი", "ტელევიზორი", "სარეცხი მანქანა",
-                "Final URL"
-            ]
             try:
-                df = pd.DataFrame(columns=columns)
-                df.to_excel(excel_path, index=False)
+                self.sync_excel()
                 logging.info("Excel file created with proper columns.")
             except Exception as e:
                 logging.error(f"Failed to create Excel file: {e}")
@@ -466,15 +469,6 @@ class RealEstateApp(QMainWindow):
                     f"Failed to create Excel file: {e}"
                 )
 
-    def get_all_ad_ids(self):
-        data_folder = os.path.join(self.user_data_dir, 'data')
-        if not os.path.exists(data_folder):
-            return []
-        return [
-            name for name in os.listdir(data_folder)
-            if os.path.isdir(os.path.join(data_folder, name))
-        ]
-
     # ---------------------------
     #  Scrape & Upload Tab Actions
     # ---------------------------
@@ -504,7 +498,7 @@ class RealEstateApp(QMainWindow):
                 return
 
             # Scrape
-            ad_id = run_scraper(
+            result = run_scraper(
                 self.url_input.text().strip(),
                 self.agency_price_input.text().strip(),
                 comment=self.comment_input.text().strip(),
@@ -512,57 +506,24 @@ class RealEstateApp(QMainWindow):
                 stop_event=self.thread_stop_event,
                 output_dir=data_dir
             )
+            ad_id = result.ad_id if result else None
             logging.info(f"Scraper returned Ad ID: {ad_id}")
             if self.thread_stop_event.is_set():
                 self.show_info("Process was stopped.")
                 return
 
-            if not ad_id:
+            if not result:
                 self.show_error("Scraping failed. Check the URL and try again.")
                 return
 
-            # Check JSON existence
-            json_file_path = os.path.join(data_dir, ad_id, f"{ad_id}.json")
-            if not os.path.exists(json_file_path):
-                logging.error("Scraped data file not found.")
-                self.show_error("Scraped data file not found.")
-                return
+            excel_data = build_excel_row(result.listing, self.comment_input.text().strip())
 
-            # Load JSON
-            with open(json_file_path, "r", encoding='utf-8') as jf:
-                try:
-                    scraped_data = json.load(jf)
-                except json.JSONDecodeError as e:
-                    logging.error(f"JSON decode error: {e}")
-                    self.show_error(f"Failed to decode JSON file: {e}")
-                    return
-
-            flattened_data = flatten_json(scraped_data)
-            # minimal example of excel_data
-            excel_data = {
-                "Ad ID": flattened_data.get("ad_id", ""),
-                "Ad Title": flattened_data.get("ad_title", ""),
-                "Owner Price": flattened_data.get("owner_price", ""),
-                "Agency Price": flattened_data.get("agency_price", ""),
-                "Description": flattened_data.get("description", ""),
-                "Comment": flattened_data.get("comment", ""),
-                "Final URL": ""
-            }
-
-            # Write to Excel
-            excel_path = os.path.join(self.user_data_dir, EXCEL_FILE)
+            # Record in ledger (Excel is regenerated from it)
             try:
-                if not os.path.exists(excel_path):
-                    df = pd.DataFrame([excel_data])
-                    df.to_excel(excel_path, index=False)
-                    logging.info("Excel file created and data written successfully.")
-                else:
-                    df = pd.read_excel(excel_path)
-                    df = pd.concat([df, pd.DataFrame([excel_data])], ignore_index=True)
-                    df.to_excel(excel_path, index=False)
-                    logging.info(f"Data appended to Excel for Ad ID: {ad_id}")
+                self.excel_writer.append_rows([excel_data]).result()
+                logging.info(f"Data recorded in ledger for Ad ID: {ad_id}")
             except Exception as e:
-                logging.error(f"Failed to write to Excel: {e}")
+                logging.error(f"Failed to write to ledger: {e}")
                 self.show_error(f"Failed to write to Excel: {e}")
                 return
 
@@ -574,12 +535,13 @@ class RealEstateApp(QMainWindow):
             final_url = run_uploader(
                 username=self.user_config['email'],
                 password=self.user_config['password'],
-                phone_number=flattened_data.get("phone_number", ""),
+                phone_number=result.listing.phone_number,
                 ad_id=ad_id,
                 enter_description=upload_description,
                 headless=False,
                 stop_event=self.thread_stop_event,
-                output_dir=data_dir
+                output_dir=data_dir,
+                listing=result.listing
             )
             logging.info(f"Uploader returned Final URL: {final_url}")
             if self.thread_stop_event.is_set():
@@ -587,32 +549,12 @@ class RealEstateApp(QMainWindow):
                 return
 
             if final_url:
-                # Update Final URL in Excel
-                wb = openpyxl.load_workbook(excel_path)
-                ws = wb.active
-                header_map = {cell.value: idx for idx, cell in enumerate(ws[1], 1)}
-                ad_id_col = header_map.get('Ad ID')
-                final_url_col = header_map.get('Final URL')
-
-                if not ad_id_col:
-                    raise ValueError("'Ad ID' column not found in Excel.")
-                if not final_url_col:
-                    final_url_col = ws.max_column + 1
-                    ws.cell(row=1, column=final_url_col, value='Final URL')
-
-                updated = False
-                for row in ws.iter_rows(min_row=2, values_only=False):
-                    cell = row[ad_id_col - 1]
-                    if cell.value == ad_id:
-                        row[final_url_col - 1].value = final_url
-                        updated = True
-                        break
-
-                if not updated:
-                    raise ValueError(f"Ad ID {ad_id} not found in Excel.")
-
-                wb.save(excel_path)
-                logging.info(f"Final URL updated in Excel for Ad ID: {ad_id}")
+                # Update timestamp and ss.ge URL in the ledger
+                current_timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                update = self.excel_writer.update(ad_id, {"Uploaded Timestamp": current_timestamp, "ss.ge": final_url})
+                if not update.result():
+                    raise ValueError(f"Ad ID {ad_id} not found in ledger.")
+                logging.info(f"Final URL updated in ledger for Ad ID: {ad_id}")
 
                 self.show_info("Scraping completed successfully and data saved to Excel.")
                 self.upload_link_label.setText(f"Upload Successful!\nFinal URL: {final_url}")
@@ -620,7 +562,7 @@ class RealEstateApp(QMainWindow):
             else:
                 self.show_error("Upload failed. Please check the logs for more details.")
 
-            self.all_ad_ids = self.get_all_ad_ids()
+            self.ad_catalog.add([ad_id])
         except Exception as e:
             logging.error(f"An error occurred in run_scrape_upload: {e}", exc_info=True)
             self.show_error(f"An error occurred: {e}")
@@ -653,7 +595,7 @@ class RealEstateApp(QMainWindow):
             logging.info(f"Running scraper with data directory: {data_dir}")
 
             headless = self.headless_checkbox_scrape_only.isChecked()
-            ad_id = run_scraper(
+            result = run_scraper(
                 self.url_input_scrape_only.text().strip(),
                 self.agency_price_input_scrape_only.text().strip(),
                 comment=self.comment_input_scrape_only.text().strip(),
@@ -661,50 +603,27 @@ class RealEstateApp(QMainWindow):
                 stop_event=self.thread_stop_event,
                 output_dir=data_dir
             )
+            ad_id = result.ad_id if result else None
             logging.info(f"Scraper returned Ad ID: {ad_id}")
             if self.thread_stop_event.is_set():
                 self.show_info("Process was stopped.")
                 return
 
-            if not ad_id:
+            if not result:
                 self.show_error("Scraping failed. Check the URL and try again.")
                 return
 
-            json_file_path = os.path.join(data_dir, ad_id, f"{ad_id}.json")
-            if not os.path.exists(json_file_path):
-                logging.error("Scraped data file not found.")
-                self.show_error("Scraped data file not found.")
-                return
-
-            with open(json_file_path, "r", encoding='utf-8') as jf:
-                try:
-                    scraped_data = json.load(jf)
-                    logging.info("Scraped data loaded successfully.")
-                except json.JSONDecodeError as e:
-                    logging.error(f"JSON decode error: {e}")
-                    self.show_error(f"Failed to decode JSON file: {e}")
-                    return
-
-            flattened_data = flatten_json(scraped_data)
-            excel_data = {
-                "Ad ID": flattened_data.get("ad_id", ""),
-                "Ad Title": flattened_data.get("ad_title", ""),
-                "Final URL": ""
-            }
+            excel_data = build_excel_row(
+                result.listing,
+                self.comment_input_scrape_only.text().strip(),
+                uploaded_timestamp="SCRAPE ONLY"
+            )
 
-            excel_path = os.path.join(self.user_data_dir, EXCEL_FILE)
             try:
-                if not os.path.exists(excel_path):
-                    df = pd.DataFrame([excel_data])
-                    df.to_excel(excel_path, index=False)
-                    logging.info("Excel file created and data written successfully.")
-                else:
-                    df = pd.read_excel(excel_path)
-                    df = pd.concat([df, pd.DataFrame([excel_data])], ignore_index=True)
-                    df.to_excel(excel_path, index=False)
-                    logging.info(f"Data appended to Excel for Ad ID: {ad_id}")
+                self.excel_writer.append_rows([excel_data]).result()
+                logging.info(f"Data recorded in ledger for Ad ID: {ad_id}")
             except Exception as e:
-                logging.error(f"Failed to write to Excel: {e}")
+                logging.error(f"Failed to write to ledger: {e}")
                 self.show_error(f"Failed to write to Excel: {e}")
                 return
 
@@ -735,7 +654,6 @@ class RealEstateApp(QMainWindow):
     def run_upload_existing_thread(self, ad_id_val):
         self.show_progress(self.progress_upload_existing, True)
         try:
-            excel_path = os.path.join(self.user_data_dir, EXCEL_FILE)
             upload_description = self.upload_desc_checkbox_upload.isChecked()
 
             if self.thread_stop_event.is_set():
@@ -748,23 +666,23 @@ class RealEstateApp(QMainWindow):
                 self.show_error("Scraped data file not found.")
                 return
 
-            with open(json_file_path, "r", encoding='utf-8') as jf:
-                try:
-                    scraped_data = json.load(jf)
-                except json.JSONDecodeError as e:
-                    logging.error(f"JSON decode error: {e}")
-                    self.show_error(f"Failed to decode JSON file: {e}")
-                    return
+            try:
+                listing = load_listing(json_file_path)
+            except ValueError as e:
+                logging.error(f"JSON decode error: {e}")
+                self.show_error(f"Failed to decode JSON file: {e}")
+                return
 
             final_url = run_uploader(
                 username=self.user_config['email'],
                 password=self.user_config['password'],
-                phone_number=scraped_data.get("phone_number", ""),
+                phone_number=listing.phone_number,
                 ad_id=ad_id_val,
                 enter_description=upload_description,
                 headless=False,
                 stop_event=self.thread_stop_event,
-                output_dir=os.path.join(self.user_data_dir, 'data')
+                output_dir=os.path.join(self.user_data_dir, 'data'),
+                listing=listing
             )
             logging.info(f"Uploader returned Final URL: {final_url}")
 
@@ -773,30 +691,9 @@ class RealEstateApp(QMainWindow):
                 return
 
             if final_url:
-                wb = openpyxl.load_workbook(excel_path)
-                ws = wb.active
-                header_map = {cell.value: idx for idx, cell in enumerate(ws[1], 1)}
-                ad_id_col = header_map.get('Ad ID')
-                final_url_col = header_map.get('Final URL')
-
-                if not ad_id_col:
-                    raise ValueError("'Ad ID' column not found in Excel.")
-                if not final_url_col:
-                    final_url_col = ws.max_column + 1
-                    ws.cell(row=1, column=final_url_col, value='Final URL')
-
-                updated = False
-                for row in ws.iter_rows(min_row=2, values_only=False):
-                    if row[ad_id_col - 1].value == ad_id_val:
-                        row[final_url_col - 1].value = final_url
-                        updated = True
-                        break
-
-                if not updated:
-                    raise ValueError(f"Ad ID {ad_id_val} not found in Excel.")
-
-                wb.save(excel_path)
-                logging.info(f"Final URL updated in Excel for Ad ID: {ad_id_val}")
+                if not self.excel_writer.update(ad_id_val, {"ss.ge": final_url}).result():
+                    raise ValueError(f"Ad ID {ad_id_val} not found in ledger.")
+                logging.info(f"Final URL updated in ledger for Ad ID: {ad_id_val}")
 
                 self.show_info("Scraping completed successfully and data saved to Excel.")
                 self.upload_link_label.setText(f"Upload Successful!\nFinal URL: {final_url}")
@@ -939,6 +836,11 @@ class RealEstateApp(QMainWindow):
 
     def open_excel_file(self):
         excel_path = os.path.join(self.user_data_dir, EXCEL_FILE)
+        try:
+            self.sync_excel()
+        except Exception as e:
+            # The writer thread has already reported the failure.
+            logging.error(f"Failed to export Excel from ledger: {e}")
         if not os.path.exists(excel_path):
             self.show_error("Excel file does not exist.")
             return
@@ -964,11 +866,7 @@ class RealEstateApp(QMainWindow):
             self.ad_id_listwidget.setVisible(False)
 
     def update_ad_id_autocomplete(self, text):
-        typed = text.strip().lower()
-        if not typed:
-            data = self.all_ad_ids
-        else:
-            data = [ad_id for ad_id in self.all_ad_ids if typed in ad_id.lower()]
+        data = self.ad_catalog.search(text, limit=100) if self.ad_catalog else []
 
         self.ad_id_listwidget.clear()
         if data:
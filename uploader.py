@@ -2,19 +2,27 @@
 
 import os
 import time
+import re
 import json
-import pyperclip
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import (
-    NoSuchElementException,
-    ElementClickInterceptedException
-)
 from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import StaleElementReferenceException
 import logging
+from driver_pool import get_driver_pool
+from image_fetcher import wait_for_image_download, ad_image_paths
+from image_store import store_root_for
+from image_preprocess import preprocess_images
+from waits import custom_wait as wait_until
+from listing import load_listing, listing_path, format_number, TOTAL_AREA, FLOOR, TOTAL_FLOORS
+from login_session import (
+    PROFILES_DIR,
+    get_profile_dir,
+    load_session,
+    save_session,
+    discard_session,
+    restore_session,
+    finish_session_restore
+)
 
 logging.basicConfig(
     filename=os.path.join(os.getcwd(), 'uploader.log'),
@@ -22,38 +30,68 @@ logging.basicConfig(
     format='%(asctime)s:%(levelname)s:%(message)s'
 )
 
-def custom_wait(driver, condition_function, timeout=10, poll_frequency=0.5, stop_event=None):
+class StepTimer:
+    """
+    Records how long each named step of an upload took, so slow steps show
+    up in the log instead of being hidden behind fixed sleeps.
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.steps = []
+        self._start = time.perf_counter()
+        self._last = self._start
+
+    def mark(self, step):
+        now = time.perf_counter()
+        self.steps.append((step, now - self._last))
+        self._last = now
+
+    def total(self):
+        return time.perf_counter() - self._start
+
+    def report(self):
+        lines = [f"Step timings for {self.label} (total {self.total():.2f}s):"]
+        lines += [f"  {step:<20} {seconds:7.2f}s" for step, seconds in self.steps]
+        message = "\n".join(lines)
+        logging.info(message)
+        print(f"[run_uploader] {message}")
+        return message
+
+def custom_wait(driver, condition_function, timeout=10, poll_frequency=None, stop_event=None):
     """
-    Custom wait function that tries condition_function repeatedly
-    up to 'timeout' seconds, sleeping 'poll_frequency' between tries.
+    Wrapper around waits.custom_wait that logs the outcome.
+    Polling backs off from a few milliseconds and follows DOM mutations,
+    so the wait returns as soon as the condition holds.
     If stop_event is set, it aborts early.
     """
     print(f"[custom_wait] Starting custom wait for up to {timeout} seconds.")
-    end_time = time.time() + timeout
-    while True:
-        if stop_event and stop_event.is_set():
-            print("[custom_wait] Stop event detected. Exiting wait.")
-            return False
-        try:
-            if condition_function():
-                print("[custom_wait] Condition satisfied before timeout.")
-                return True
-        except Exception:
-            pass
-        if stop_event and stop_event.wait(poll_frequency):
-            print("[custom_wait] Stop event triggered during wait.")
-            return False
-        if time.time() > end_time:
-            print("[custom_wait] Timed out waiting for condition.")
-            break
-    return False
+    satisfied = wait_until(
+        driver,
+        condition_function,
+        timeout=timeout,
+        poll_frequency=poll_frequency,
+        stop_event=stop_event
+    )
+    if satisfied:
+        print("[custom_wait] Condition satisfied before timeout.")
+    elif stop_event and stop_event.is_set():
+        print("[custom_wait] Stop event detected. Exiting wait.")
+    else:
+        print("[custom_wait] Timed out waiting for condition.")
+    return satisfied
+
+def is_interactable(element):
+    return element.is_displayed() and element.is_enabled()
 
 def click_element(driver, locator, stop_event=None):
     """
-    Wait up to 10s to find and click an element by locator.
+    Wait up to 10s for an element to be visible and enabled, then click it.
     """
     def condition():
         element = driver.find_element(*locator)
+        if not is_interactable(element):
+            return False
         print(f"[click_element] Clicking element located by {locator}.")
         element.click()
         return True
@@ -62,93 +100,490 @@ def click_element(driver, locator, stop_event=None):
         driver,
         condition_function=condition,
         timeout=10,
-        poll_frequency=0.5,
         stop_event=stop_event
     )
 
 def send_keys_to_element(driver, locator, keys, stop_event=None):
     """
-    Wait up to 10s to find an element by locator and send keys to it.
+    Wait up to 10s for an element to be interactable and send keys to it.
+    The step only counts as done once the input's value has changed, i.e.
+    React has accepted the input; otherwise it is retried.
     """
     def condition():
         element = driver.find_element(*locator)
+        if not is_interactable(element):
+            return False
         print(f"[send_keys_to_element] Sending keys '{keys}' to element located by {locator}.")
         element.clear()
         element.send_keys(keys)
-        return True
+        return not keys or bool(element.get_attribute("value"))
     print(f"[send_keys_to_element] Attempting to send keys '{keys}' to {locator} within 10s.")
     return custom_wait(
         driver,
         condition_function=condition,
         timeout=10,
-        poll_frequency=0.5,
         stop_event=stop_event
     )
 
-def indefinite_click_next(driver, locator, stop_event=None):
+IMAGE_INPUT_LOCATOR = (By.CSS_SELECTOR, "input[type='file']")
+UPLOAD_PROGRESS_SELECTOR = "[role='progressbar'], progress"
+# Progress bars are only counted this many levels around the file input,
+# so the wizard's own step indicator doesn't count as an upload.
+IMAGE_CONTAINER_DEPTH = 3
+IMAGE_UPLOAD_TIMEOUT = 120
+
+def count_upload_progress(driver):
     """
-    Indefinitely try to find and click 'Next' button.
-    The user might be navigating pages manually, so this won't
-    time out. It only returns when the button is successfully clicked.
+    Number of visible upload-progress indicators in the image upload area
+    (the file input's container, IMAGE_CONTAINER_DEPTH levels up).
     """
-    print("[indefinite_click_next] Starting indefinite loop to find & click Next button.")
-    while True:
+    return driver.execute_script(
+        "var input = document.querySelector(arguments[1]);"
+        "if (!input) return 0;"
+        "var scope = input;"
+        "for (var i = 0; i < arguments[2] && scope.parentElement; i++) scope = scope.parentElement;"
+        "return Array.prototype.filter.call(scope.querySelectorAll(arguments[0]),"
+        " function(el) { return el.offsetParent !== null; }).length;",
+        UPLOAD_PROGRESS_SELECTOR,
+        IMAGE_INPUT_LOCATOR[1],
+        IMAGE_CONTAINER_DEPTH
+    )
+
+def wait_for_uploads_idle(driver, timeout=IMAGE_UPLOAD_TIMEOUT, stop_event=None):
+    """
+    Wait until no upload-progress indicator is visible.
+    """
+    return wait_until(driver, lambda: count_upload_progress(driver) == 0,
+                      timeout=timeout, stop_event=stop_event)
+
+def upload_images(driver, image_paths, stop_event=None):
+    """
+    Attach all images to the listing's file input.
+
+    If the input accepts 'multiple' files, every path goes in a single
+    newline-joined send_keys call. Otherwise files are sent one at a time,
+    each as soon as the page has taken the previous one (input re-armed or
+    progress shown). Either way, returns once the progress indicators are
+    gone. Returns False if the input never appeared or stop_event was set.
+    """
+    if not wait_until(driver, lambda: driver.find_elements(*IMAGE_INPUT_LOCATOR),
+                      timeout=10, stop_event=stop_event):
+        print("[upload_images] File input not found.")
+        return False
+
+    image_input = driver.find_element(*IMAGE_INPUT_LOCATOR)
+    one_by_one = image_input.get_attribute("multiple") is None
+    if not one_by_one:
+        print(f"[upload_images] Sending {len(image_paths)} images in one submission.")
+        try:
+            image_input.send_keys("\n".join(image_paths))
+        except Exception as e:
+            # One bad path rejects the whole batch; retry per file so the rest still go up
+            logging.warning(f"Sending all images at once failed ({e}); sending them one by one.")
+            print(f"[upload_images] WARNING: Batch submission failed ({e}); sending images one by one.")
+            one_by_one = True
+    else:
+        print(f"[upload_images] Input is single-file; sending {len(image_paths)} images one by one.")
+    if one_by_one:
+        for image_path in image_paths:
+            if stop_event and stop_event.is_set():
+                return False
+            try:
+                image_input = driver.find_element(*IMAGE_INPUT_LOCATOR)
+                image_input.send_keys(image_path)
+            except Exception as e:
+                logging.warning(f"Could not upload image {image_path}: {e}")
+                print(f"[upload_images] WARNING: Could not upload image {image_path}: {e}")
+                continue
+
+            def taken():
+                current = driver.find_element(*IMAGE_INPUT_LOCATOR)
+                return not current.get_attribute("value") or count_upload_progress(driver) > 0
+            wait_until(driver, taken, timeout=5, stop_event=stop_event)
+
+    if not wait_for_uploads_idle(driver, stop_event=stop_event):
         if stop_event and stop_event.is_set():
-            print("[indefinite_click_next] Stop event detected. Exiting loop.")
             return False
+        logging.warning("Image uploads still in progress after the timeout; continuing.")
+    return True
 
-        try:
-            next_button = driver.find_element(*locator)
-            print("[indefinite_click_next] Next button found. Clicking it now.")
-            next_button.click()
-            time.sleep(1.0)
-            print("[indefinite_click_next] Next button clicked successfully.")
+# Published listings live at /<lang>/udzravi-qoneba/<slug>-<listing id>
+LISTING_URL_PATTERN = re.compile(r"https?://home\.ss\.ge/[a-z]{2}/udzravi-qoneba/[^\s\"'<>?#]*-\d+")
+FINAL_URL_TIMEOUT = 5
+# The read-only "copy link" field on the success page after publishing.
+SUCCESS_LINK_LOCATOR = (By.CSS_SELECTOR, "input[readonly][value*='/udzravi-qoneba/']")
+
+# Keeps whatever the page copies in window.__estageCopiedText instead of
+# relying on the system clipboard, which concurrent uploads would share.
+CLIPBOARD_HOOK_SCRIPT = """
+if (!window.__estageClipboardHook) {
+    window.__estageClipboardHook = true;
+    window.__estageCopiedText = null;
+    if (navigator.clipboard && navigator.clipboard.writeText) {
+        var writeText = navigator.clipboard.writeText.bind(navigator.clipboard);
+        navigator.clipboard.writeText = function(text) {
+            window.__estageCopiedText = String(text);
+            return writeText(text).catch(function() {});
+        };
+    }
+    document.addEventListener('copy', function() {
+        var active = document.activeElement;
+        var text = active && typeof active.value === 'string'
+            ? active.value.substring(active.selectionStart, active.selectionEnd)
+            : String(document.getSelection());
+        if (text) { window.__estageCopiedText = text; }
+    }, true);
+}
+"""
+
+COPIED_TEXT_SCRIPT = "return window.__estageCopiedText || '';"
+
+def install_clipboard_hook(driver):
+    try:
+        driver.execute_script(CLIPBOARD_HOOK_SCRIPT)
+    except Exception as e:
+        logging.warning(f"Could not install clipboard hook: {e}")
+
+def copied_text(driver):
+    try:
+        return driver.execute_script(COPIED_TEXT_SCRIPT) or ""
+    except Exception:
+        return ""
+
+def success_page_shown(driver, final_locator, final_page_url):
+    """
+    True once publishing went through: the page copied something, or the
+    final button is gone and the address changed or the success page's
+    link field is showing.
+    """
+    if copied_text(driver):
+        return True
+    if any(is_interactable(element) for element in driver.find_elements(*final_locator)):
+        return False
+    return driver.current_url != final_page_url or bool(driver.find_elements(*SUCCESS_LINK_LOCATOR))
+
+def find_final_url(driver):
+    """
+    Returns the published listing URL, taken only from the text the page
+    copied, the current URL or the success page's link field (in that
+    order). Call it once success_page_shown() holds; other listing links on
+    the page (similar ads, the agent's other ads) are never looked at.
+    """
+    candidates = [copied_text(driver), driver.current_url]
+    candidates += [element.get_attribute("value") for element in driver.find_elements(*SUCCESS_LINK_LOCATOR)[:1]]
+    for candidate in candidates:
+        match = LISTING_URL_PATTERN.search(candidate or "")
+        if match:
+            return match.group(0)
+    return None
+
+class UploadTimeout(TimeoutError):
+    """
+    Raised when an upload step doesn't finish before its deadline.
+    'step' names what was being waited for and 'page' the wizard page the
+    form was on, so callers (e.g. the upload queue) can report it and move on.
+    """
+
+    def __init__(self, step, page, elapsed):
+        super().__init__(f"Timed out after {elapsed:.0f}s waiting for {step} (wizard page: {page})")
+        self.step = step
+        self.page = page
+        self.elapsed = elapsed
+
+class PublishedWithoutUrl(Exception):
+    """
+    Raised when the success page appeared after the final click but the
+    listing URL couldn't be read from it. The listing is live, so callers
+    should record the ad as uploaded rather than upload it again.
+    'page_url' is the address the success page was on.
+    """
+
+    def __init__(self, page_url):
+        super().__init__(f"Listing was published but its URL was not found (page: {page_url})")
+        self.page_url = page_url
+
+# Overall time an upload may take, including pages the user finishes by hand.
+DEFAULT_UPLOAD_TIMEOUT = 15 * 60
+# Waits that may involve the user back off to this poll interval.
+WIZARD_MAX_POLL = 2.0
+FINAL_CLICK_MAX_BACKOFF = 8.0
+
+# Promotion tier picked by automated uploads: the option ('უფასო', free)
+# inside the promotion options group, not any text on the page saying free.
+PROMOTION_OPTIONS_XPATH = (
+    "//*[@role='radiogroup' or contains(@class, 'promotion') or contains(@class, 'Promotion')]"
+)
+FREE_TIER_LOCATOR = (
+    By.XPATH,
+    PROMOTION_OPTIONS_XPATH + "//*[@role='radio' or self::label][contains(normalize-space(.), 'უფასო')]"
+)
+_SELECTED_CLASS = re.compile(r"^(?:selected|active|checked)$|[-_](?:selected|active|checked)$")
+_SELECTED_CAMEL_CLASS = re.compile(r"[a-z](?:Selected|Active|Checked)$")
+
+def is_option_selected(option):
+    """
+    Whether a custom radio option (usually a div or label, where
+    is_selected() is always False) is chosen: aria-checked/aria-selected,
+    a selected/active/checked class, or a checked radio inside it.
+    """
+    if "true" in (option.get_attribute("aria-checked"), option.get_attribute("aria-selected")):
+        return True
+    for token in (option.get_attribute("class") or "").split():
+        if _SELECTED_CLASS.search(token.lower()) or _SELECTED_CAMEL_CLASS.search(token):
             return True
-        except (NoSuchElementException, ElementClickInterceptedException):
-            print("[indefinite_click_next] Next button not found or not clickable yet. Retrying...")
-            time.sleep(0.5)
-        except Exception as e:
-            print(f"[indefinite_click_next] Error while clicking Next button: {e}")
-            time.sleep(0.5)
+    return any(radio.is_selected()
+               for radio in option.find_elements(By.CSS_SELECTOR, "input[type='radio'], input[type='checkbox']"))
+
+WIZARD_FORM = "form"
+WIZARD_NEXT_CLICKED = "next clicked"
+WIZARD_PROMOTION = "promotion"
+WIZARD_FINAL = "final"
+WIZARD_PUBLISHED = "published"
 
-def wait_for_final_element_indefinitely(driver, locator, stop_event=None):
+class UploadWizard:
     """
-    Indefinitely wait for the final element (e.g., a "Finish" button) to appear.
-    Once found, click it, retrieve the final URL from the clipboard, and return it.
+    Drives the pages after the listing form: click 'Next', wait for the
+    final page (the user may pick options there by hand), click the final
+    button and read the published URL. With 'automated' set, the pages in
+    between are completed here too, choosing the free promotion tier.
 
-    If the final element doesn't appear right away,
-    this loop continues until the user triggers stop_event or the element is found.
+    Every wait is bounded by the upload's overall deadline and raises
+    UploadTimeout when it runs out; a set stop_event makes the steps return
+    without raising.
     """
-    print("[wait_for_final_element_indefinitely] Starting indefinite loop to wait for final element.")
-    while True:
-        if stop_event and stop_event.is_set():
-            print("[wait_for_final_element_indefinitely] Stop event detected. Exiting loop.")
+
+    def __init__(self, driver, next_locator, final_locator, deadline, stop_event=None,
+                 automated=False):
+        self.driver = driver
+        self.automated = automated
+        self.next_locator = next_locator
+        self.final_locator = final_locator
+        self.deadline = deadline
+        self.stop_event = stop_event
+        self.page = WIZARD_FORM
+        self._started = time.monotonic()
+
+    def stopped(self):
+        return bool(self.stop_event and self.stop_event.is_set())
+
+    def _set_page(self, page):
+        if page != self.page:
+            print(f"[UploadWizard] {self.page} -> {page}")
+            logging.info(f"Upload wizard: {self.page} -> {page}")
+            self.page = page
+
+    def _visible(self, locator):
+        return any(is_interactable(element) for element in self.driver.find_elements(*locator))
+
+    def _wait(self, step, condition, max_wait=None):
+        """
+        Wait for 'condition' until the deadline (or 'max_wait'). Returns True
+        once it holds, False if stopped; raises UploadTimeout otherwise.
+        Timing out on 'max_wait' before the deadline returns False too.
+        """
+        remaining = self.deadline - time.monotonic()
+        timeout = remaining if max_wait is None else min(remaining, max_wait)
+        if timeout > 0 and wait_until(self.driver, condition, timeout=timeout,
+                                      poll_frequency=WIZARD_MAX_POLL, stop_event=self.stop_event):
+            return True
+        if self.stopped() or (max_wait is not None and time.monotonic() < self.deadline):
+            return False
+        raise UploadTimeout(step, self.page, time.monotonic() - self._started)
+
+    def click_next(self):
+        """
+        Click 'Next' on the form page. Skipped if the user already moved on
+        to the final page by hand.
+        """
+        def ready():
+            return self._visible(self.final_locator) or self._visible(self.next_locator)
+        if not self._wait("the Next button", ready):
+            return False
+        if self._visible(self.final_locator):
+            self._set_page(WIZARD_FINAL)
+            return True
+
+        def clicked():
+            if self._visible(self.final_locator):
+                return True
+            self.driver.find_element(*self.next_locator).click()
+            return True
+        if not self._wait("the Next button to accept a click", clicked):
+            return False
+        if self.page == WIZARD_FORM:
+            self._set_page(WIZARD_NEXT_CLICKED)
+        return True
+
+    def _page_signature(self):
+        return self.driver.execute_script(
+            "return location.href + '|' + document.body.innerText.slice(0, 2000);"
+        )
+
+    def advance_to_final(self):
+        """
+        Automated mode: select the free tier and press 'Next' on every page
+        until the final button shows up.
+        """
+        chosen_on = None
+        while not self._visible(self.final_locator):
+            def actionable():
+                return (self._visible(self.final_locator)
+                        or self._visible(FREE_TIER_LOCATOR)
+                        or self._visible(self.next_locator))
+            if not self._wait("the next wizard page", actionable):
+                return False
+            if self._visible(self.final_locator):
+                break
+            if self._visible(FREE_TIER_LOCATOR):
+                self._set_page(WIZARD_PROMOTION)
+                option = self.driver.find_element(*FREE_TIER_LOCATOR)
+                page = self.driver.current_url
+                # Click once per page: a second click could toggle the choice off
+                if not is_option_selected(option) and chosen_on != page:
+                    print("[UploadWizard] Selecting the free promotion tier.")
+                    option.click()
+                    chosen_on = page
+            if self._visible(self.next_locator):
+                button = self.driver.find_element(*self.next_locator)
+                before = self._page_signature()
+                button.click()
+                # Continue once this page has been replaced
+                def page_changed():
+                    try:
+                        button.is_enabled()
+                    except StaleElementReferenceException:
+                        return True
+                    return self._visible(self.final_locator) or self._page_signature() != before
+                if not self._wait("the wizard to leave the page", page_changed):
+                    return False
+        return True
+
+    def publish(self):
+        """
+        Wait for the final button, click it and return the listing URL.
+        The click is retried with exponential backoff until the success page
+        shows up; if that page has no URL after FINAL_URL_TIMEOUT more
+        seconds, PublishedWithoutUrl is raised instead of clicking again.
+        """
+        if self.automated and not self.advance_to_final():
             return None
+        if not self._wait("the final page", lambda: self._visible(self.final_locator)):
+            return None
+        self._set_page(WIZARD_FINAL)
 
-        time.sleep(0.5)
-        try:
-            final_button = driver.find_element(*locator)
-            print("[wait_for_final_element_indefinitely] Final element found. Clicking it now.")
-            final_button.click()
-            time.sleep(1.0)
-            final_url = pyperclip.paste()
-            if final_url:
-                print("[wait_for_final_element_indefinitely] Final URL found in clipboard.")
-                return final_url
-            else:
-                print("[wait_for_final_element_indefinitely] Clicked final element but clipboard is empty.")
-        except NoSuchElementException:
-            print("[wait_for_final_element_indefinitely] Final element not found yet. Retrying...")
-        except Exception as e:
-            print(f"[wait_for_final_element_indefinitely] Error while waiting for final element: {e}")
+        final_page_url = self.driver.current_url
+        backoff = 1.0
+        while True:
+            try:
+                install_clipboard_hook(self.driver)
+                self.driver.find_element(*self.final_locator).click()
+            except Exception as e:
+                print(f"[UploadWizard] Final button click failed, retrying: {e}")
+
+            found = {}
+            def url_available():
+                if not success_page_shown(self.driver, self.final_locator, final_page_url):
+                    return False
+                found["published"] = True
+                found["url"] = find_final_url(self.driver)
+                return found["url"] is not None
+            try:
+                if self._wait("the published listing URL", url_available,
+                              max_wait=max(FINAL_URL_TIMEOUT, backoff)):
+                    self._set_page(WIZARD_PUBLISHED)
+                    return found["url"]
+                if found.get("published") and not self.stopped():
+                    # Give the success page a moment to fill in, but don't click again
+                    if self._wait("the published listing URL", url_available, max_wait=FINAL_URL_TIMEOUT):
+                        self._set_page(WIZARD_PUBLISHED)
+                        return found["url"]
+            except UploadTimeout:
+                if not found.get("published"):
+                    raise
+            if self.stopped():
+                return None
+            if found.get("published"):
+                self._set_page(WIZARD_PUBLISHED)
+                raise PublishedWithoutUrl(self.driver.current_url)
+            print("[UploadWizard] Clicked final button but no listing URL found yet.")
+            backoff = min(backoff * 2, FINAL_CLICK_MAX_BACKOFF)
+
+# Fields an ad needs before it can be uploaded without a human:
+# (description, Listing attribute)
+AUTOMATED_REQUIRED_FIELDS = [
+    ("property type", "property_type"),
+    ("transaction type", "transaction_type"),
+    ("location", "location"),
+    ("total area", "total_area"),
+    ("agency price", "agency_price"),
+    ("images", "images"),
+]
+
+def missing_upload_fields(listing):
+    """
+    Names of the AUTOMATED_REQUIRED_FIELDS that are empty in 'listing'.
+    """
+    return [name for name, attribute in AUTOMATED_REQUIRED_FIELDS if not getattr(listing, attribute)]
+
+def form_number(listing, value, detail):
+    """
+    Text for a numeric form field: the parsed number, or the scraped
+    property_details text as is if it didn't parse.
+    """
+    return format_number(value) or (listing.property_details.get(detail) or "").strip()
+
+def load_ad_listing(output_dir, ad_id):
+    """
+    Returns the saved Listing of 'ad_id', or None if it can't be read.
+    """
+    try:
+        return load_listing(listing_path(output_dir, ad_id))
+    except Exception as e:
+        logging.error(f"Error reading JSON for ad {ad_id}: {e}")
+        return None
+
+def detect_login_state(driver, login_locator, logged_in_locators, timeout=10, stop_event=None):
+    """
+    Wait until the page shows either the login button (returns False) or
+    one of 'logged_in_locators' (returns True). Undecided counts as False.
+    """
+    state = {}
+    def decided():
+        if any(driver.find_elements(*locator) for locator in logged_in_locators):
+            state["logged_in"] = True
+            return True
+        if driver.find_elements(*login_locator):
+            state["logged_in"] = False
+            return True
+        return False
+    custom_wait(driver, decided, timeout=timeout, stop_event=stop_event)
+    return state.get("logged_in", False)
 
 def run_uploader(username, password, phone_number, ad_id,
                  enter_description=True, headless=False,
-                 stop_event=None, output_dir=None):
+                 stop_event=None, output_dir=None, profiles_dir=None, driver=None,
+                 timeout=DEFAULT_UPLOAD_TIMEOUT, automated=False, listing=None):
     """
     Automates the upload flow on home.ss.ge based on scraped JSON data.
+    The login session is kept in a per-account profile under 'profiles_dir'
+    (by default 'profiles' next to output_dir) and reused while it is valid.
+    If 'driver' is given it is used as-is and left open for the caller
+    (e.g. an upload queue); otherwise a browser is taken from the pool.
+    The whole upload must finish within 'timeout' seconds, otherwise
+    UploadTimeout is raised. PublishedWithoutUrl is raised if the listing
+    went live but its URL couldn't be read.
+
+    With 'automated' set, ads that have every AUTOMATED_REQUIRED_FIELDS
+    entry are uploaded headless with no human input (all wizard pages,
+    free promotion tier); other ads fall back to the interactive flow in a
+    visible browser.
+
+    'listing' is the scraped Listing (e.g. ScrapeResult.listing) when the
+    caller has it in memory; otherwise '<output_dir>/<ad_id>/<ad_id>.json'
+    is loaded.
     """
     print("[run_uploader] Starting run_uploader function.")
+    deadline = time.monotonic() + timeout
     if output_dir is None:
         logging.error("Output directory not provided to run_uploader.")
         print("[run_uploader] Output directory not provided.")
@@ -157,177 +592,204 @@ def run_uploader(username, password, phone_number, ad_id,
     # Prepare paths
     data_folder = os.path.join(output_dir, ad_id)
     json_file_path = os.path.join(data_folder, f"{ad_id}.json")
-    logging.info(f"Uploader looking for JSON file at: {json_file_path}")
-    print(f"[run_uploader] Looking for JSON file at: {json_file_path}")
 
-    if not os.path.exists(json_file_path):
-        logging.error(f"JSON file not found at: {json_file_path}")
-        print("[run_uploader] JSON file not found. Exiting.")
-        return None
+    if listing is not None:
+        print("[run_uploader] Using scraped listing passed in memory.")
+    else:
+        logging.info(f"Uploader looking for JSON file at: {json_file_path}")
+        print(f"[run_uploader] Looking for JSON file at: {json_file_path}")
 
-    # Load scraped data
-    print("[run_uploader] Loading scraped JSON data.")
-    try:
-        with open(json_file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        if not os.path.exists(json_file_path):
+            logging.error(f"JSON file not found at: {json_file_path}")
+            print("[run_uploader] JSON file not found. Exiting.")
+            return None
+
+        # Load scraped data
+        print("[run_uploader] Loading scraped JSON data.")
+        try:
+            listing = load_listing(json_file_path)
             logging.info("JSON data loaded successfully.")
             print("[run_uploader] JSON data loaded successfully.")
-    except json.JSONDecodeError as e:
-        logging.error(f"JSON decode error: {e}")
-        print("[run_uploader] JSON decode error encountered. Exiting.")
-        return None
-    except Exception as e:
-        logging.error(f"Error reading JSON file: {e}")
-        print(f"[run_uploader] Error reading JSON file: {e}")
-        return None
+        except (json.JSONDecodeError, ValueError) as e:
+            logging.error(f"JSON decode error: {e}")
+            print("[run_uploader] JSON decode error encountered. Exiting.")
+            return None
+        except Exception as e:
+            logging.error(f"Error reading JSON file: {e}")
+            print(f"[run_uploader] Error reading JSON file: {e}")
+            return None
 
-    # Chrome options
-    print(f"[run_uploader] Setting up Chrome with headless={headless}")
-    options = Options()
-    if headless:
-        options.add_argument('--headless')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--window-size=1920,1080')
-
-    # Launch browser
-    print("[run_uploader] Launching Chrome browser.")
-    driver = webdriver.Chrome(
-        service=ChromeService(ChromeDriverManager().install()),
-        options=options
-    )
-    driver.maximize_window()
+    if automated:
+        missing = missing_upload_fields(listing)
+        if missing:
+            logging.info(f"Ad {ad_id} is missing {', '.join(missing)}; uploading interactively.")
+            print(f"[run_uploader] Missing {', '.join(missing)}; falling back to interactive upload.")
+            automated = False
+            headless = False
+        else:
+            headless = True
+
+    # Take a warm browser from the shared pool unless the caller owns one
+    pool = None
+    if driver is None:
+        print(f"[run_uploader] Acquiring Chrome session with headless={headless}")
+        pool = get_driver_pool()
+        driver = pool.acquire(headless=headless, stop_event=stop_event)
+        if driver is None:
+            print("[run_uploader] Stop event detected while waiting for a browser.")
+            return None
     final_url = None
+    timer = StepTimer(f"ad {ad_id}")
+    timer.mark("browser")
 
     try:
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event detected before any navigation.")
-            driver.quit()
             return None
 
+        # Reuse this account's saved session when there is one
+        if profiles_dir is None:
+            profiles_dir = os.path.join(os.path.dirname(os.path.abspath(output_dir)), PROFILES_DIR)
+        profile_dir = get_profile_dir(profiles_dir, username)
+        saved_session = load_session(profile_dir)
+        restore_script = restore_session(driver, saved_session) if saved_session else None
+
         print("[run_uploader] Navigating to main create page: https://home.ss.ge/ka/udzravi-qoneba/create")
         driver.get("https://home.ss.ge/ka/udzravi-qoneba/create")
+        finish_session_restore(driver, restore_script)
+        timer.mark("page load")
 
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event detected after navigation. Quitting.")
-            driver.quit()
             return None
 
-        print("[run_uploader] Clicking login locator.")
         login_locator = (By.CLASS_NAME, "sc-8ce7b879-10")
-        if not click_element(driver, login_locator, stop_event=stop_event):
-            print("[run_uploader] Could not click login button. Exiting.")
-            driver.quit()
-            return None
+        add_new_button_path = (By.CSS_SELECTOR, "div.sc-b3bd94d2-0.kmSDJX > button.sc-1c794266-1.eqszNP")
+        property_type = listing.property_type
+        logged_in_locators = [add_new_button_path]
+        if property_type:
+            logged_in_locators.append((By.XPATH, f"//div[text()='{property_type}']"))
 
-        print("[run_uploader] Entering credentials.")
-        if not send_keys_to_element(driver, (By.NAME, "email"), username, stop_event=stop_event):
-            print("[run_uploader] Could not enter email. Exiting.")
-            driver.quit()
-            return None
-        if not send_keys_to_element(driver, (By.NAME, "password"), password, stop_event=stop_event):
-            print("[run_uploader] Could not enter password. Exiting.")
-            driver.quit()
-            return None
+        # A reused browser may already be logged in even without a saved session
+        logged_in = detect_login_state(driver, login_locator, logged_in_locators, stop_event=stop_event)
+        if logged_in:
+            print("[run_uploader] Session is still valid. Skipping login.")
+        elif saved_session:
+            print("[run_uploader] Saved session is no longer valid. Logging in.")
+            discard_session(profile_dir)
 
-        print("[run_uploader] Submitting login form.")
-        submit_locator = (By.CSS_SELECTOR, "button.sc-1c794266-1.cFcCnt")
-        if not click_element(driver, submit_locator, stop_event=stop_event):
-            print("[run_uploader] Could not submit login. Exiting.")
-            driver.quit()
+        if stop_event and stop_event.is_set():
+            print("[run_uploader] Stop event detected while checking the session. Quitting.")
             return None
 
+        if not logged_in:
+            print("[run_uploader] Clicking login locator.")
+            if not click_element(driver, login_locator, stop_event=stop_event):
+                print("[run_uploader] Could not click login button. Exiting.")
+                return None
+
+            print("[run_uploader] Entering credentials.")
+            if not send_keys_to_element(driver, (By.NAME, "email"), username, stop_event=stop_event):
+                print("[run_uploader] Could not enter email. Exiting.")
+                return None
+            if not send_keys_to_element(driver, (By.NAME, "password"), password, stop_event=stop_event):
+                print("[run_uploader] Could not enter password. Exiting.")
+                return None
+
+            print("[run_uploader] Submitting login form.")
+            submit_locator = (By.CSS_SELECTOR, "button.sc-1c794266-1.cFcCnt")
+            if not click_element(driver, submit_locator, stop_event=stop_event):
+                print("[run_uploader] Could not submit login. Exiting.")
+                return None
+
+            # Save the session once the page shows we're logged in
+            if custom_wait(
+                driver,
+                lambda: any(driver.find_elements(*locator) for locator in logged_in_locators),
+                timeout=10,
+                stop_event=stop_event
+            ):
+                save_session(driver, profile_dir)
+
         print("[run_uploader] Checking for 'Add New' button.")
-        add_new_button_path = (By.CSS_SELECTOR, "div.sc-b3bd94d2-0.kmSDJX > button.sc-1c794266-1.eqszNP")
         add_new_button_element = driver.find_elements(*add_new_button_path)
         if add_new_button_element:
             print("[run_uploader] 'Add New' button found, attempting to click it.")
             if not click_element(driver, add_new_button_path, stop_event=stop_event):
                 print("[run_uploader] Could not click 'Add New' button. Exiting.")
-                driver.quit()
                 return None
 
+        timer.mark("login")
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event detected after login. Quitting.")
-            driver.quit()
             return None
 
         # Click property type
-        property_type = data.get("breadcrumbs", {}).get("property_type")
         if property_type:
             print(f"[run_uploader] Clicking property type: {property_type}")
             property_locator = (By.XPATH, f"//div[text()='{property_type}']")
             if not click_element(driver, property_locator, stop_event=stop_event):
                 print("[run_uploader] Could not click property type. Exiting.")
-                driver.quit()
                 return None
 
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event detected after property type. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
 
         # Click transaction type
-        transaction_type = data.get("breadcrumbs", {}).get("transaction_type")
+        transaction_type = listing.transaction_type
         if transaction_type:
             print(f"[run_uploader] Clicking transaction type: {transaction_type}")
             transaction_locator = (By.XPATH, f"//div[text()='{transaction_type}']")
             if not click_element(driver, transaction_locator, stop_event=stop_event):
                 print("[run_uploader] Could not click transaction type. Exiting.")
-                driver.quit()
                 return None
 
+        timer.mark("listing type")
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after transaction type. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
-
-        # Upload images
-        image_folder = os.path.join(data_folder, "images")
-        if os.path.exists(image_folder):
-            image_paths = [
-                os.path.abspath(os.path.join(image_folder, img))
-                for img in os.listdir(image_folder)
-                if img.lower().endswith((".png", ".jpg", ".jpeg"))
-            ]
-            if image_paths:
-                print("[run_uploader] Found image files. Attempting to upload.")
-                for image_path in image_paths:
-                    if stop_event and stop_event.is_set():
-                        print("[run_uploader] Stop event while uploading images.")
-                        driver.quit()
-                        return None
-                    try:
-                        image_input = driver.find_element(By.CSS_SELECTOR, "input[type='file']")
-                        print(f"[run_uploader] Uploading image {image_path}")
-                        image_input.send_keys(image_path)
-                        if stop_event and stop_event.wait(0.5):
-                            print("[run_uploader] Stop event triggered during image upload wait.")
-                            driver.quit()
-                            return None
-                    except Exception as e:
-                        logging.warning(f"Could not upload image {image_path}: {e}")
-                        print(f"[run_uploader] WARNING: Could not upload image {image_path}: {e}")
 
+        # Upload images (the scraper may still be downloading them in the background)
+        if not wait_for_image_download(data_folder, stop_event=stop_event):
+            print("[run_uploader] Stop event while waiting for image downloads.")
+            return None
+        timer.mark("image download")
+        image_paths = preprocess_images(ad_image_paths(data_folder), store_root_for(data_folder))
+        timer.mark("image preprocessing")
+        if image_paths:
+            print("[run_uploader] Found image files. Attempting to upload.")
+            if not upload_images(driver, image_paths, stop_event=stop_event):
+                if stop_event and stop_event.is_set():
+                    print("[run_uploader] Stop event while uploading images.")
+                    return None
+                logging.warning(f"Could not upload images for ad {ad_id}.")
+                print("[run_uploader] WARNING: Could not upload images.")
+
+        timer.mark("image upload")
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event detected after image uploads.")
-            driver.quit()
             return None
 
         # Enter location if any
-        location = data.get("location", "")
+        location = listing.location
         if location:
             print(f"[run_uploader] Setting location: {location}")
             address_locator = (By.CSS_SELECTOR, "input#react-select-3-input.select__input")
             if not send_keys_to_element(driver, address_locator, location, stop_event=stop_event):
                 print("[run_uploader] Could not enter location. Exiting.")
-                driver.quit()
-                return None
-            if stop_event and stop_event.wait(0.5):
-                print("[run_uploader] Stop event triggered while setting location.")
-                driver.quit()
                 return None
+            # Wait for the suggestions instead of a fixed pause
+            if not custom_wait(
+                driver,
+                lambda: driver.find_elements(By.CSS_SELECTOR, ".select__option"),
+                timeout=5,
+                stop_event=stop_event
+            ):
+                if stop_event and stop_event.is_set():
+                    print("[run_uploader] Stop event triggered while setting location.")
+                    return None
+                logging.warning("Location suggestions did not appear; selecting anyway.")
             # Press down + enter in location dropdown
             try:
                 address_input = driver.find_element(*address_locator)
@@ -337,14 +799,13 @@ def run_uploader(username, password, phone_number, ad_id,
             except Exception as e:
                 logging.warning(f"Failed to select location from dropdown: {e}")
                 print(f"[run_uploader] WARNING: Failed to select location from dropdown: {e}")
-        time.sleep(0.5)
+        timer.mark("location")
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after setting location. Quitting.")
-            driver.quit()
             return None
 
         # House number if any
-        number = data.get("number")
+        number = listing.number
         if number:
             print(f"[run_uploader] Entering house number: {number}")
             number_input_locator = (
@@ -354,28 +815,23 @@ def run_uploader(username, password, phone_number, ad_id,
             )
             if not send_keys_to_element(driver, number_input_locator, number, stop_event=stop_event):
                 print("[run_uploader] Could not set house number. Exiting.")
-                driver.quit()
                 return None
-        time.sleep(0.5)
 
+        timer.mark("house number")
         # Rooms
-        rooms = data.get("property_details", {}).get("ოთახი", "")
+        rooms = listing.rooms
         if rooms:
             print(f"[run_uploader] Selecting rooms: {rooms}")
             rooms_locator = (By.XPATH, f"//div[@class='sc-226b651b-0 kgzsHg']/p[text()='{rooms}']")
             if not click_element(driver, rooms_locator, stop_event=stop_event):
                 print("[run_uploader] Could not click rooms element. Exiting.")
-                driver.quit()
                 return None
-        time.sleep(0.5)
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after selecting rooms. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
 
         # Bedrooms
-        bedrooms = data.get("property_details", {}).get("საძინებელი", "")
+        bedrooms = listing.bedrooms
         if bedrooms:
             print(f"[run_uploader] Selecting bedrooms: {bedrooms}")
             bedrooms_locator = (
@@ -386,68 +842,58 @@ def run_uploader(username, password, phone_number, ad_id,
             )
             if not click_element(driver, bedrooms_locator, stop_event=stop_event):
                 print("[run_uploader] Could not click bedrooms element. Exiting.")
-                driver.quit()
                 return None
 
+        timer.mark("rooms")
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after bedrooms. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
 
         # Total Area
-        total_area = data.get("property_details", {}).get("საერთო ფართი", "")
+        total_area = form_number(listing, listing.total_area, TOTAL_AREA)
         if total_area:
             print(f"[run_uploader] Setting total area: {total_area}")
             total_area_locator = (By.NAME, "totalArea")
             if not send_keys_to_element(driver, total_area_locator, total_area, stop_event=stop_event):
                 print("[run_uploader] Could not set total area. Exiting.")
-                driver.quit()
                 return None
 
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after total area. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
 
         # Floor
-        floor = data.get("property_details", {}).get("სართული", "")
+        floor = form_number(listing, listing.floor, FLOOR)
         if floor:
             print(f"[run_uploader] Setting floor: {floor}")
             floor_locator = (By.NAME, "floor")
             if not send_keys_to_element(driver, floor_locator, floor, stop_event=stop_event):
                 print("[run_uploader] Could not set floor. Exiting.")
-                driver.quit()
                 return None
 
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after setting floor. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
 
         # Floors
-        floors = data.get("property_details", {}).get("სართულიანობა", "")
+        floors = form_number(listing, listing.total_floors, TOTAL_FLOORS)
         if floors:
             print(f"[run_uploader] Setting floors: {floors}")
             floors_locator = (By.NAME, "floors")
             if not send_keys_to_element(driver, floors_locator, floors, stop_event=stop_event):
                 print("[run_uploader] Could not set floors. Exiting.")
-                driver.quit()
                 return None
 
+        timer.mark("area and floors")
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after setting floors. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
 
         # Bathroom count
-        bathroom_count = data.get("additional_info", {}).get("სველი წერტილი", "")
+        bathroom_count = listing.bathrooms
         if bathroom_count:
             print(f"[run_uploader] Selecting bathroom count: {bathroom_count}")
-            try:
+            def click_bathroom_count():
                 bathroom_section = driver.find_element(By.ID, "create-app-details")
                 container_div = bathroom_section.find_element(By.CLASS_NAME, "sc-e8a87f7a-0.dMKNFB")
                 specific_div = container_div.find_elements(By.CLASS_NAME, "sc-e8a87f7a-1.bilVxg")[6]
@@ -455,68 +901,64 @@ def run_uploader(username, password, phone_number, ad_id,
                 jdtBxj_div = gdEkZl_div.find_element(By.CLASS_NAME, "sc-e8a87f7a-4.jdtBxj")
                 bathroom_divs = jdtBxj_div.find_elements(By.CLASS_NAME, "sc-226b651b-0.kgzsHg")
                 for div in bathroom_divs:
-                    if stop_event and stop_event.is_set():
-                        print("[run_uploader] Stop event during bathroom selection. Quitting.")
-                        driver.quit()
-                        return None
                     if div.find_element(By.TAG_NAME, "p").text == bathroom_count:
+                        if not is_interactable(div):
+                            return False
                         print("[run_uploader] Clicking matching bathroom count.")
                         div.click()
-                        break
-            except Exception as e:
-                logging.warning(f"Failed to set bathroom count: {e}")
-                print(f"[run_uploader] WARNING: Failed to set bathroom count: {e}")
+                        return True
+                return False
+
+            if not custom_wait(driver, click_bathroom_count, timeout=10, stop_event=stop_event):
+                if stop_event and stop_event.is_set():
+                    print("[run_uploader] Stop event during bathroom selection. Quitting.")
+                    return None
+                logging.warning(f"Failed to set bathroom count: {bathroom_count}")
+                print(f"[run_uploader] WARNING: Failed to set bathroom count: {bathroom_count}")
 
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after bathroom count. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
 
         # Status
-        status = data.get("additional_info", {}).get("სტატუსი", "")
+        status = listing.status
         if status:
             print(f"[run_uploader] Selecting status: {status}")
             status_locator = (By.XPATH, f"//div[@class='sc-226b651b-0 kgzsHg']/p[text()='{status}']")
             if not click_element(driver, status_locator, stop_event=stop_event):
                 print("[run_uploader] Could not click status element. Exiting.")
-                driver.quit()
                 return None
 
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after status selection. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
 
         # Condition
-        condition = data.get("additional_info", {}).get("მდგომარეობა", "")
+        condition = listing.condition
         if condition:
             print(f"[run_uploader] Selecting condition: {condition}")
             condition_locator = (By.XPATH, f"//div[@class='sc-226b651b-0 kgzsHg']/p[text()='{condition}']")
             if not click_element(driver, condition_locator, stop_event=stop_event):
                 print("[run_uploader] Could not click condition element. Exiting.")
-                driver.quit()
                 return None
 
+        timer.mark("additional info")
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after condition selection. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
 
         # Features
-        features = data.get("features", {})
-        if features:
+        if any(listing.has_feature(name) for name in listing.features):
             print("[run_uploader] Attempting to select feature checkboxes.")
-            feature_divs = driver.find_elements(By.XPATH, "//div[@class='sc-226b651b-0 sc-226b651b-1 kgzsHg LZoqF']")
+            feature_locator = (By.XPATH, "//div[@class='sc-226b651b-0 sc-226b651b-1 kgzsHg LZoqF']")
+            custom_wait(driver, lambda: driver.find_elements(*feature_locator), timeout=10, stop_event=stop_event)
+            feature_divs = driver.find_elements(*feature_locator)
             for feature_div in feature_divs:
                 if stop_event and stop_event.is_set():
                     print("[run_uploader] Stop event while selecting features. Quitting.")
-                    driver.quit()
                     return None
                 feature_name = feature_div.find_element(By.TAG_NAME, "p").text
-                if features.get(feature_name, "") == "კი":
+                if listing.has_feature(feature_name):
                     try:
                         print(f"[run_uploader] Clicking feature: {feature_name}")
                         feature_div.click()
@@ -524,33 +966,36 @@ def run_uploader(username, password, phone_number, ad_id,
                         logging.warning(f"Could not click feature {feature_name}: {e}")
                         print(f"[run_uploader] WARNING: Could not click feature {feature_name}: {e}")
 
+        timer.mark("features")
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after features. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
 
         # Description
         if enter_description:
-            description = data.get("description", "")
+            description = listing.description
             if description:
                 print(f"[run_uploader] Entering description. Length: {len(description)} chars.")
                 description_locator = (By.CSS_SELECTOR, "div.sc-4ccf129b-2.blumtp textarea")
                 if not send_keys_to_element(driver, description_locator, description, stop_event=stop_event):
                     print("[run_uploader] Could not enter description. Exiting.")
-                    driver.quit()
                     return None
 
+        timer.mark("description")
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after description. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
 
         # Agency price
-        agency_price = data.get("agency_price", "")
+        agency_price = listing.agency_price
         if agency_price:
             print(f"[run_uploader] Setting agency price: {agency_price}")
+            custom_wait(
+                driver,
+                lambda: driver.find_elements(By.CSS_SELECTOR, "#create-app-price label"),
+                timeout=10,
+                stop_event=stop_event
+            )
             try:
                 agency_price_div = driver.find_element(By.ID, "create-app-price")
                 container_div = agency_price_div.find_element(By.CLASS_NAME, "sc-9c9d017-2.jKKqhD")
@@ -558,7 +1003,6 @@ def run_uploader(username, password, phone_number, ad_id,
                 for label in labels:
                     if stop_event and stop_event.is_set():
                         print("[run_uploader] Stop event while setting agency price. Quitting.")
-                        driver.quit()
                         return None
                     if "active" not in label.get_attribute("class"):
                         label.click()
@@ -571,11 +1015,10 @@ def run_uploader(username, password, phone_number, ad_id,
                 logging.warning(f"Could not set agency price: {e}")
                 print(f"[run_uploader] WARNING: Could not set agency price: {e}")
 
+        timer.mark("agency price")
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after agency price. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
 
         '''# Phone number
         if phone_number:
@@ -588,24 +1031,25 @@ def run_uploader(username, password, phone_number, ad_id,
 
         if stop_event and stop_event.is_set():
             print("[run_uploader] Stop event after phone number. Quitting.")
-            driver.quit()
             return None
-        time.sleep(0.5)
 
-        # Indefinitely click "Next"
-        print("[run_uploader] Will now attempt to click the 'Next' button indefinitely.")
+        # Remaining wizard pages, bounded by the upload deadline
         next_button_locator = (By.CSS_SELECTOR, "button.btn-next")
-        indefinite_click_next(driver, next_button_locator, stop_event=stop_event)
-
-        print("[run_uploader] Indefinite next-click finished. Possibly user navigated further manually.")
-
-        # Indefinitely wait for final element & get final URL
         final_element_locator = (
             By.CSS_SELECTOR,
             "#__next > div.sc-af3cf45-0.fWBmkz > div.sc-af3cf45-6.ijmwBP > button.hBiInR"
         )
-        print("[run_uploader] Will now wait indefinitely for the final element to appear.")
-        final_url = wait_for_final_element_indefinitely(driver, final_element_locator, stop_event=stop_event)
+        wizard = UploadWizard(driver, next_button_locator, final_element_locator,
+                              deadline, stop_event=stop_event, automated=automated)
+        print("[run_uploader] Clicking the 'Next' button.")
+        if not wizard.click_next():
+            print("[run_uploader] Stop event while waiting for the 'Next' button.")
+            return None
+        timer.mark("next page")
+
+        print("[run_uploader] Waiting for the final page.")
+        final_url = wizard.publish()
+        timer.mark("publish")
         if final_url:
             print(f"[run_uploader] Final URL retrieved: {final_url}")
         else:
@@ -613,10 +1057,20 @@ def run_uploader(username, password, phone_number, ad_id,
 
         return final_url
 
+    except UploadTimeout as e:
+        logging.error(f"Upload of ad {ad_id} timed out: {e}")
+        print(f"[run_uploader] TIMEOUT: {e}")
+        raise
+    except PublishedWithoutUrl as e:
+        logging.error(f"Ad {ad_id}: {e}")
+        print(f"[run_uploader] PUBLISHED WITHOUT URL: {e}")
+        raise
     except Exception as e:
         logging.error(f"Error occurred in run_uploader: {e}", exc_info=True)
         print(f"[run_uploader] EXCEPTION: {e}")
         return None
     finally:
-        print("[run_uploader] Quitting driver.")
-        driver.quit()
+        if pool is not None:
+            print("[run_uploader] Returning driver to the pool.")
+            pool.release(driver)
+        timer.report()
@@ -0,0 +1,73 @@
+# waits.py
+
+import time
+
+INITIAL_POLL = 0.005
+MAX_POLL = 0.25
+BACKOFF = 2.0
+# Pauses at least this long wait on a DOM mutation instead of sleeping blindly.
+MUTATION_WAIT_THRESHOLD = 0.05
+
+MUTATION_WAIT_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var timeoutMs = arguments[0];
+var timer = null;
+var observer = new MutationObserver(function() {
+    observer.disconnect();
+    clearTimeout(timer);
+    done(true);
+});
+timer = setTimeout(function() {
+    observer.disconnect();
+    done(false);
+}, timeoutMs);
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+"""
+
+def wait_for_dom_mutation(driver, timeout):
+    """
+    Block until the page's DOM changes or 'timeout' seconds pass.
+    Returns True/False for mutation/timeout, or None if the hook can't run.
+    """
+    try:
+        return bool(driver.execute_async_script(MUTATION_WAIT_SCRIPT, int(timeout * 1000)))
+    except Exception:
+        return None
+
+def custom_wait(driver, condition_function, timeout=10, poll_frequency=None, stop_event=None):
+    """
+    Repeatedly evaluate condition_function until it returns True, 'timeout'
+    seconds pass, or stop_event is set.
+
+    Polling starts after a few milliseconds and backs off up to
+    'poll_frequency' (MAX_POLL by default). Longer pauses are spent waiting
+    for the next DOM mutation, so the condition is re-checked as soon as the
+    page changes.
+    """
+    end_time = time.time() + timeout
+    delay = INITIAL_POLL
+    max_delay = poll_frequency or MAX_POLL
+    while True:
+        if stop_event and stop_event.is_set():
+            return False
+        try:
+            if condition_function():
+                return True
+        except Exception:
+            pass
+
+        remaining = end_time - time.time()
+        if remaining <= 0:
+            break
+        pause = min(delay, remaining)
+        delay = min(delay * BACKOFF, max_delay)
+
+        if driver is not None and pause >= MUTATION_WAIT_THRESHOLD:
+            if wait_for_dom_mutation(driver, pause) is not None:
+                continue
+        if stop_event:
+            if stop_event.wait(pause):
+                return False
+        else:
+            time.sleep(pause)
+    return False